@@ -1,11 +1,27 @@
 # MCP Client - Test the FastMCP Server
 # This client connects to the MCP server via STDIO and tests available tools/resources
+#
+# Usage:
+#   python client.py              # Test tools and resources
+#   python client.py concurrent   # 100 sum calls one at a time vs. pipelined
 
+import asyncio
 import json
+import os
 import subprocess
 import sys
+import time
 from typing import Dict, Any
 
+# launcher.py and AsyncMCPClient are shared with 02sqlmcp; the launcher starts
+# this directory's mcp_server.py
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "02sqlmcp"))
+os.environ.setdefault("MCP_SERVER_SCRIPT", os.path.join(HERE, "mcp_server.py"))
+
+from launcher import server_command
+from mcp_client import AsyncMCPClient
+
 class MCPClient:
     def __init__(self, server_command: list):
         """Initialize MCP client with server command"""
@@ -50,22 +66,32 @@ class MCPClient:
         self.process.stdin.write(request_json)
         self.process.stdin.flush()
 
-        # Read response
-        response_line = self.process.stdout.readline()
-        if not response_line:
-            raise RuntimeError("No response from server")
-
-        try:
-            response = json.loads(response_line.strip())
-            print(f"📥 Response: {response.get('result', response.get('error', 'Unknown'))}")
-            return response
-        except json.JSONDecodeError as e:
-            print(f"❌ Invalid JSON response: {response_line}")
-            raise
+        # Read lines until the response with our id; skip notifications and log output
+        while True:
+            response_line = self.process.stdout.readline()
+            if not response_line:
+                raise RuntimeError("No response from server")
+            try:
+                response = json.loads(response_line.strip())
+            except json.JSONDecodeError:
+                print(f"📝 Server output: {response_line.rstrip()}")
+                continue
+            if isinstance(response, dict) and response.get("id") == request["id"] and "method" not in response:
+                break
+        print(f"📥 Response: {response.get('result', response.get('error', 'Unknown'))}")
+        return response
+
+    def send_notification(self, method: str, params: Dict[str, Any] = None):
+        """Send a JSON-RPC notification (no response)"""
+        notification = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            notification["params"] = params
+        self.process.stdin.write(json.dumps(notification) + '\n')
+        self.process.stdin.flush()
 
     def initialize(self):
         """Initialize the MCP connection"""
-        return self.send_request("initialize", {
+        response = self.send_request("initialize", {
             "protocolVersion": "2024-11-05",
             "capabilities": {
                 "roots": {
@@ -78,6 +104,9 @@ class MCPClient:
                 "version": "1.0.0"
             }
         })
+        # The server rejects every other request until the handshake is complete
+        self.send_notification("notifications/initialized")
+        return response
 
     def list_tools(self):
         """List available tools"""
@@ -109,15 +138,7 @@ class MCPClient:
 
 def test_mcp_server():
     """Test the MCP server functionality"""
-    # Server command - using PowerShell to call mcp.ps1
-    server_cmd = [
-        "powershell.exe", 
-        "-ExecutionPolicy", "Bypass", 
-        "-File", "mcp.ps1", 
-        "server"
-    ]
-
-    client = MCPClient(server_cmd)
+    client = MCPClient(server_command())
     
     try:
         print("🚀 Testing MCP Server via STDIO")
@@ -171,5 +192,53 @@ def test_mcp_server():
     finally:
         client.stop_server()
 
+async def measure_pipelining(server_cmd: list, calls: int = 100) -> Dict[str, Any]:
+    """Calls per second for sum awaited one at a time vs. all in flight at once"""
+    client = AsyncMCPClient(server_cmd)
+    await client.start_server()
+    try:
+        await client.initialize()
+
+        start = time.perf_counter()
+        for n in range(calls):
+            await client.call_tool("sum", {"a": n, "b": 1})
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.call_tool("sum", {"a": n, "b": 1}) for n in range(calls)
+        ])
+        pipelined = time.perf_counter() - start
+        # Responses come back in any order; the pending map still pairs each with its call
+        wrong = sum(
+            1 for n, r in enumerate(responses)
+            if r.get("result", {}).get("content", [{}])[0].get("text") != str(n + 1)
+        )
+    finally:
+        await client.stop_server()
+
+    return {
+        "calls": calls,
+        "sequential_calls_per_second": round(calls / sequential, 1),
+        "pipelined_calls_per_second": round(calls / pipelined, 1),
+        "speedup": round(sequential / pipelined, 2),
+        "wrong_results": wrong,
+    }
+
+def test_concurrent_sum(calls: int = 100):
+    """Throughput of one-at-a-time vs. pipelined sum calls over one stdio pipe"""
+    server_cmd = server_command()
+    try:
+        print(f"⚡ {calls} concurrent sum calls")
+        result = asyncio.run(measure_pipelining(server_cmd, calls))
+        print(f"   🐢 one at a time: {result['sequential_calls_per_second']} calls/s")
+        print(f"   🚀 pipelined:     {result['pipelined_calls_per_second']} calls/s "
+              f"({result['speedup']}x, {result['wrong_results']} mismatched results)")
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+
 if __name__ == "__main__":
-    test_mcp_server()
+    if len(sys.argv) > 1 and sys.argv[1] == "concurrent":
+        test_concurrent_sum()
+    else:
+        test_mcp_server()
@@ -1,11 +1,17 @@
 # FastMCP Demo Server
 # Simple MCP server with basic tools and resources
 from mcp.server.fastmcp import FastMCP
+from metrics import ServerMetrics, instrument
+import json
 import sys
 
 # Create MCP server
 mcp = FastMCP("Demo")
 
+# Per-method and per-tool latency histograms (see metrics.py)
+metrics = ServerMetrics()
+instrument(mcp, metrics)
+
 # tools
 @mcp.tool()
 def sum(a: int, b: int) -> int:
@@ -18,9 +24,16 @@ def get_greeting(name: str) -> str:
     """Get a personalized greeting"""
     return f"Hello, {name}!"
 
+@mcp.resource("metrics://server")
+def get_server_metrics() -> str:
+    """Latency histograms per method, tool and resource, plus slow requests"""
+    return json.dumps(metrics.snapshot(), indent=2)
+
 if __name__ == "__main__":
+    # python mcp_server.py [stdio|http|sse]; FASTMCP_HOST / FASTMCP_PORT set the HTTP address
+    transport = sys.argv[1] if len(sys.argv) > 1 else "stdio"
     try:
-        mcp.run(transport='stdio')
+        mcp.run(transport='streamable-http' if transport == 'http' else transport)
     except KeyboardInterrupt:
         sys.exit(0)
     except Exception as e:
@@ -0,0 +1,90 @@
+# Request latency histograms for the demo server
+# instrument() wraps every FastMCP request handler and records how long it ran,
+# in fixed-bucket histograms per method and per tool or resource
+# ("tools/call:sum", "resources/read:greeting://"). The SDK's stdio transport
+# has no hooks, so this is handler time only; 02sqlmcp/metrics.py also splits
+# requests into decode / dispatch / execute / encode stages and can export
+# them via OpenTelemetry, and supplies the Histogram used here. The slowest
+# recent requests are kept as well.
+#
+# Usage:
+#   metrics = ServerMetrics()
+#   instrument(mcp, metrics)                 # after mcp = FastMCP(...)
+
+import importlib
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# The histogram and request-key helpers are 02sqlmcp/metrics.py's. That module has the
+# same name as this one, so it is imported through its package from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+_shared = importlib.import_module("02sqlmcp.metrics")
+Histogram, _target = _shared.Histogram, _shared._target
+
+class ServerMetrics:
+    """Handler latency histograms per method, tool and resource."""
+
+    def __init__(self, slow_ms: float = 100.0, keep_slow: int = 20):
+        self.slow_ms = slow_ms
+        self.created = time.monotonic()
+        self._methods = {}
+        self._slow = deque(maxlen=keep_slow)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, request_id, key: str, seconds: float, error: bool):
+        ms = seconds * 1000
+        with self._lock:
+            self.requests += 1
+            entry = self._methods.get(key)
+            if entry is None:
+                entry = self._methods[key] = {"errors": 0, "latency": Histogram()}
+            entry["latency"].observe(ms)
+            if error:
+                self.errors += 1
+                entry["errors"] += 1
+            if ms >= self.slow_ms:
+                self._slow.append({"id": request_id, "key": key, "total_ms": round(ms, 3), "error": error})
+
+    def snapshot(self) -> dict:
+        """Everything metrics://server reports"""
+        with self._lock:
+            return {
+                "uptime_s": round(time.monotonic() - self.created, 1),
+                "requests": self.requests,
+                "errors": self.errors,
+                "methods": {key: {"errors": entry["errors"], "latency": entry["latency"].summary()}
+                            for key, entry in sorted(self._methods.items())},
+                "slow_requests": list(self._slow),
+            }
+
+def instrument(mcp, metrics: ServerMetrics):
+    """Wrap every request handler of a FastMCP server so each request is timed"""
+    from mcp.server.lowlevel.server import request_ctx
+
+    server = mcp._mcp_server
+    static_resources = getattr(getattr(mcp, "_resource_manager", None), "_resources", {})
+
+    def wrap(handler):
+        async def timed(req):
+            if req is None:
+                # The SDK refreshes its tool cache by calling the tools/list handler directly
+                return await handler(req)
+            target = _target(req, static_resources)
+            key = f"{req.method}:{target}" if target else req.method
+            started = time.perf_counter()
+            error = True
+            try:
+                response = await handler(req)
+                error = getattr(getattr(response, "root", response), "isError", False)
+                return response
+            finally:
+                metrics.record(request_ctx.get().request_id, key, time.perf_counter() - started, error)
+        return timed
+
+    for request_type, handler in list(server.request_handlers.items()):
+        server.request_handlers[request_type] = wrap(handler)
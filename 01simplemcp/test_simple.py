@@ -2,26 +2,26 @@
 # Quick test of MCP server basic functionality
 
 import json
+import os
 import subprocess
 import sys
 import time
 
+# launcher.py is shared with 02sqlmcp; it starts this directory's mcp_server.py
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "02sqlmcp"))
+os.environ.setdefault("MCP_SERVER_SCRIPT", os.path.join(HERE, "mcp_server.py"))
+
+from launcher import launch
+
 def test_simple():
     """Simple test of MCP server"""
     print("🧪 Simple MCP Server Test")
     print("=" * 30)
     
     # Start server
-    cmd = ["powershell.exe", "-ExecutionPolicy", "Bypass", "-File", "mcp.ps1", "server"]
-    
     try:
-        process = subprocess.Popen(
-            cmd, 
-            stdin=subprocess.PIPE, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        process = launch(stderr=subprocess.PIPE, text=True)
         
         print("✅ Server started")
         
@@ -2,11 +2,18 @@
 # Tests all available tools and resources via STDIO
 
 import json
+import os
 import subprocess
 import sys
-import time
 from pathlib import Path
 
+# launcher.py is shared with 02sqlmcp; it starts this directory's mcp_server.py
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "02sqlmcp"))
+os.environ.setdefault("MCP_SERVER_SCRIPT", os.path.join(HERE, "mcp_server.py"))
+
+from launcher import launch
+
 class Colors:
     GREEN = '\033[92m'
     RED = '\033[91m'
@@ -63,20 +70,11 @@ def run_mcp_test():
     ]
     
     # Start server
-    cmd = ["powershell.exe", "-ExecutionPolicy", "Bypass", "-File", "mcp.ps1", "server"]
-    
     try:
-        process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=0
-        )
+        # readline() below waits for the server, no start-up sleep needed
+        process = launch(stderr=subprocess.DEVNULL, text=True, bufsize=0)
         
         print_colored("✅ MCP Server started", Colors.GREEN)
-        time.sleep(1)  # Give server time to start
         
         # Run each test
         for i, test in enumerate(tests, 1):
@@ -128,6 +126,9 @@ def run_mcp_test():
                         elif test["method"] == "initialize":
                             server_info = result.get("serverInfo", {})
                             print(f"      🖥️ Server: {server_info.get('name')} v{server_info.get('version')}")
+                            # Complete the handshake before any other request
+                            process.stdin.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + '\n')
+                            process.stdin.flush()
                             
                     else:
                         error = response.get("error", {})
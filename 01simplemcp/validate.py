@@ -1,46 +1,44 @@
 # Quick MCP STDIO Test
 # Simple validation that MCP server is working via STDIO
 
+import os
 import subprocess
 import json
 import sys
 
+# launcher.py is shared with 02sqlmcp; it starts this directory's mcp_server.py
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "02sqlmcp"))
+os.environ.setdefault("MCP_SERVER_SCRIPT", os.path.join(HERE, "mcp_server.py"))
+
+from launcher import server_command, time_launch
+
 def quick_test():
     print("🔬 Quick MCP STDIO Test")
     print("-" * 25)
     
+    python = server_command()[0]
+
     # Test server startup
     try:
         print("1. Testing server startup...")
-        result = subprocess.run(
-            ["powershell.exe", "-ExecutionPolicy", "Bypass", "-Command", 
-             "& './mcp.ps1' server | Select-Object -First 1"],
-            capture_output=True, text=True, timeout=5
-        )
-        
-        if result.returncode == 0:
-            print("   ✅ Server can start")
-        else:
-            print(f"   ❌ Server failed: {result.stderr}")
-            
-    except subprocess.TimeoutExpired:
-        print("   ✅ Server started (timeout as expected for STDIO)")
+        timing = time_launch()
+        print(f"   ✅ Server answered initialize "
+              f"(spawn {timing['spawn'] * 1000:.1f} ms, handshake {timing['handshake'] * 1000:.0f} ms)")
     except Exception as e:
         print(f"   ❌ Error: {e}")
     
     # Test MCP tools availability
     print("\n2. Testing MCP availability...")
     try:
-        result = subprocess.run(
-            ["powershell.exe", "-ExecutionPolicy", "Bypass", "-Command",
-             "Test-Path 'C:/Users/yingdingwang/Documents/VENV/azfdymcp3.12uv/Scripts/mcp.exe'"],
-            capture_output=True, text=True
-        )
+        # The mcp CLI (dev/inspector modes) sits next to the interpreter of the venv
+        bin_dir = os.path.dirname(python)
+        found = [name for name in ("mcp", "mcp.exe") if os.path.exists(os.path.join(bin_dir, name))]
         
-        if "True" in result.stdout:
-            print("   ✅ MCP executable found")
+        if found:
+            print(f"   ✅ MCP executable found: {os.path.join(bin_dir, found[0])}")
         else:
-            print("   ❌ MCP executable not found")
+            print(f"   ❌ MCP executable not found in {bin_dir}")
             
     except Exception as e:
         print(f"   ❌ Error: {e}")
@@ -49,8 +47,7 @@ def quick_test():
     print("\n3. Testing mcp_server.py syntax...")
     try:
         result = subprocess.run([
-            "C:/Users/yingdingwang/Documents/VENV/azfdymcp3.12uv/Scripts/python.exe",
-            "-m", "py_compile", "mcp_server.py"
+            python, "-m", "py_compile", "mcp_server.py"
         ], capture_output=True, text=True)
         
         if result.returncode == 0:
@@ -63,7 +60,7 @@ def quick_test():
     
     print(f"\n{'='*25}")
     print("🎯 Manual Test Instructions:")
-    print("1. Run: ./mcp.ps1 server")
+    print(f"1. Run: {' '.join(server_command())}  (or ./mcp.ps1 server on Windows)")
     print("2. In another terminal, connect with MCP client")
     print("3. Or use VS Code MCP extension with 'server' config")
     print("\n📋 Available for testing:")
@@ -0,0 +1,365 @@
+# Index advisor for the SQL explorer
+# init_db loads the CSV without any index, so every filter and GROUP BY the
+# agent sends is a full table scan. IndexAdvisor watches the queries that
+# query_data executes, remembers which columns are filtered, grouped and
+# sorted on, proposes (covering) indexes for the most frequent patterns, and
+# can build them on a background thread while reporting before/after timings
+# for the recorded workload.
+#
+# Usage:
+#   python advisor.py "SELECT ..." ["SELECT ..."]   # Propose, build and time indexes
+
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from collections import Counter
+
+from cache import data_version
+
+TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>'(?:[^']|'')*')
+      | (?P<quoted>"(?:[^"]|"")*"|\[[^\]]*\]|`[^`]*`)
+      | (?P<number>\d+(?:\.\d*)?)
+      | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><=|>=|<>|!=|==|\|\||[-+*/%<>=(),.;])
+    )""",
+    re.VERBOSE,
+)
+CLAUSES = {"SELECT", "FROM", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "WINDOW"}
+EQUALITY_OPS = {"=", "==", "IN"}
+RANGE_OPS = {"<", ">", "<=", ">=", "BETWEEN", "LIKE", "GLOB"}
+MAX_INDEX_COLUMNS = 4
+
+def tokenize(sql: str) -> list:
+    """Split SQL into (kind, text) tokens; quoted identifiers lose their quotes"""
+    tokens = []
+    for match in TOKEN.finditer(sql):
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "quoted":
+            kind, text = "word", text[1:-1]
+        tokens.append((kind, text))
+    return tokens
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+class IndexAdvisor:
+    """Records filter/group/sort columns of executed queries and proposes indexes."""
+
+    def __init__(self, db_path: str, min_hits: int = 3, max_samples: int = 50):
+        """min_hits: how often a pattern must be seen before it is proposed"""
+        self.db_path = db_path
+        self.min_hits = max(1, min_hits)
+        self.max_samples = max_samples
+
+        self._lock = threading.Lock()
+        self._patterns = Counter()     # (table, key columns, covering columns) -> hits
+        self._samples = {}             # pattern -> a few example queries
+        self._columns = {}             # table -> {lower name: name}
+        self._version = None
+        self._building = False
+        self.recorded = 0
+        self.last_report = None
+
+    def _load_columns(self, conn: sqlite3.Connection) -> dict:
+        """Table -> column names, refreshed when the data changes"""
+        version = data_version(self.db_path)
+        with self._lock:
+            if version == self._version:
+                return self._columns
+        columns = {}
+        tables = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for (table,) in tables:
+            info = conn.execute(f"PRAGMA table_info({quote_identifier(table)})").fetchall()
+            columns[table] = {col[1].lower(): col[1] for col in info}
+        with self._lock:
+            self._columns, self._version = columns, version
+        return columns
+
+    def _analyze(self, sql: str, columns: dict):
+        """Find the table and the equality, range, group, order and selected columns"""
+        tokens = tokenize(sql)
+        tables_by_name = {name.lower(): name for name in columns}
+        aliases = {}
+        clause = None
+        depth = 0
+        found = {"eq": [], "range": [], "group": [], "order": [], "select": []}
+        star = False
+
+        def resolve(i):
+            """Column reference at token i as (table, column, next index) or None"""
+            kind, text = tokens[i]
+            if kind != "word":
+                return None
+            if i + 2 < len(tokens) and tokens[i + 1][1] == "." and tokens[i + 2][0] == "word":
+                table = aliases.get(text.lower())
+                column = tokens[i + 2][1].lower()
+                if table and column in columns[table]:
+                    return table, columns[table][column], i + 3
+                return None
+            for table in aliases.values():
+                if text.lower() in columns[table]:
+                    return table, columns[table][text.lower()], i + 1
+            return None
+
+        # First pass: FROM clause of the outermost query gives tables and aliases
+        for i, (kind, text) in enumerate(tokens):
+            upper = text.upper()
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+            elif depth == 0 and kind == "word" and upper in CLAUSES:
+                clause = upper
+            elif depth == 0 and clause == "FROM" and kind == "word" and text.lower() in tables_by_name:
+                table = tables_by_name[text.lower()]
+                aliases[text.lower()] = table
+                j = i + 1
+                if j < len(tokens) and tokens[j][1].upper() == "AS":
+                    j += 1
+                if j < len(tokens) and tokens[j][0] == "word" and tokens[j][1].upper() not in CLAUSES \
+                        and tokens[j][1].upper() not in ("JOIN", "ON", "LEFT", "INNER", "CROSS", "NATURAL", "USING"):
+                    aliases[tokens[j][1].lower()] = table
+        if not aliases:
+            return None
+
+        # Second pass: classify column references by clause and operator
+        clause, depth, i = None, 0, 0
+        while i < len(tokens):
+            kind, text = tokens[i]
+            upper = text.upper()
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+            elif depth == 0 and kind == "word" and upper in CLAUSES:
+                clause = upper
+            elif clause == "SELECT" and depth == 0 and text == "*":
+                star = True
+            else:
+                ref = resolve(i)
+                if ref:
+                    table, column, nxt = ref
+                    op = tokens[nxt][1].upper() if nxt < len(tokens) else ""
+                    if op == "IS" and nxt + 1 < len(tokens) and tokens[nxt + 1][1].upper() == "NOT":
+                        op = "IS NOT"
+                    if clause == "SELECT":
+                        found["select"].append((table, column))
+                    elif clause in ("WHERE", "HAVING") and depth == 0:
+                        if op in EQUALITY_OPS or op == "IS":
+                            found["eq"].append((table, column))
+                        elif op in RANGE_OPS or op == "IS NOT":
+                            found["range"].append((table, column))
+                        else:
+                            found["select"].append((table, column))
+                    elif clause == "GROUP":
+                        found["group"].append((table, column))
+                    elif clause == "ORDER":
+                        found["order"].append((table, column))
+                    else:
+                        found["select"].append((table, column))
+                    i = nxt
+                    continue
+            i += 1
+
+        # Index the table carrying the filters (or the grouping, failing that)
+        for kind in ("eq", "range", "group", "order"):
+            if found[kind]:
+                table = found[kind][0][0]
+                break
+        else:
+            return None
+        pick = {k: list(dict.fromkeys(c for t, c in v if t == table)) for k, v in found.items()}
+        return table, pick, star
+
+    def propose_for(self, table: str, pick: dict, star: bool):
+        """Key columns: equality filters, then grouping/ordering or one range filter"""
+        key = list(pick["eq"])
+        tail = pick["group"] or pick["order"]
+        if tail:
+            key += [c for c in tail if c not in key]
+        elif pick["range"]:
+            key += [c for c in pick["range"][:1] if c not in key]
+        key = key[:MAX_INDEX_COLUMNS]
+        if not key:
+            return None
+        covering = ()
+        if not star:
+            rest = [c for c in pick["select"] + pick["range"] + pick["eq"] if c not in key]
+            rest = list(dict.fromkeys(rest))
+            if len(key) + len(rest) <= MAX_INDEX_COLUMNS:
+                covering = tuple(rest)
+        return table, tuple(key), covering
+
+    def record(self, conn: sqlite3.Connection, sql: str) -> bool:
+        """Remember the index-relevant shape of one executed read query
+
+        Returns True when this query made its pattern reach min_hits.
+        """
+        try:
+            analyzed = self._analyze(sql, self._load_columns(conn))
+        except (sqlite3.Error, IndexError):
+            return False
+        if not analyzed:
+            return False
+        pattern = self.propose_for(*analyzed)
+        if not pattern:
+            return False
+        with self._lock:
+            self.recorded += 1
+            self._patterns[pattern] += 1
+            reached = self._patterns[pattern] == self.min_hits
+            samples = self._samples.setdefault(pattern, [])
+            if sql not in samples and len(samples) < 3 and len(self._samples) <= self.max_samples:
+                samples.append(sql)
+        return reached
+
+    def _existing_indexes(self, conn: sqlite3.Connection, table: str) -> list:
+        """Column tuples (lower-case) of every index on a table"""
+        existing = []
+        for row in conn.execute(f"PRAGMA index_list({quote_identifier(table)})").fetchall():
+            info = conn.execute(f"PRAGMA index_info({quote_identifier(row[1])})").fetchall()
+            existing.append(tuple(col[2].lower() for col in info if col[2]))
+        return existing
+
+    def proposals(self, conn: sqlite3.Connection) -> list:
+        """Indexes worth building, most frequently needed first"""
+        with self._lock:
+            patterns = self._patterns.most_common()
+            samples = {p: list(s) for p, s in self._samples.items()}
+        out = []
+        seen = set()
+        for (table, key, covering), hits in patterns:
+            if hits < self.min_hits:
+                continue
+            columns = key + covering
+            lowered = tuple(c.lower() for c in columns)
+            if lowered in seen:
+                continue
+            seen.add(lowered)
+            if any(idx[:len(lowered)] == lowered for idx in self._existing_indexes(conn, table)):
+                continue
+            name = re.sub(r"\W", "_", f"idx_advisor_{table}_{'_'.join(columns)}").lower()
+            ddl = (f"CREATE INDEX IF NOT EXISTS {quote_identifier(name)} ON "
+                   f"{quote_identifier(table)}({', '.join(quote_identifier(c) for c in columns)})")
+            out.append({
+                "table": table,
+                "columns": list(columns),
+                "covering": bool(covering),
+                "hits": hits,
+                "ddl": ddl,
+                "queries": samples.get((table, key, covering), []),
+            })
+        return out
+
+    def time_workload(self, queries: list, repeat: int = 5) -> dict:
+        """Median milliseconds per query on a fresh read-only connection"""
+        timings = {}
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            for sql in queries:
+                runs = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    conn.execute(sql).fetchall()
+                    runs.append((time.perf_counter() - start) * 1000)
+                timings[sql] = statistics.median(runs)
+        finally:
+            conn.close()
+        return timings
+
+    def build(self, proposals: list) -> dict:
+        """Create the proposed indexes and time the recorded workload before and after"""
+        queries = list(dict.fromkeys(q for p in proposals for q in p["queries"]))
+        before = self.time_workload(queries)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for proposal in proposals:
+                start = time.perf_counter()
+                conn.execute(proposal["ddl"])
+                proposal["build_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        after = self.time_workload(queries)
+        report = {
+            "built": [{k: p[k] for k in ("ddl", "hits", "build_ms")} for p in proposals],
+            "workload": [
+                {
+                    "sql": sql,
+                    "before_ms": round(before[sql], 4),
+                    "after_ms": round(after[sql], 4),
+                    "speedup": round(before[sql] / after[sql], 2) if after[sql] else None,
+                }
+                for sql in queries
+            ],
+        }
+        if queries:
+            total_before, total_after = sum(before.values()), sum(after.values())
+            report["total_speedup"] = round(total_before / total_after, 2) if total_after else None
+        self.last_report = report
+        return report
+
+    def build_in_background(self, proposals: list) -> bool:
+        """Start build() on a daemon thread; False if a build is already running"""
+        with self._lock:
+            if self._building or not proposals:
+                return False
+            self._building = True
+
+        def run():
+            try:
+                self.build(proposals)
+            except sqlite3.Error as e:
+                self.last_report = {"error": str(e)}
+            finally:
+                with self._lock:
+                    self._building = False
+
+        threading.Thread(target=run, name="index-advisor", daemon=True).start()
+        return True
+
+    def stats(self) -> dict:
+        """Recorded pattern counts, build state and the last build report"""
+        with self._lock:
+            patterns = [
+                {"table": t, "key": list(k), "covering": list(c), "hits": hits}
+                for (t, k, c), hits in self._patterns.most_common(20)
+            ]
+            return {
+                "recorded": self.recorded,
+                "min_hits": self.min_hits,
+                "building": self._building,
+                "patterns": patterns,
+                "last_report": self.last_report,
+            }
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    from util import get_db_file_path
+
+    queries = sys.argv[1:] or [
+        "SELECT * FROM titanic WHERE Age < 18",
+        "SELECT Sex, COUNT(*) as count FROM titanic GROUP BY Sex",
+        "SELECT Pclass, AVG(Age) as avg_age FROM titanic WHERE Age IS NOT NULL GROUP BY Pclass",
+    ]
+    advisor = IndexAdvisor(get_db_file_path(), min_hits=1)
+    conn = sqlite3.connect(get_db_file_path())
+    try:
+        for sql in queries:
+            advisor.record(conn, sql)
+        proposals = advisor.proposals(conn)
+    finally:
+        conn.close()
+    print(json.dumps(proposals, indent=2))
+    if proposals:
+        print(json.dumps(advisor.build(proposals), indent=2))
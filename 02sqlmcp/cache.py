@@ -0,0 +1,187 @@
+# Result cache for repeated query_data SQL
+# Agents send the same few aggregate queries over and over; this keeps their
+# results in memory keyed by normalized SQL, bounded by entry count,
+# total bytes and age, and drops everything when the database file changes.
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Functions whose result changes between calls; queries using them are never cached
+VOLATILE_SQL = re.compile(
+    r"\b(random|randomblob|changes|total_changes|last_insert_rowid)\s*\("
+    r"|\b(current_time|current_date|current_timestamp)\b"
+    r"|'now'",
+    re.IGNORECASE,
+)
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form of a statement: comments removed, whitespace collapsed outside quotes"""
+    out = []
+    i, n = 0, len(sql)
+    pending_space = False
+    while i < n:
+        ch = sql[i]
+        if ch in "'\"`[":
+            close = "]" if ch == "[" else ch
+            j = i + 1
+            while j < n:
+                if sql[j] == close:
+                    # A doubled quote is an escaped quote inside the literal
+                    if close != "]" and j + 1 < n and sql[j + 1] == close:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            if pending_space and out:
+                out.append(" ")
+            pending_space = False
+            out.append(sql[i:j + 1])
+            i = j + 1
+        elif sql.startswith("--", i):
+            j = sql.find("\n", i)
+            i = n if j == -1 else j
+            pending_space = True
+        elif sql.startswith("/*", i):
+            j = sql.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            pending_space = True
+        elif ch.isspace():
+            pending_space = True
+            i += 1
+        else:
+            if pending_space and out:
+                out.append(" ")
+            pending_space = False
+            out.append(ch)
+            i += 1
+    return "".join(out).strip().rstrip(";").rstrip()
+
+def is_read_query(sql: str) -> bool:
+    """True for statements that only produce rows (SELECT, WITH ... SELECT, VALUES)"""
+    head = sql.lstrip("( ").split(" ", 1)[0].upper()
+    return head in ("SELECT", "WITH", "VALUES")
+
+def is_cacheable(sql: str) -> bool:
+    """Only deterministic read statements are worth caching"""
+    return is_read_query(sql) and not VOLATILE_SQL.search(sql)
+
+def data_version(db_path: str) -> tuple:
+    """Stamp that changes whenever the database or its WAL is rewritten"""
+    stamp = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+class ResultCache:
+    """Thread-safe LRU of query results with TTL expiry and a byte budget."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024,
+                 ttl_seconds: float = 300.0):
+        """Create an empty cache; a non-positive ttl_seconds disables expiry"""
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()   # key -> (value, size, stored_at)
+        self._lock = threading.Lock()
+        self._version = None
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def check_version(self, version):
+        """Drop every entry if the data version differs from the one seen last"""
+        with self._lock:
+            if version == self._version:
+                return
+            self._invalidate()
+            self._version = version
+
+    def invalidate(self):
+        """Drop every entry because the data behind them changed"""
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        # Caller holds the lock; only a non-empty cache counts as invalidated
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self.bytes = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int = None):
+        """Store a result, evicting least recently used entries to stay in budget"""
+        if size is None:
+            size = len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size, time.monotonic())
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, key):
+        """Remove one entry if present"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,223 @@
+# Precomputed schema catalog for schema://main
+# Agents read the schema at the start of almost every conversation. The
+# catalog renders table DDL together with row counts and per-column
+# statistics (null fraction, distinct estimate, min/max, sample values) once,
+# keeps it in memory, and rebuilds it only when the data version changes.
+# Statistics come from a sample of evenly spaced rowid blocks, so a build
+# costs index seeks rather than table scans; tables no larger than the sample
+# are read whole and get exact figures. outline() is the DDL alone, for
+# serving while a build is still running.
+#
+# Usage:
+#   python catalog.py        # Build the catalog for data/database.db and print it
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def estimate_distinct(sample: list, total_rows: int) -> int:
+    """GEE estimate of distinct values in total_rows from a uniform sample
+
+    Values seen once in the sample stand for sqrt(N/n) unseen values each,
+    values seen more than once are assumed to be all there is. A sample
+    without repeats is taken to come from a key column.
+    """
+    values = [v for v in sample if v is not None]
+    if not values:
+        return 0
+    counts = Counter(values)
+    if len(sample) >= total_rows:
+        return len(counts)
+    singletons = sum(1 for c in counts.values() if c == 1)
+    if singletons == len(values):
+        # Nothing repeats in the sample: treat the column as a key
+        return round(total_rows * len(values) / len(sample))
+    scale = (total_rows / len(sample)) ** 0.5
+    return min(total_rows, round(scale * singletons + (len(counts) - singletons)))
+
+def _sqlite_order(value):
+    """Sort key matching SQLite's order of non-NULL values: numbers, then text, then blobs"""
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, value) if isinstance(value, str) else (2, value)
+
+def _short(value, width: int = 40):
+    """Keep long text out of the rendered catalog"""
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > width:
+        return value[:width - 3] + "..."
+    return value
+
+class SchemaCatalog:
+    """Table DDL and column statistics, cached until the data version changes."""
+
+    def __init__(self, stamp, sample_rows: int = 10_000, sample_values: int = 3, sample_blocks: int = 200):
+        """stamp() returns the current data version (e.g. cache.data_version for the file)"""
+        self.stamp = stamp
+        self.sample_rows = max(1, sample_rows)
+        self.sample_blocks = max(1, sample_blocks)
+        self.sample_values = sample_values
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._entry = None
+        self._version = None
+        self.hits = 0
+        self.builds = 0
+        self.last_build_ms = None
+
+    def _indexes(self, conn: sqlite3.Connection, name: str) -> list:
+        return [
+            {"name": row[0], "columns": [c[2] for c in conn.execute(f"PRAGMA index_info({quote_identifier(row[0])})")]}
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name=? ORDER BY name", (name,)
+            )
+        ]
+
+    def _sample(self, conn: sqlite3.Connection, table: str):
+        """(sample rows, row count, exact): the whole table when small, else evenly spaced rowid blocks"""
+        try:
+            low, high = conn.execute(f"SELECT min(rowid), max(rowid) FROM {table}").fetchone()
+        except sqlite3.OperationalError:
+            # WITHOUT ROWID tables have no rowid to seek on: count them, sample the first rows
+            row_count = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            sample = conn.execute(f"SELECT * FROM {table} LIMIT ?", (self.sample_rows,)).fetchall()
+            return sample, row_count, len(sample) == row_count
+        if low is None:
+            return [], 0, True
+        if high - low + 1 <= self.sample_rows:
+            sample = conn.execute(f"SELECT * FROM {table}").fetchall()
+            return sample, len(sample), True
+        # Each block is one index seek plus a short range read, never a table scan;
+        # max(rowid) stands in for count(*) as in the cost guard
+        blocks = min(self.sample_blocks, self.sample_rows)
+        per_block = max(1, self.sample_rows // blocks)
+        step = (high - low + 1) / blocks
+        sample = []
+        for i in range(blocks):
+            sample.extend(conn.execute(
+                f"SELECT * FROM {table} WHERE rowid >= ? ORDER BY rowid LIMIT ?", (low + int(i * step), per_block)
+            ).fetchall())
+        return sample, high, False
+
+    def _table_stats(self, conn: sqlite3.Connection, name: str, ddl: str) -> dict:
+        """Row count and per-column statistics for one table, from a sample unless the table is small"""
+        table = quote_identifier(name)
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        columns = [(col[1], col[2] or "") for col in info]
+        sample, row_count, exact = self._sample(conn, table)
+
+        stats = []
+        for i, (column, declared) in enumerate(columns):
+            values = [row[i] for row in sample]
+            present = [v for v in values if v is not None]
+            stats.append({
+                "name": column,
+                "type": declared,
+                "null_fraction": round(1 - len(present) / len(values), 4) if values else 0.0,
+                "distinct_estimate": estimate_distinct(values, row_count),
+                "min": _short(min(present, key=_sqlite_order)) if present else None,
+                "max": _short(max(present, key=_sqlite_order)) if present else None,
+                "samples": [_short(v) for v in dict.fromkeys(present)][:self.sample_values],
+            })
+        return {"name": name, "ddl": ddl, "row_count": row_count, "exact": exact,
+                "indexes": self._indexes(conn, name), "columns": stats}
+
+    def _tables(self, conn: sqlite3.Connection) -> list:
+        return conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='table' "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+
+    def outline(self, conn: sqlite3.Connection) -> dict:
+        """DDL and indexes only, straight from sqlite_master, while the statistics are being built"""
+        catalog = {"tables": [{"name": name, "ddl": sql, "indexes": self._indexes(conn, name)}
+                              for name, sql in self._tables(conn)], "statistics": False}
+        catalog["text"] = render(catalog)
+        return catalog
+
+    def build(self, conn: sqlite3.Connection) -> dict:
+        """Compute the catalog from scratch"""
+        catalog = {"tables": [self._table_stats(conn, name, sql) for name, sql in self._tables(conn)],
+                   "statistics": True}
+        catalog["text"] = render(catalog)
+        return catalog
+
+    def lookup(self):
+        """The cached catalog if it is still current, without touching the database"""
+        version = self.stamp()
+        with self._lock:
+            if self._entry is not None and version == self._version:
+                self.hits += 1
+                return self._entry
+        return None
+
+    def get(self, conn: sqlite3.Connection) -> dict:
+        """Cached catalog, rebuilt first if the data changed"""
+        entry = self.lookup()
+        if entry is not None:
+            return entry
+        # One build at a time; callers queued behind it reuse its result
+        with self._build_lock:
+            entry = self.lookup()
+            if entry is not None:
+                return entry
+            started = time.perf_counter()
+            entry = self.build(conn)
+            with self._lock:
+                # Stamp after building: opening the database can touch its WAL files
+                self._entry, self._version = entry, self.stamp()
+                self.builds += 1
+                self.last_build_ms = round((time.perf_counter() - started) * 1000, 3)
+        return entry
+
+    def stats(self) -> dict:
+        """Hit/build counters and the last build time"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "builds": self.builds,
+                "last_build_ms": self.last_build_ms,
+                "tables": len(self._entry["tables"]) if self._entry else 0,
+            }
+
+def render(catalog: dict) -> str:
+    """DDL of every table, each followed by '--' comment lines with its statistics"""
+    blocks = []
+    for table in catalog["tables"]:
+        lines = [table["ddl"] or f"-- table {table['name']}"]
+        if "row_count" in table:
+            approx = "" if table["exact"] else "~"
+            lines.append(f"-- {table['name']}: {approx}{table['row_count']} rows")
+        for index in table["indexes"]:
+            lines.append(f"-- index {index['name']} ({', '.join(index['columns'])})")
+        for col in table.get("columns", ()):
+            samples = ", ".join(repr(v) for v in col["samples"])
+            lines.append(
+                f"--   {col['name']} {col['type']}: nulls {col['null_fraction']:.1%}, "
+                f"~{col['distinct_estimate']} distinct, min {col['min']!r}, max {col['max']!r}"
+                + (f", e.g. {samples}" if samples else "")
+            )
+        blocks.append("\n".join(lines))
+    if not catalog.get("statistics", True):
+        blocks.append("-- column statistics are being computed; read again shortly")
+    return "\n".join(blocks)
+
+if __name__ == "__main__":
+    from cache import data_version
+    from util import get_db_file_path
+
+    db_path = get_db_file_path()
+    catalog = SchemaCatalog(lambda: data_version(db_path))
+    conn = sqlite3.connect(db_path)
+    try:
+        print(catalog.get(conn)["text"])
+        started = time.perf_counter()
+        catalog.get(conn)
+        print(f"-- cached read: {(time.perf_counter() - started) * 1000:.3f} ms; {catalog.stats()}")
+    finally:
+        conn.close()
@@ -0,0 +1,174 @@
+# Client-side cache for idempotent MCP reads
+# Agents re-list tools and re-read the schema every turn, although the answers
+# only change when the server says so. ResponseCache keeps successful
+# responses of the list methods and of resources/read per method, each with
+# its own TTL and LRU bound (a ResultCache per method), and drops them when
+# the server sends notifications/*/list_changed or notifications/resources/updated.
+# A response that was in flight while such a notification arrived is not
+# stored, so a stale list cannot outlive the notification.
+#
+# Usage:
+#   client = AsyncMCPClient(server_command(), cache=ResponseCache())
+#   python client_cache.py      # agent turns with and without the cache, plus hit rates
+
+import json
+
+from cache import ResultCache
+
+# Seconds a response stays valid; methods not listed are never cached
+DEFAULT_TTLS = {
+    "tools/list": 300,
+    "resources/list": 300,
+    "resources/templates/list": 300,
+    "prompts/list": 300,
+    "resources/read": 60,
+}
+
+# Notification -> cached methods it invalidates
+INVALIDATED_BY = {
+    "notifications/tools/list_changed": ("tools/list",),
+    "notifications/resources/list_changed": ("resources/list", "resources/templates/list"),
+    "notifications/prompts/list_changed": ("prompts/list",),
+}
+
+class ResponseCache:
+    """Per-method TTL + LRU cache of successful responses to idempotent MCP requests."""
+
+    def __init__(self, ttls: dict = None, max_entries: int = 256, max_bytes: int = 8 * 1024 * 1024,
+                 uncacheable_uris: tuple = ("stats://", "metrics://")):
+        """ttls overrides DEFAULT_TTLS per method; a TTL <= 0 turns caching off for that method"""
+        ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._caches = {
+            method: ResultCache(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl)
+            for method, ttl in ttls.items() if ttl > 0
+        }
+        self.uncacheable_uris = tuple(uncacheable_uris)
+        # Bumped on every invalidation; a response is only stored if it did not change meanwhile
+        self._generations = dict.fromkeys(self._caches, 0)
+        self.coalesced = 0
+        self.notifications = 0
+
+    @staticmethod
+    def key(params) -> str:
+        return json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+
+    def cacheable(self, method: str, params=None) -> bool:
+        """True if responses to this request may be served from the cache"""
+        if method not in self._caches:
+            return False
+        if method == "resources/read":
+            # Counters and metrics change on every read
+            return not str((params or {}).get("uri", "")).startswith(self.uncacheable_uris)
+        return True
+
+    def get(self, method: str, params=None):
+        """Cached response, or None on a miss"""
+        encoded = self._caches[method].get(self.key(params))
+        # Stored as JSON text, so every hit decodes a fresh copy the caller may modify
+        return json.loads(encoded) if encoded is not None else None
+
+    def generation(self, method: str) -> int:
+        """Invalidation counter to pass to put() for a request about to be sent"""
+        return self._generations.get(method, 0)
+
+    def put(self, method: str, params, response: dict, generation: int):
+        """Store a successful response unless the method was invalidated since it was sent"""
+        result = response.get("result")
+        if result is None or (isinstance(result, dict) and result.get("isError")):
+            return
+        if self._generations.get(method, 0) != generation:
+            return
+        self._caches[method].put(self.key(params), json.dumps(response, separators=(",", ":")))
+
+    def invalidate(self, method: str, params=None):
+        """Drop one method (all params) or one request of it"""
+        cache = self._caches.get(method)
+        if cache is None:
+            return
+        self._generations[method] += 1
+        if params is None:
+            cache.invalidate()
+        else:
+            cache.discard(self.key(params))
+
+    def on_notification(self, message: dict):
+        """Apply a server notification; returns True if it invalidated anything"""
+        method = message.get("method")
+        if method == "notifications/resources/updated":
+            self.notifications += 1
+            uri = (message.get("params") or {}).get("uri")
+            self.invalidate("resources/read", {"uri": uri} if uri else None)
+            return True
+        if method in INVALIDATED_BY:
+            self.notifications += 1
+            for cached_method in INVALIDATED_BY[method]:
+                self.invalidate(cached_method)
+            return True
+        return False
+
+    def clear(self):
+        """Forget everything, e.g. after a new initialize"""
+        for method in self._caches:
+            self.invalidate(method)
+
+    def stats(self) -> dict:
+        """Hit rates overall and per method"""
+        methods = {method: cache.stats() for method, cache in self._caches.items()}
+        hits = sum(s["hits"] for s in methods.values())
+        misses = sum(s["misses"] for s in methods.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "coalesced": self.coalesced,
+            "invalidating_notifications": self.notifications,
+            "methods": {
+                method: {key: s[key] for key in
+                         ("entries", "hits", "misses", "hit_rate", "ttl_seconds", "expirations", "invalidations")}
+                for method, s in methods.items()
+            },
+        }
+
+async def agent_turns(client, turns: int) -> float:
+    """What an agent does every turn: re-list tools and resources, re-read the schema, run a query"""
+    import asyncio
+    import time
+
+    from mcp_client import TEST_QUERIES
+
+    started = time.perf_counter()
+    for turn in range(turns):
+        await asyncio.gather(
+            client.list_tools(),
+            client.list_resources(),
+            client.read_resource("schema://main"),
+        )
+        await client.call_tool("query_data", {"sql": TEST_QUERIES[turn % len(TEST_QUERIES)]})
+    return time.perf_counter() - started
+
+async def measure_client_cache(server_command: list, turns: int = 50) -> dict:
+    """Per-turn time of an agent loop without and with the client cache"""
+    from mcp_client import AsyncMCPClient
+
+    results = {"turns": turns}
+    for name, cache in (("uncached", None), ("cached", ResponseCache())):
+        client = AsyncMCPClient(server_command, cache=cache)
+        await client.start_server()
+        try:
+            await client.initialize()
+            await agent_turns(client, 1)
+            elapsed = await agent_turns(client, turns)
+        finally:
+            await client.stop_server()
+        results[f"{name}_turn_ms"] = round(elapsed / turns * 1000, 3)
+        if cache is not None:
+            results["cache"] = cache.stats()
+    results["speedup"] = round(results["uncached_turn_ms"] / results["cached_turn_ms"], 2)
+    return results
+
+if __name__ == "__main__":
+    import asyncio
+
+    from launcher import server_command
+
+    print(json.dumps(asyncio.run(measure_client_cache(server_command())), indent=2))
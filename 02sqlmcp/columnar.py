@@ -0,0 +1,592 @@
+# Memory-mapped columnar snapshots for vectorized aggregates
+# SQLite stores rows: a COUNT/AVG/MAX over one column still reads every page of
+# the table. write_snapshot() (init_sqlite --columnar) additionally stores each
+# column of a loaded table as a typed NumPy array on disk:
+#
+#   int / float   int64 or float64 values plus a boolean NULL mask (if any NULLs)
+#   text          int32 codes into a sorted dictionary, -1 for NULL
+#   mixed         numbers and text in one column, or blobs: only the NULL mask;
+#                 COUNT and IS [NOT] NULL work, everything else runs in SQLite
+#
+# ColumnarStore opens them with np.load(mmap_mode="r"): nothing is copied on
+# open, pages are read on first touch, and every server process mapping the
+# same files shares them through the OS page cache. aggregate_columns in
+# mcp_server.py answers COUNT/SUM/TOTAL/AVG/MIN/MAX with AND-ed comparison
+# filters and GROUP BY from those arrays, and runs the same query in SQLite
+# when the snapshot is missing, stale or cannot answer it. A snapshot records a
+# checksum of the table's rows; whenever the database file changes the live
+# table is checksummed again, so in-place UPDATEs are caught as well.
+#
+# Usage:
+#   python -m 02sqlmcp.init_sqlite --columnar   # load the CSV and write data/columnar/titanic
+#   python columnar.py                          # SQLite vs. NumPy time by row count
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+SNAPSHOT_VERSION = 3
+# Largest key space grouped by direct indexing; larger ones are sorted with np.unique
+DENSE_GROUP_SPAN = 1 << 20
+
+IDENT = r'(?:[A-Za-z_][A-Za-z0-9_]*|"(?:[^"]|"")+")'
+AGGREGATE = re.compile(
+    rf"^(?P<fn>COUNT|SUM|TOTAL|AVG|MIN|MAX)\s*\(\s*(?P<arg>\*|{IDENT})\s*\)(?:\s+(?:AS\s+)?(?P<alias>{IDENT}))?$",
+    re.IGNORECASE,
+)
+FILTER = re.compile(
+    rf"^(?P<column>{IDENT})\s*(?:(?P<op>==|=|!=|<>|<=|>=|<|>)\s*"
+    r"(?P<value>'(?:[^']|'')*'|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+    r"|\s+IS\s+(?P<null>NOT\s+)?NULL)$",
+    re.IGNORECASE,
+)
+# AND outside string literals
+AND = re.compile(r"\s+AND\s+(?=(?:[^']*'[^']*')*[^']*$)", re.IGNORECASE)
+# Table names usable as snapshot directory names
+PLAIN_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+class Unsupported(Exception):
+    """The snapshot cannot answer this query; run it in SQLite instead."""
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _unquote(name: str) -> str:
+    return name[1:-1].replace('""', '"') if name.startswith('"') else name
+
+def _split_list(text: str) -> list:
+    """Comma-separated items outside parentheses and quotes"""
+    items, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(text + ","):
+        if ch == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            if text[start:i].strip():
+                items.append(text[start:i].strip())
+            start = i + 1
+    return items
+
+def parse_aggregate_request(table: str, aggregates: str = "COUNT(*)", where: str = "", group_by: str = "") -> dict:
+    """Validated query spec from the aggregate_columns arguments; ValueError on bad syntax"""
+    table = table.strip()
+    if not re.fullmatch(IDENT, table):
+        raise ValueError(f"invalid table name: {table}")
+    spec = {"table": _unquote(table), "aggregates": [], "filters": [], "group_by": []}
+    for item in _split_list(aggregates or "COUNT(*)"):
+        match = AGGREGATE.match(item)
+        if not match:
+            raise ValueError(f"unsupported aggregate '{item}', expected FN(column) with FN one of "
+                             "COUNT, SUM, TOTAL, AVG, MIN, MAX")
+        fn, arg = match.group("fn").upper(), match.group("arg")
+        if arg == "*" and fn != "COUNT":
+            raise ValueError(f"{fn}(*) is not valid")
+        label = _unquote(match.group("alias")) if match.group("alias") else re.sub(r"\s+", "", item)
+        spec["aggregates"].append((fn, None if arg == "*" else _unquote(arg), label))
+    for term in AND.split(where.strip()) if where and where.strip() else ():
+        match = FILTER.match(term.strip())
+        if not match:
+            raise ValueError(f"unsupported filter '{term}', expected column <op> literal or column IS [NOT] NULL")
+        column = _unquote(match.group("column"))
+        if match.group("op"):
+            raw = match.group("value")
+            if raw.startswith("'"):
+                value = raw[1:-1].replace("''", "'")
+            else:
+                value = float(raw) if re.search(r"[.eE]", raw) else int(raw)
+            op = {"==": "=", "<>": "!="}.get(match.group("op"), match.group("op"))
+            spec["filters"].append((column, op, value))
+        else:
+            spec["filters"].append((column, "IS NOT NULL" if match.group("null") else "IS NULL", None))
+    for item in _split_list(group_by or ""):
+        if not re.fullmatch(IDENT, item):
+            raise ValueError(f"GROUP BY takes column names, got '{item}'")
+        spec["group_by"].append(_unquote(item))
+    return spec
+
+def _sql_literal(value) -> str:
+    return "'" + value.replace("'", "''") + "'" if isinstance(value, str) else repr(value)
+
+def aggregate_sql(spec: dict) -> str:
+    """The SQLite statement equivalent to a spec"""
+    select = [quote_identifier(c) for c in spec["group_by"]] + [
+        f"{fn}({'*' if column is None else quote_identifier(column)}) AS {quote_identifier(label)}"
+        for fn, column, label in spec["aggregates"]
+    ]
+    sql = f"SELECT {', '.join(select)} FROM {quote_identifier(spec['table'])}"
+    if spec["filters"]:
+        sql += " WHERE " + " AND ".join(
+            f"{quote_identifier(c)} {op}" + ("" if value is None else f" {_sql_literal(value)}")
+            for c, op, value in spec["filters"]
+        )
+    if spec["group_by"]:
+        sql += " GROUP BY " + ", ".join(quote_identifier(c) for c in spec["group_by"])
+    return sql
+
+def _table_stamp(conn: sqlite3.Connection, table: str) -> dict:
+    """Row count, max rowid, DDL and content checksum of a table; a snapshot is current while they match"""
+    ddl = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    if ddl is None:
+        raise ValueError(f"no such table: {table}")
+    rows, max_rowid = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {quote_identifier(table)}").fetchone()
+    return {"rows": rows, "max_rowid": max_rowid, "table_sql": ddl[0]}
+
+def _table_checksum(conn: sqlite3.Connection, table: str) -> str:
+    """BLAKE2b over every row in rowid order; repr keeps 1, 1.0 and '1' apart"""
+    digest = hashlib.blake2b(digest_size=16)
+    cursor = conn.execute(f"SELECT rowid, * FROM {quote_identifier(table)} ORDER BY rowid")
+    while True:
+        rows = cursor.fetchmany(10_000)
+        if not rows:
+            return digest.hexdigest()
+        digest.update(repr(rows).encode("utf-8"))
+
+def snapshot_name(name: str) -> str:
+    """The table name as a snapshot directory; only plain identifiers qualify"""
+    if not PLAIN_NAME.fullmatch(name):
+        raise Unsupported(f"table name {name!r} is not a plain identifier")
+    return name
+
+def write_snapshot(conn: sqlite3.Connection, table: str, root: str) -> dict:
+    """Write one .npy file per column of table under root/table and swap it in atomically"""
+    started = time.perf_counter()
+    snapshot_name(table)
+    stamp = {**_table_stamp(conn, table), "checksum": _table_checksum(conn, table)}
+    target = os.path.join(root, table)
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    columns = []
+    try:
+        info = conn.execute(f"PRAGMA table_info({quote_identifier(table)})").fetchall()
+        for i, (_, name, declared, *_) in enumerate(info):
+            # One column at a time keeps peak memory at one column of Python objects
+            values = [row[0] for row in conn.execute(
+                f"SELECT {quote_identifier(name)} FROM {quote_identifier(table)} ORDER BY rowid")]
+            kinds = {type(v) for v in values if v is not None}
+            nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+            column = {"name": name, "type": declared, "file": f"c{i}.npy", "nulls": None}
+            if kinds <= {int, float}:
+                column["kind"] = "int" if kinds <= {int} else "float"
+                dtype = np.int64 if column["kind"] == "int" else np.float64
+                fill = 0 if column["kind"] == "int" else np.nan
+                data = np.fromiter((fill if v is None else v for v in values), dtype=dtype, count=len(values))
+                if nulls.any():
+                    column["nulls"] = f"c{i}.nulls.npy"
+                    np.save(os.path.join(staging, column["nulls"]), nulls)
+            elif kinds <= {str}:
+                # Sorted dictionary: code order is SQLite's BINARY collation order
+                column["kind"] = "text"
+                dictionary = sorted(set(v for v in values if v is not None))
+                codes = {value: code for code, value in enumerate(dictionary)}
+                data = np.fromiter((-1 if v is None else codes[v] for v in values), dtype=np.int32, count=len(values))
+                column["dictionary"] = dictionary
+            else:
+                # SQLite orders numbers before text before blobs; no one array keeps that
+                column["kind"], column["file"], data = "mixed", None, None
+                if nulls.any():
+                    column["nulls"] = f"c{i}.nulls.npy"
+                    np.save(os.path.join(staging, column["nulls"]), nulls)
+            if data is not None:
+                np.save(os.path.join(staging, column["file"]), data)
+            columns.append(column)
+        manifest = {"snapshot": SNAPSHOT_VERSION, "table": table, **stamp,
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "columns": columns}
+        with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        # Readers holding the old files keep their mappings; new opens see the new directory
+        retired = f"{target}.old-{os.getpid()}"
+        if os.path.exists(target):
+            os.replace(target, retired)
+        os.replace(staging, target)
+        shutil.rmtree(retired, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return {
+        "path": target,
+        "rows": stamp["rows"],
+        "columns": {c["name"]: c["kind"] for c in columns},
+        "bytes": sum(os.path.getsize(os.path.join(target, f)) for f in os.listdir(target)),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+def _require_single_kind(column: dict, operation: str):
+    if column["kind"] == "mixed":
+        raise Unsupported(f"{operation} on column {column['name']}, which mixes types or holds blobs")
+
+class ColumnarSnapshot:
+    """Read-only, memory-mapped columns of one table snapshot."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("snapshot") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version in {directory}")
+        self.rows = self.manifest["rows"]
+        self._columns = {c["name"].lower(): c for c in self.manifest["columns"]}
+        self._arrays = {}
+        self._lock = threading.Lock()
+        # Data version of the last check against the live table, and its verdict
+        self.checked_version = None
+        self.current = False
+
+    def column(self, name: str) -> dict:
+        column = self._columns.get(name.lower())
+        if column is None:
+            raise ValueError(f"no such column: {name}")
+        return column
+
+    def _map(self, file: str):
+        """np.load with mmap_mode: a view of the file, no copy, shared through the page cache"""
+        array = self._arrays.get(file)
+        if array is None:
+            with self._lock:
+                array = self._arrays.get(file)
+                if array is None:
+                    array = self._arrays[file] = np.load(os.path.join(self.directory, file), mmap_mode="r")
+        return array
+
+    def values(self, column: dict):
+        return self._map(column["file"])
+
+    def valid(self, column: dict):
+        """Mask of non-NULL rows, or None when the column has no NULLs"""
+        if column["kind"] == "text":
+            return self.values(column) >= 0
+        return ~self._map(column["nulls"]) if column["nulls"] else None
+
+    def mapped_bytes(self) -> int:
+        return sum(a.nbytes for a in list(self._arrays.values()))
+
+    def _compare(self, column: dict, op: str, value):
+        if op in ("IS NULL", "IS NOT NULL"):
+            valid = self.valid(column)
+            if valid is None:
+                valid = np.ones(self.rows, dtype=bool)
+            return ~valid if op == "IS NULL" else valid
+        _require_single_kind(column, op)
+        values = self.values(column)
+        if column["kind"] == "text":
+            if not isinstance(value, str):
+                raise Unsupported(f"text column {column['name']} compared with a number")
+            dictionary = column["dictionary"]
+            low, high = bisect_left(dictionary, value), bisect_right(dictionary, value)
+            if op == "=":
+                return values == low if low < high else np.zeros(self.rows, dtype=bool)
+            if op == "!=":
+                return (values >= 0) & (values != low) if low < high else values >= 0
+            if op == "<":
+                return (values >= 0) & (values < low)
+            if op == "<=":
+                return (values >= 0) & (values < high)
+            return values >= (high if op == ">" else low)
+        if isinstance(value, str):
+            raise Unsupported(f"numeric column {column['name']} compared with a string")
+        matched = {"=": np.equal, "!=": np.not_equal, "<": np.less, "<=": np.less_equal,
+                   ">": np.greater, ">=": np.greater_equal}[op](values, value)
+        valid = self.valid(column)
+        return matched if valid is None else matched & valid
+
+    def _group_codes(self, column: dict, selection):
+        """(codes with 0 for NULL and i + 1 for labels[i], labels) of a GROUP BY column over the selected rows"""
+        _require_single_kind(column, "GROUP BY")
+        values = self.values(column)[selection]
+        if column["kind"] == "text":
+            # Dictionary codes are already dense and in sort order
+            return values.astype(np.int64) + 1, column["dictionary"]
+        valid = self.valid(column)
+        valid = None if valid is None else valid[selection]
+        present = values if valid is None else values[valid]
+        codes = np.zeros(len(values), dtype=np.int64)
+        if column["kind"] == "int" and len(present) and int(present.max()) - int(present.min()) < DENSE_GROUP_SPAN:
+            # Small integer range: the offset is the code, no sort needed
+            low = int(present.min())
+            span = int(present.max()) - low + 1
+            dense = present - (low - 1)
+            labels = list(range(low, low + span))
+        else:
+            labels, dense = np.unique(present, return_inverse=True)
+            labels, dense = labels.tolist(), dense.reshape(-1) + 1
+        if valid is None:
+            codes[:] = dense
+        else:
+            codes[valid] = dense
+        return codes, labels
+
+    def _group(self, keys: list):
+        """(group of each selected row, code tuple of each group) in SQLite's GROUP BY order"""
+        radices = [len(labels) + 1 for _, labels in keys]
+        space = 1
+        for radix in radices:
+            space *= radix
+        if space > np.iinfo(np.int64).max:
+            # The combined key would wrap in int64: sort the code tuples themselves.
+            # Row order of np.unique(axis=0) is the same lexicographic GROUP BY order
+            present, groups = np.unique(np.stack([codes for codes, _ in keys], axis=1), axis=0, return_inverse=True)
+            return groups.reshape(-1), present.tolist()
+        # Mixed-radix key over the per-column codes; the first column is the most significant
+        combined = np.zeros(len(keys[0][0]), dtype=np.int64)
+        for (codes, _), radix in zip(keys, radices):
+            combined *= radix
+            combined += codes
+        if space <= DENSE_GROUP_SPAN:
+            present = np.flatnonzero(np.bincount(combined, minlength=space))
+            lookup = np.full(space, -1, dtype=np.int64)
+            lookup[present] = np.arange(len(present))
+            groups = lookup[combined]
+        else:
+            present, groups = np.unique(combined, return_inverse=True)
+            groups = groups.reshape(-1)
+        tuples = []
+        for key in present.tolist():
+            codes = []
+            for radix in reversed(radices):
+                key, code = divmod(key, radix)
+                codes.append(code)
+            tuples.append(codes[::-1])
+        return groups, tuples
+
+    def _reduce(self, fn: str, column, selection, selected: int, groups, group_count: int) -> list:
+        """One aggregate per group (groups is None for a single global group)"""
+        if column is None:
+            counts = np.bincount(groups, minlength=group_count) if groups is not None else [selected]
+            return [int(c) for c in counts]
+        if column["kind"] == "text" and fn in ("SUM", "TOTAL", "AVG"):
+            raise Unsupported(f"{fn} over text column {column['name']}")
+        if column["kind"] == "mixed":
+            if fn != "COUNT":
+                _require_single_kind(column, fn)
+            # COUNT(column) needs only the NULL mask
+            present = self.valid(column)
+            present = None if present is None else present[selection]
+            if groups is None:
+                return [selected if present is None else int(present.sum())]
+            return np.bincount(groups if present is None else groups[present], minlength=group_count).tolist()
+        values = self.values(column)[selection]
+        valid = self.valid(column)
+        if valid is not None:
+            valid = valid[selection]
+            values = values[valid]
+            if groups is not None:
+                groups = groups[valid]
+
+        if groups is None:
+            counts = [len(values)]
+            if fn == "COUNT" or not len(values):
+                reduced = [None]
+            elif fn in ("SUM", "TOTAL", "AVG"):
+                reduced = [values.sum()]
+            else:
+                reduced = [values.min() if fn == "MIN" else values.max()]
+        else:
+            counts = np.bincount(groups, minlength=group_count)
+            if fn == "COUNT":
+                reduced = [None] * group_count
+            elif fn in ("SUM", "TOTAL", "AVG") and column["kind"] == "float":
+                reduced = np.bincount(groups, weights=values, minlength=group_count)
+            else:
+                # Integer sums stay exact in int64; MIN/MAX start from the identity of the ufunc
+                if fn in ("SUM", "TOTAL", "AVG"):
+                    reduced, ufunc = np.zeros(group_count, dtype=np.int64), np.add
+                elif column["kind"] == "float":
+                    reduced = np.full(group_count, np.inf if fn == "MIN" else -np.inf)
+                    ufunc = np.minimum if fn == "MIN" else np.maximum
+                else:
+                    limits = np.iinfo(np.int64)
+                    reduced = np.full(group_count, limits.max if fn == "MIN" else limits.min, dtype=np.int64)
+                    ufunc = np.minimum if fn == "MIN" else np.maximum
+                ufunc.at(reduced, groups, values)
+            counts, reduced = counts.tolist(), list(reduced)
+
+        out = []
+        for count, value in zip(counts, reduced):
+            if fn == "COUNT":
+                out.append(int(count))
+            elif fn == "TOTAL":
+                out.append(float(value) if count else 0.0)
+            elif not count:
+                out.append(None)
+            elif fn == "AVG":
+                out.append(float(value) / count)
+            elif column["kind"] == "text":
+                out.append(column["dictionary"][int(value)])
+            else:
+                out.append(value.item())
+        return out
+
+    def aggregate(self, spec: dict) -> dict:
+        """{"columns", "rows", "rows_scanned"} of a spec, computed over the mapped arrays"""
+        # Without filters the slice keeps every column access a view of the mapping
+        selection = slice(None)
+        if spec["filters"]:
+            mask = None
+            for name, op, value in spec["filters"]:
+                matched = self._compare(self.column(name), op, value)
+                mask = matched if mask is None else np.logical_and(mask, matched, out=mask)
+            selection = np.flatnonzero(mask)
+        selected = self.rows if isinstance(selection, slice) else len(selection)
+
+        groups, group_rows, group_count = None, [()], 1
+        if spec["group_by"]:
+            keys = [self._group_codes(self.column(name), selection) for name in spec["group_by"]]
+            groups, tuples = self._group(keys)
+            group_count = len(tuples)
+            group_rows = [
+                tuple(None if code == 0 else labels[code - 1] for code, (_, labels) in zip(codes, keys))
+                for codes in tuples
+            ]
+        aggregates = [
+            self._reduce(fn, None if column is None else self.column(column), selection, selected, groups, group_count)
+            for fn, column, _ in spec["aggregates"]
+        ]
+        rows = [group_rows[g] + tuple(values[g] for values in aggregates) for g in range(group_count)]
+        return {
+            "columns": spec["group_by"] + [label for _, _, label in spec["aggregates"]],
+            "rows": rows,
+            "rows_scanned": selected,
+        }
+
+class ColumnarStore:
+    """Snapshots under one directory, opened on first use and checked against the live table."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self.used = 0
+        self.fallbacks = {}
+
+    def _fallback(self, reason: str):
+        with self._lock:
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        return None
+
+    def _open(self, table: str):
+        directory = os.path.join(self.root, table)
+        manifest = os.path.join(directory, "manifest.json")
+        try:
+            mtime = os.stat(manifest).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._snapshots.get(table.lower())
+            if entry is None or entry[0] != mtime:
+                # A rewritten snapshot is a new directory: drop the old mappings
+                try:
+                    snapshot = ColumnarSnapshot(directory)
+                except ValueError:
+                    # Written by an older columnar.py: init_sqlite --columnar rewrites it
+                    return None
+                entry = self._snapshots[table.lower()] = (mtime, snapshot)
+        return entry[1]
+
+    def aggregate(self, conn: sqlite3.Connection, spec: dict, version=None):
+        """Result of spec from the snapshot, or None when SQLite has to answer it"""
+        # Table names are case-insensitive in SQL but not on disk: use the stored name
+        row = conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE",
+                           (spec["table"],)).fetchone()
+        if row is None:
+            return self._fallback("no such table")
+        try:
+            table = snapshot_name(row[0])
+        except Unsupported as e:
+            return self._fallback(f"unsupported: {str(e)}")
+        snapshot = self._open(table)
+        if snapshot is None:
+            return self._fallback("no snapshot")
+        if version is None or snapshot.checked_version != version:
+            # The database changed since the last check (or never checked): the cheap
+            # stamp catches added rows and schema changes, the checksum in-place updates
+            stamp = _table_stamp(conn, table)
+            snapshot.current = all(snapshot.manifest.get(key) == value for key, value in stamp.items()) and (
+                snapshot.manifest.get("checksum") == _table_checksum(conn, table))
+            snapshot.checked_version = version
+        if not snapshot.current:
+            return self._fallback("stale snapshot")
+        try:
+            result = snapshot.aggregate(spec)
+        except Unsupported as e:
+            return self._fallback(f"unsupported: {str(e)}")
+        with self._lock:
+            self.used += 1
+        return result
+
+    def stats(self) -> dict:
+        """Open snapshots, mapped bytes, queries answered and fallback reasons"""
+        with self._lock:
+            snapshots = {name: {"rows": s.rows, "mapped_bytes": s.mapped_bytes(), "created": s.manifest["created"]}
+                         for name, (_, s) in self._snapshots.items()}
+            return {"root": self.root, "snapshots": snapshots, "used": self.used, "fallbacks": dict(self.fallbacks)}
+
+def measure_columnar(row_counts: list, repeats: int = 5) -> dict:
+    """SQLite vs. snapshot time of column aggregates on titanic copies of growing size"""
+    import math
+    import tempfile
+
+    from partition import build_benchmark_db
+    from util import get_db_file_path
+
+    requests = [
+        ("titanic", "COUNT(*), AVG(Age), MAX(Fare)", "", ""),
+        ("titanic", "COUNT(*) AS count", "", "Sex"),
+        ("titanic", "AVG(Age) AS avg_age", "Age IS NOT NULL", "Pclass"),
+        ("titanic", "COUNT(*), AVG(Fare), MAX(Age)", "Fare > 10 AND Embarked = 'S'", "Pclass, Sex"),
+    ]
+    report = {"cpus": os.cpu_count(), "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in row_counts:
+            path = os.path.join(tmp, f"titanic_{rows}.db")
+            build_benchmark_db(get_db_file_path(), path, rows)
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                write = write_snapshot(conn, "titanic", os.path.join(tmp, f"columnar_{rows}"))
+                store = ColumnarStore(os.path.join(tmp, f"columnar_{rows}"))
+                # The checksum check runs once per data version; keep it out of the timings
+                store.aggregate(conn, parse_aggregate_request(*requests[0]), version="bench")
+                sqlite_s = numpy_s = 0.0
+                matches = True
+                for args in requests:
+                    spec = parse_aggregate_request(*args)
+                    sql = aggregate_sql(spec)
+                    for _ in range(repeats):
+                        started = time.perf_counter()
+                        expected = conn.execute(sql).fetchall()
+                        sqlite_s += time.perf_counter() - started
+                        started = time.perf_counter()
+                        result = store.aggregate(conn, spec, version="bench")
+                        numpy_s += time.perf_counter() - started
+                    matches = matches and result is not None and len(result["rows"]) == len(expected) and all(
+                        a == b or (isinstance(a, float) and isinstance(b, float) and math.isclose(a, b, rel_tol=1e-9))
+                        for x, y in zip(expected, result["rows"]) for a, b in zip(x, y)
+                    )
+            finally:
+                conn.close()
+            report["runs"].append({
+                "rows": write["rows"],
+                "snapshot_bytes": write["bytes"],
+                "write_s": write["seconds"],
+                "sqlite_ms": round(sqlite_s / repeats * 1000, 2),
+                "columnar_ms": round(numpy_s / repeats * 1000, 2),
+                "speedup": round(sqlite_s / numpy_s, 1),
+                "results_match": matches,
+            })
+    return report
+
+if __name__ == "__main__":
+    print(json.dumps(measure_columnar([10_000, 100_000, 1_000_000]), indent=2))
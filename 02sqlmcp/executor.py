@@ -0,0 +1,141 @@
+# Bounded worker pool for SQL execution
+# FastMCP handles requests concurrently on one event loop, so a blocking
+# sqlite3 call inside a tool stalls every other request. QueryExecutor moves
+# the blocking work onto a fixed set of worker threads, each using its own
+# pooled read-only connection, and enforces a per-query deadline with a
+# SQLite progress handler (plus interrupt() as a backstop).
+
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import add_stage
+from util import LatencyStats
+
+class QueryTimeout(Exception):
+    """Raised when a query does not finish within its time budget."""
+
+class QueryExecutor:
+    """Runs fn(conn, *args) on a bounded thread pool with per-query timeouts."""
+
+    def __init__(self, pool, max_workers: int = 4, timeout: float = 30.0,
+                 progress_steps: int = 1000):
+        """Create the worker threads lazily; pool must allow at least max_workers connections"""
+        self.pool = pool
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.progress_steps = progress_steps
+        self._threads = ThreadPoolExecutor(self.max_workers, thread_name_prefix="sql-worker")
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.queue_wait = LatencyStats()
+        self.run_time = LatencyStats()
+
+    def _job(self, fn, args, submitted: float, deadline: float, state: dict):
+        """Worker-thread body: check out a connection, arm the deadline, run fn"""
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        self.queue_wait.record(started - submitted)
+        state["queue"] = started - submitted
+        try:
+            if started >= deadline:
+                raise QueryTimeout("query timed out while waiting for a free worker")
+            with self.pool.connection() as conn:
+                state["connect"] = time.monotonic() - started
+                conn.set_progress_handler(
+                    lambda: 1 if time.monotonic() >= deadline else 0, self.progress_steps
+                )
+                with state["lock"]:
+                    state["conn"] = conn
+                try:
+                    return fn(conn, *args)
+                except sqlite3.OperationalError as e:
+                    if "interrupted" in str(e):
+                        raise QueryTimeout(f"query exceeded its {deadline - submitted:.1f}s budget") from None
+                    raise
+                finally:
+                    # Cleared before the connection goes back to the pool, under the lock
+                    # run() interrupts with, so a late interrupt cannot hit its next user
+                    with state["lock"]:
+                        state["conn"] = None
+                    conn.set_progress_handler(None, 0)
+        finally:
+            self.run_time.record(time.monotonic() - started)
+            with self._lock:
+                self.running -= 1
+
+    async def run(self, fn, *args, timeout: float = None):
+        """Await fn(conn, *args) on a worker; the budget covers queueing and execution"""
+        budget = self.timeout if timeout is None else timeout
+        submitted = time.monotonic()
+        deadline = submitted + budget
+        state = {"conn": None, "lock": threading.Lock()}
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._threads, self._job, fn, args, submitted, deadline, state
+        )
+        try:
+            # The progress handler normally stops the query at the deadline;
+            # the grace period only matters if SQLite is stuck in one long opcode.
+            result = await asyncio.wait_for(asyncio.shield(future), budget + 1.0)
+        except asyncio.TimeoutError:
+            # Nobody awaits the worker any more; retrieve its outcome so it is not logged
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            with state["lock"]:
+                # Still this run's connection: the worker clears it under the same lock
+                if state["conn"] is not None:
+                    state["conn"].interrupt()
+            with self._lock:
+                self.timed_out += 1
+            raise QueryTimeout(f"query exceeded its {budget:.1f}s budget") from None
+        except QueryTimeout:
+            with self._lock:
+                self.timed_out += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            # Shows up in the request's trace (metrics://server) as its own stages
+            for stage_name in ("queue", "connect"):
+                if stage_name in state:
+                    add_stage(stage_name, state[stage_name])
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def shutdown(self):
+        """Stop accepting work and wait for running queries"""
+        self._threads.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Queue depth, outcome counters and queue/run latency percentiles"""
+        with self._lock:
+            counters = {
+                "max_workers": self.max_workers,
+                "timeout_seconds": self.timeout,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+            }
+        counters["queue_wait"] = self.queue_wait.summary()
+        counters["run_time"] = self.run_time.summary()
+        return counters
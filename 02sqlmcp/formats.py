@@ -0,0 +1,132 @@
+# Result encodings for query_data
+# text     - one Python repr tuple per line, metadata in a trailing '-- ' line
+# json     - {"columns": [...], "rows": [[...], ...]}
+# csv      - metadata comment line, header line, one CSV line per row
+# columnar - per-column arrays, low-cardinality string columns dictionary-encoded
+#
+# Usage:
+#   python formats.py        # Payload size and encode time per format for the test queries
+
+import json
+import time
+
+FORMATS = ("text", "json", "csv", "columnar")
+
+def _json_default(value):
+    """Make sqlite BLOBs (and anything else odd) JSON-serializable"""
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+def _dumps(payload: dict) -> str:
+    return json.dumps(payload, separators=(",", ":"), default=_json_default)
+
+def encode_text(columns, rows, meta=None) -> str:
+    """Original query_data output, plus a '-- key: value; ...' trailer when meta is given"""
+    text = "\n".join(str(row) for row in rows)
+    trailer = "; ".join(f"{key}: {value}" for key, value in (meta or {}).items() if value is not None)
+    if trailer:
+        text = f"{text}\n-- {trailer}" if text else f"-- {trailer}"
+    return text
+
+def encode_json(columns, rows, meta=None) -> str:
+    """Column header plus an array of row arrays"""
+    rows = rows if isinstance(rows, list) else list(rows)
+    payload = {"format": "json", "row_count": len(rows), "columns": columns, "rows": rows}
+    payload.update(meta or {})
+    return _dumps(payload)
+
+def encode_csv(columns, rows, meta=None) -> str:
+    """RFC 4180 CSV preceded by a '# format=csv rows=N' metadata line"""
+    # Imported here: only csv responses need them, and server startup should stay lean
+    import csv
+    import io
+
+    rows = rows if isinstance(rows, list) else list(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    writer.writerows(
+        [value.hex() if isinstance(value, bytes) else value for value in row]
+        for row in rows
+    )
+    header = f"# format=csv rows={len(rows)}"
+    for key, value in (meta or {}).items():
+        if value is not None:
+            if isinstance(value, str) and any(ch.isspace() for ch in value):
+                value = json.dumps(value)
+            header += f" {key}={value}"
+    return header + "\n" + buffer.getvalue()
+
+def encode_columnar(columns, rows, meta=None) -> str:
+    """Per-column arrays; string columns with many repeats become dictionary indexes"""
+    rows = rows if isinstance(rows, list) else list(rows)
+    data = {}
+    dictionaries = {}
+    for index, name in enumerate(columns):
+        values = [row[index] for row in rows]
+        non_null = [v for v in values if v is not None]
+        if non_null and all(isinstance(v, str) for v in non_null):
+            distinct = list(dict.fromkeys(non_null))
+            if len(distinct) * 2 <= len(non_null):
+                positions = {value: i for i, value in enumerate(distinct)}
+                dictionaries[name] = distinct
+                values = [None if v is None else positions[v] for v in values]
+        data[name] = values
+    payload = {"format": "columnar", "row_count": len(rows), "columns": columns, "data": data}
+    if dictionaries:
+        payload["dictionaries"] = dictionaries
+    payload.update(meta or {})
+    return _dumps(payload)
+
+ENCODERS = {
+    "text": encode_text,
+    "json": encode_json,
+    "csv": encode_csv,
+    "columnar": encode_columnar,
+}
+
+def encode(fmt: str, columns, rows, meta=None) -> str:
+    """Encode rows in the named format"""
+    try:
+        encoder = ENCODERS[fmt]
+    except KeyError:
+        raise ValueError(f"unknown format '{fmt}', expected one of {', '.join(FORMATS)}") from None
+    return encoder(columns, rows, meta)
+
+def benchmark_formats(conn, queries, repeat: int = 20) -> list:
+    """Payload bytes and mean encode time per (query, format)"""
+    results = []
+    for sql in queries:
+        cursor = conn.execute(sql)
+        columns = [col[0] for col in cursor.description or ()]
+        rows = cursor.fetchall()
+        for fmt in FORMATS:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                payload = encode(fmt, columns, rows)
+            elapsed = (time.perf_counter() - start) / repeat
+            results.append({
+                "sql": sql,
+                "format": fmt,
+                "rows": len(rows),
+                "bytes": len(payload.encode("utf-8")),
+                "encode_ms": round(elapsed * 1000, 4),
+            })
+    return results
+
+if __name__ == "__main__":
+    import sqlite3
+
+    from mcp_client import TEST_QUERIES
+    from util import get_db_file_path
+
+    conn = sqlite3.connect(get_db_file_path())
+    try:
+        queries = TEST_QUERIES + ["SELECT * FROM titanic"]
+        print(f"{'format':<10} {'rows':>6} {'bytes':>10} {'encode ms':>10}  sql")
+        for item in benchmark_formats(conn, queries):
+            print(f"{item['format']:<10} {item['rows']:>6} {item['bytes']:>10} "
+                  f"{item['encode_ms']:>10}  {item['sql']}")
+    finally:
+        conn.close()
@@ -0,0 +1,243 @@
+# Byte-level framing for newline-delimited JSON-RPC over stdio
+# The clients used to read the server's stdout in unbuffered text mode, one
+# readline() (and one str decode) per message, and wrote every request with
+# its own write + flush. This module keeps everything in bytes instead:
+# LineFramer splits large reads on b"\n" and hands out memoryview slices that
+# are decoded straight to JSON (with orjson when it is installed), and
+# CoalescingWriter gathers the requests of one event-loop tick into a single
+# pipe write.
+#
+# Usage:
+#   python framing.py        # MB/s for large query_data payloads: text vs. byte transport
+#
+# SQLMCP_JSON=json forces the standard library json module.
+
+import asyncio
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+USE_ORJSON = orjson is not None and os.environ.get("SQLMCP_JSON", "").lower() != "json"
+JSON_BACKEND = "orjson" if USE_ORJSON else "json"
+
+READ_SIZE = 1 << 20
+
+def loads(data):
+    """Decode JSON from bytes, bytearray or memoryview"""
+    if USE_ORJSON:
+        return orjson.loads(data)
+    # str() decodes straight from the buffer; json.loads(bytes) would sniff the encoding first
+    return json.loads(str(data, "utf-8"))
+
+def dumps(message) -> bytes:
+    """Encode one message as compact JSON bytes (no trailing newline)"""
+    if USE_ORJSON:
+        return orjson.dumps(message)
+    return json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+class LineFramer:
+    """Splits a byte stream into newline-terminated frames without decoding text."""
+
+    def __init__(self):
+        self._partial = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        """Return the complete frames in data (memoryviews), keeping any trailing partial line"""
+        frames = []
+        start = 0
+        if self._partial:
+            newline = data.find(b"\n")
+            if newline < 0:
+                self._partial += data
+                return frames
+            self._partial += data[:newline]
+            frames.append(memoryview(bytes(self._partial)))
+            self._partial = bytearray()
+            start = newline + 1
+        view = memoryview(data)
+        while True:
+            newline = data.find(b"\n", start)
+            if newline < 0:
+                break
+            frames.append(view[start:newline])
+            start = newline + 1
+        if start < len(data):
+            self._partial += view[start:]
+        # Windows servers write \r\n; blank lines carry nothing
+        return [f[:-1] if f[-1:] == b"\r" else f for f in frames if len(f) and f != b"\r"]
+
+class CoalescingWriter:
+    """Buffers outgoing frames and hands them to the pipe in one write per loop tick."""
+
+    def __init__(self, writer: asyncio.StreamWriter, max_buffer: int = READ_SIZE):
+        self.writer = writer
+        self.max_buffer = max_buffer
+        self._chunks = []
+        self._size = 0
+        self._scheduled = False
+        self._flushed = None
+        self.writes = 0
+        self.frames = 0
+
+    def send(self, frame: bytes):
+        """Queue one frame (newline appended); it is written at the end of this loop tick"""
+        self._chunks.append(frame)
+        self._chunks.append(b"\n")
+        self._size += len(frame) + 1
+        self.frames += 1
+        if self._size >= self.max_buffer:
+            self.flush()
+        elif not self._scheduled:
+            self._scheduled = True
+            loop = asyncio.get_running_loop()
+            self._flushed = loop.create_future()
+            loop.call_soon(self.flush)
+
+    def flush(self):
+        """Write everything queued so far as one chunk"""
+        self._scheduled = False
+        flushed, self._flushed = self._flushed, None
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            self._size = 0
+            self.writes += 1
+            self.writer.write(data)
+        if flushed is not None and not flushed.done():
+            flushed.set_result(None)
+
+    async def drain(self):
+        """Wait for the scheduled flush, then for the pipe to take the data (backpressure)"""
+        if self._flushed is not None:
+            await asyncio.shield(self._flushed)
+        await self.writer.drain()
+
+def read_frames_text(stream) -> list:
+    """Previous client behaviour: text-mode readline() and json.loads per message"""
+    messages = []
+    for line in iter(stream.readline, ""):
+        if line.strip():
+            messages.append(json.loads(line))
+    return messages
+
+def read_frames_binary(fd: int) -> list:
+    """Byte transport: large os.read() calls, LineFramer, decode from memoryview"""
+    framer = LineFramer()
+    messages = []
+    while True:
+        chunk = os.read(fd, READ_SIZE)
+        if not chunk:
+            break
+        messages.extend(loads(frame) for frame in framer.feed(chunk))
+    return messages
+
+def measure_transport(payload: bytes, copies: int = 200) -> dict:
+    """MB/s reading copies of one response line through a pipe, text vs. byte transport"""
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(payload.rstrip(b"\n") + b"\n")
+        path = f.name
+    # A child process replays the response stream as fast as the pipe takes it
+    writer = (
+        "import sys\n"
+        f"data = open({path!r}, 'rb').read()\n"
+        f"for _ in range({copies}): sys.stdout.buffer.write(data)\n"
+    )
+    total_mb = len(payload) * copies / (1024 * 1024)
+    results = {"payload_bytes": len(payload), "messages": copies, "json_backend": JSON_BACKEND}
+    try:
+        for name in ("text", "binary"):
+            text = name == "text"
+            process = subprocess.Popen(
+                [sys.executable, "-c", writer], stdout=subprocess.PIPE,
+                text=text, bufsize=0 if text else -1,
+            )
+            started = time.perf_counter()
+            if text:
+                messages = read_frames_text(process.stdout)
+            else:
+                messages = read_frames_binary(process.stdout.fileno())
+            elapsed = time.perf_counter() - started
+            process.wait()
+            assert len(messages) == copies
+            results[f"{name}_mb_per_second"] = round(total_mb / elapsed, 1)
+    finally:
+        os.unlink(path)
+    results["speedup"] = round(results["binary_mb_per_second"] / results["text_mb_per_second"], 2)
+    return results
+
+async def measure_end_to_end(server_command: list, sql: str, calls: int = 50) -> dict:
+    """MB/s of large query_data responses through the async client and a live server"""
+    import time
+
+    from mcp_client import AsyncMCPClient
+
+    client = AsyncMCPClient(server_command)
+    await client.start_server()
+    try:
+        await client.initialize()
+        first = await client.call_tool("query_data", {"sql": sql, "format": "json"})
+        size = len(dumps(first))
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            client.call_tool("query_data", {"sql": sql, "format": "json"}) for _ in range(calls)
+        ])
+        elapsed = time.perf_counter() - started
+        writes = client.writer_stats()
+    finally:
+        await client.stop_server()
+    return {
+        "response_bytes": size,
+        "calls": calls,
+        "mb_per_second": round(size * calls / (1024 * 1024) / elapsed, 1),
+        "requests_written": writes["frames"],
+        "pipe_writes": writes["writes"],
+    }
+
+def capture_response(server_command: list, sql: str) -> bytes:
+    """Raw response line of one query_data call, as the server wrote it"""
+    import subprocess
+
+    process = subprocess.Popen(server_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    try:
+        requests = [
+            {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+                "protocolVersion": "2024-11-05", "capabilities": {},
+                "clientInfo": {"name": "framing-benchmark", "version": "1.0.0"}}},
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {
+                "name": "query_data", "arguments": {"sql": sql, "format": "json"}}},
+        ]
+        process.stdin.write(b"".join(dumps(r) + b"\n" for r in requests))
+        process.stdin.flush()
+        framer = LineFramer()
+        while True:
+            chunk = os.read(process.stdout.fileno(), READ_SIZE)
+            if not chunk:
+                raise RuntimeError("server exited before answering")
+            for frame in framer.feed(chunk):
+                if loads(frame).get("id") == 2:
+                    return frame.tobytes()
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    from launcher import server_command
+
+    server = server_command()
+    sql = "SELECT * FROM titanic"
+    payload = capture_response(server, sql)
+    print(json.dumps({
+        "transport": measure_transport(payload),
+        "end_to_end": asyncio.run(measure_end_to_end(server, sql)),
+    }, indent=2))
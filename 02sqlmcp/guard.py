@@ -0,0 +1,177 @@
+# Pre-flight cost guard for agent SQL
+# LLM-generated SQL often scans whole tables or builds cartesian joins. Before
+# a read query runs, CostGuard asks SQLite for its EXPLAIN QUERY PLAN, turns
+# the plan into a rough estimate of rows visited, and rejects statements that
+# would blow the row or time budget. Results are additionally capped at
+# max_result_rows (an automatic LIMIT applied while fetching).
+
+import re
+import sqlite3
+import threading
+
+from cache import data_version
+
+# Aggregates and DISTINCT must see every input row before producing output
+BLOCKING_SQL = re.compile(
+    r"\b(count|sum|avg|min|max|total|group_concat)\s*\(|\bdistinct\b", re.IGNORECASE
+)
+# LIMIT n, LIMIT n OFFSET m and LIMIT m, n at the end of the statement
+EXPLICIT_LIMIT = re.compile(
+    r"\bLIMIT\s+(?P<first>[-+]?\d+)(?:\s*(?P<comma>,)\s*|\s+OFFSET\s+)?(?P<second>(?<=[\s,])[-+]?\d+)?\s*;?\s*$",
+    re.IGNORECASE,
+)
+LOOP_STEP = re.compile(r"^(SCAN|SEARCH)( TABLE)? (\S+)(.*)$")
+
+def explicit_limit(sql: str):
+    """(limit or None for no limit, offset) of the statement's trailing LIMIT clause, or None"""
+    match = EXPLICIT_LIMIT.search(sql)
+    if not match:
+        return None
+    first, second = int(match.group("first")), match.group("second")
+    if second is None:
+        limit, offset = first, 0
+    elif match.group("comma"):
+        offset, limit = first, int(second)
+    else:
+        limit, offset = first, int(second)
+    # A negative LIMIT means no limit; a negative OFFSET counts as zero
+    return (limit if limit >= 0 else None), max(0, offset)
+
+class QueryRejected(Exception):
+    """Raised when a query's estimated cost is over budget."""
+
+class CostGuard:
+    """Estimates query cost from EXPLAIN QUERY PLAN and enforces row/time budgets."""
+
+    def __init__(self, db_path: str, max_scan_rows: int = 5_000_000,
+                 max_result_rows: int = 10_000, time_budget: float = 30.0,
+                 rows_per_second: int = 2_000_000, extra_rows=None):
+        """Budgets: rows visited, rows returned, and seconds at rows_per_second
+
+        extra_rows returns row counts of tables outside the main database
+        (attached sources), which are not in its sqlite_master.
+        """
+        self.db_path = db_path
+        self.extra_rows = extra_rows
+        self.max_scan_rows = max_scan_rows
+        self.max_result_rows = max_result_rows
+        self.time_budget = time_budget
+        self.rows_per_second = max(1, rows_per_second)
+
+        self._lock = threading.Lock()
+        self._row_counts = {}
+        self._version = None
+        self.checked = 0
+        self.rejected = 0
+
+    def _table_rows(self, conn: sqlite3.Connection) -> dict:
+        """Approximate row count per table, refreshed when the data changes"""
+        version = data_version(self.db_path)
+        with self._lock:
+            if version == self._version:
+                return self._row_counts
+        counts = {}
+        tables = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for (name,) in tables:
+            quoted = '"' + name.replace('"', '""') + '"'
+            try:
+                # max(rowid) is an O(log n) stand-in for count(*) on rowid tables
+                counts[name.lower()] = conn.execute(f"SELECT max(rowid) FROM {quoted}").fetchone()[0] or 0
+            except sqlite3.Error:
+                counts[name.lower()] = conn.execute(f"SELECT count(*) FROM {quoted}").fetchone()[0]
+        with self._lock:
+            self._row_counts, self._version = counts, version
+        return counts
+
+    def explain(self, conn: sqlite3.Connection, sql: str) -> list:
+        """EXPLAIN QUERY PLAN rows as (id, parent, detail)"""
+        # EXPLAIN never checks the schema cookie, so a long-lived connection
+        # would keep planning against the schema it loaded first (missing new
+        # indexes). A real read reloads the schema, and tagging the statement
+        # with the schema version keeps sqlite3's statement cache from
+        # handing back a plan prepared against the old one.
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        schema = conn.execute("PRAGMA schema_version").fetchone()[0]
+        rows = conn.execute(f"EXPLAIN QUERY PLAN /* schema {schema} */ {sql}")
+        return [(row[0], row[1], row[3]) for row in rows]
+
+    def _step_rows(self, detail: str, table_rows: dict) -> int:
+        """Rows visited by one SCAN/SEARCH step of the plan"""
+        if "CONSTANT ROW" in detail:
+            return 1
+        match = LOOP_STEP.match(detail)
+        name, rest = match.group(3).lower(), match.group(4)
+        # Plans name aliases rather than tables; assume the worst for unknown names
+        rows = table_rows.get(name, max(table_rows.values(), default=1000))
+        if match.group(1) == "SCAN":
+            return max(1, rows)
+        if "USING" not in rest or ("PRIMARY KEY" in rest and "=?" in rest):
+            return 1
+        if "<" in rest or ">" in rest:
+            return max(1, rows // 4)
+        return max(1, rows // 100)
+
+    def _cost(self, nodes: dict, parent: int, table_rows: dict) -> int:
+        """Nested loops multiply, sub-queries and compound members add"""
+        loop_cost, has_loop, extra = 1, False, 0
+        for node_id, detail in nodes.get(parent, []):
+            if LOOP_STEP.match(detail):
+                loop_cost *= self._step_rows(detail, table_rows)
+                has_loop = True
+            extra += self._cost(nodes, node_id, table_rows)
+        return (loop_cost if has_loop else 0) + extra
+
+    def check(self, conn: sqlite3.Connection, sql: str, row_cap: int = None) -> dict:
+        """Explain and estimate a read query; raise QueryRejected if it is over budget
+
+        row_cap is how many rows the caller will fetch at most (default max_result_rows).
+        """
+        plan = self.explain(conn, sql)
+        nodes = {}
+        for node_id, parent, detail in plan:
+            nodes.setdefault(parent, []).append((node_id, detail))
+        table_rows = self._table_rows(conn)
+        if self.extra_rows is not None:
+            # Unqualified names resolve to main first, so its counts win
+            table_rows = {**self.extra_rows(), **table_rows}
+        estimated = self._cost(nodes, 0, table_rows)
+
+        # A streaming plan stops as soon as the fetch cap (or its own LIMIT) is hit
+        streaming = not BLOCKING_SQL.search(sql) and not any("TEMP B-TREE" in d for _, _, d in plan)
+        if streaming:
+            cap = row_cap if row_cap is not None else self.max_result_rows + 1
+            clause = explicit_limit(sql)
+            if clause:
+                # Rows skipped by OFFSET are still stepped through
+                limit, offset = clause
+                cap = offset + (cap if limit is None else min(cap, limit))
+            estimated = min(estimated, max(cap, 1))
+
+        summary = "; ".join(detail for _, _, detail in plan)
+        seconds = estimated / self.rows_per_second
+        with self._lock:
+            self.checked += 1
+        if estimated > self.max_scan_rows or seconds > self.time_budget:
+            with self._lock:
+                self.rejected += 1
+            raise QueryRejected(
+                f"query rejected by cost guard: about {estimated:,} rows visited "
+                f"(budget {self.max_scan_rows:,}, ~{seconds:.1f}s of {self.time_budget:.0f}s). "
+                f"Plan: {summary}. Add selective WHERE conditions or a LIMIT, "
+                f"and join on key columns instead of building cross products."
+            )
+        return {"plan": summary, "estimated_rows": estimated}
+
+    def stats(self) -> dict:
+        """Counters and current budgets"""
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "rejected": self.rejected,
+                "max_scan_rows": self.max_scan_rows,
+                "max_result_rows": self.max_result_rows,
+                "time_budget_seconds": self.time_budget,
+                "rows_per_second": self.rows_per_second,
+            }
@@ -0,0 +1,303 @@
+# Streamable HTTP / SSE serving mode
+# Over stdio every editor or agent starts its own server process, with its own
+# connection pool, result cache and schema catalog. Served over HTTP, one
+# process under uvicorn handles any number of MCP sessions, and they all share
+# those module-level objects. Because they share them, one greedy session could
+# take every SQL worker, so each session is limited:
+#
+#   in flight  requests running at once; more wait for a slot (SQLMCP_SESSION_MAX_IN_FLIGHT)
+#   rate       requests per second with a burst allowance; excess requests get
+#              a JSON-RPC error (SQLMCP_SESSION_RATE, SQLMCP_SESSION_BURST, 0 = off)
+#   sessions   concurrent sessions per server; a new session beyond it gets
+#              HTTP 503 (SQLMCP_MAX_SESSIONS)
+#   idle       a streamable HTTP session without requests for this long is ended
+#              as if its client had sent DELETE (SQLMCP_SESSION_IDLE_S, 0 = never)
+#
+# Usage:
+#   run_http(mcp)                               # streamable HTTP on 127.0.0.1:8000/mcp
+#   run_http(mcp, transport="sse", port=8001)   # legacy SSE transport on /sse
+#   limits.stats()                              # per-session counters
+
+import asyncio
+import time
+import weakref
+
+import mcp.types as types
+from mcp.shared.exceptions import McpError
+
+RATE_LIMITED = -32000
+
+# Requests that are never limited: the handshake and liveness checks
+UNLIMITED = (types.InitializeRequest, types.PingRequest)
+
+class _SessionState:
+    """In-flight slots and token bucket of one MCP session."""
+
+    __slots__ = ("slots", "tokens", "refilled", "requests", "running", "waited", "rejected", "__weakref__")
+
+    def __init__(self, max_in_flight: int, burst: float):
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.tokens = burst
+        self.refilled = time.monotonic()
+        self.requests = 0
+        self.running = 0
+        self.waited = 0
+        self.rejected = 0
+
+class SessionLimits:
+    """Per-session in-flight and rate limits for the request handlers of a FastMCP server."""
+
+    def __init__(self, max_in_flight: int = 4, rate: float = 0, burst: float = 0):
+        """rate is requests per second per session (0 = unlimited); burst defaults to one second of rate"""
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        # Keyed by the SDK's session object, so state goes away with the session
+        self._sessions = weakref.WeakKeyDictionary()
+        self.sessions_seen = 0
+        self.rejected = 0
+
+    def _state(self, session) -> _SessionState:
+        state = self._sessions.get(session)
+        if state is None:
+            state = self._sessions[session] = _SessionState(self.max_in_flight, self.burst)
+            self.sessions_seen += 1
+        return state
+
+    def _take_token(self, state: _SessionState) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        state.tokens = min(self.burst, state.tokens + (now - state.refilled) * self.rate)
+        state.refilled = now
+        if state.tokens < 1:
+            return False
+        state.tokens -= 1
+        return True
+
+    def install(self, mcp):
+        """Wrap every request handler of a FastMCP server with the session limits"""
+        from mcp.server.lowlevel.server import request_ctx
+
+        server = mcp._mcp_server
+
+        def wrap(request_type, handler):
+            if issubclass(request_type, UNLIMITED):
+                return handler
+
+            async def limited(req):
+                if req is None:
+                    # Direct call from inside the SDK, not a client request
+                    return await handler(req)
+                state = self._state(request_ctx.get().session)
+                state.requests += 1
+                if not self._take_token(state):
+                    state.rejected += 1
+                    self.rejected += 1
+                    raise McpError(types.ErrorData(
+                        code=RATE_LIMITED,
+                        message=f"Rate limit exceeded: {self.rate:g} requests/s per session",
+                    ))
+                if state.slots.locked():
+                    state.waited += 1
+                async with state.slots:
+                    state.running += 1
+                    try:
+                        return await handler(req)
+                    finally:
+                        state.running -= 1
+            return limited
+
+        for request_type, handler in list(server.request_handlers.items()):
+            server.request_handlers[request_type] = wrap(request_type, handler)
+
+    def stats(self) -> dict:
+        """Limits, active sessions and their request / wait / rejection counters"""
+        sessions = list(self._sessions.values())
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rate": self.rate,
+            "burst": self.burst,
+            "active_sessions": len(sessions),
+            "sessions_seen": self.sessions_seen,
+            "requests": sum(s.requests for s in sessions),
+            "in_flight": sum(s.running for s in sessions),
+            "waited": sum(s.waited for s in sessions),
+            "rejected": self.rejected,
+        }
+
+class SessionCap:
+    """ASGI wrapper that answers 503 to a new MCP session once max_sessions are open."""
+
+    def __init__(self, app, open_sessions, max_sessions: int, new_session, sweep=None):
+        """sweep, if given, is awaited before counting (to end idle sessions first)"""
+        self.app = app
+        self.open_sessions = open_sessions
+        self.max_sessions = max_sessions
+        self.new_session = new_session
+        self.sweep = sweep
+        self.refused = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.sweep is not None:
+            await self.sweep()
+        if (scope["type"] == "http" and self.max_sessions > 0 and self.new_session(scope)
+                and self.open_sessions() >= self.max_sessions):
+            self.refused += 1
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"text/plain"), (b"retry-after", b"1")]})
+            await send({"type": "http.response.body", "body": b"Too many MCP sessions"})
+            return
+        await self.app(scope, receive, send)
+
+def _header(scope, name: bytes):
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+class StreamableSessions:
+    """ASGI wrapper that keeps the live streamable HTTP sessions by their mcp-session-id."""
+
+    def __init__(self, app, idle_timeout: float = 600.0):
+        self.app = app
+        self.idle_timeout = idle_timeout
+        self._sessions = {}         # session id -> [last request end, requests in flight]
+        self._endpoint = None       # scope of a request that created a session
+        self._swept = 0.0
+        self.created = 0
+        self.ended = 0
+        self.expired = 0
+
+    def open(self) -> int:
+        return len(self._sessions)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        session_id = _header(scope, b"mcp-session-id")
+        if session_id is None:
+            # The router rewrites the scope in place; keep it as it arrived for _delete
+            endpoint = dict(scope)
+
+            # A new session: the server assigns its id in the response headers
+            async def capture(message):
+                if message["type"] == "http.response.start" and message["status"] == 200:
+                    assigned = _header(message, b"mcp-session-id")
+                    if assigned is not None:
+                        self._sessions[assigned.decode()] = [time.monotonic(), 0]
+                        self._endpoint = endpoint
+                        self.created += 1
+                await send(message)
+
+            await self.app(scope, receive, capture)
+            return
+
+        state = self._sessions.get(session_id.decode())
+        if state is not None:
+            state[1] += 1
+        status = {}
+
+        async def watch(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, watch)
+        finally:
+            if state is not None:
+                state[0] = time.monotonic()
+                state[1] -= 1
+                # Ended by the client, or already gone on the server
+                if scope["method"] == "DELETE" or status.get("code") == 404:
+                    if self._sessions.pop(session_id.decode(), None) is not None:
+                        self.ended += 1
+
+    async def expire_idle(self):
+        """End sessions idle for longer than idle_timeout (checked at most once a second)"""
+        now = time.monotonic()
+        if self.idle_timeout <= 0 or self._endpoint is None or now - self._swept < 1.0:
+            return
+        self._swept = now
+        idle = [sid for sid, (seen, busy) in self._sessions.items() if not busy and now - seen > self.idle_timeout]
+        for session_id in idle:
+            del self._sessions[session_id]
+            self.expired += 1
+            await self._delete(session_id)
+
+    async def _delete(self, session_id: str):
+        """Send the app the DELETE the client never sent, so the SDK closes the session"""
+        scope = {**self._endpoint, "method": "DELETE", "query_string": b"",
+                 "headers": [(b"mcp-session-id", session_id.encode())]}
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            return messages.pop() if messages else {"type": "http.disconnect"}
+
+        async def discard(message):
+            pass
+
+        try:
+            await self.app(scope, receive, discard)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {"open": self.open(), "created": self.created, "ended": self.ended, "expired": self.expired}
+
+def build_app(mcp, transport: str = "streamable-http", max_sessions: int = 0, idle_timeout: float = 600.0):
+    """ASGI app for the transport, wrapped with the session cap"""
+    if transport == "sse":
+        app = mcp.sse_app()
+        streams = {"open": 0}
+        sse_path = mcp.settings.sse_path
+
+        # One SSE stream per session: count the open GETs on the stream path
+        async def counted(scope, receive, send):
+            if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == sse_path:
+                streams["open"] += 1
+                try:
+                    await app(scope, receive, send)
+                finally:
+                    streams["open"] -= 1
+            else:
+                await app(scope, receive, send)
+
+        return SessionCap(
+            counted, lambda: streams["open"], max_sessions,
+            lambda scope: scope["method"] == "GET" and scope["path"] == sse_path,
+        )
+    if transport != "streamable-http":
+        raise ValueError(f"Unknown HTTP transport: {transport}")
+    sessions = StreamableSessions(mcp.streamable_http_app(), idle_timeout)
+    return SessionCap(
+        sessions, sessions.open, max_sessions,
+        lambda scope: scope["method"] == "POST" and _header(scope, b"mcp-session-id") is None,
+        sweep=sessions.expire_idle,
+    )
+
+def run_http(mcp, transport: str = "streamable-http", host: str = "127.0.0.1", port: int = 8000,
+             max_sessions: int = 0, idle_timeout: float = 600.0, json_response: bool = True,
+             log_level: str = "warning", on_shutdown=()):
+    """Serve a FastMCP server over streamable HTTP or SSE under uvicorn (blocks until stopped)
+
+    on_shutdown coroutine functions are awaited on the serving loop after uvicorn stops.
+    """
+    import uvicorn
+
+    mcp.settings.host = host
+    mcp.settings.port = port
+    mcp.settings.json_response = json_response
+    app = build_app(mcp, transport, max_sessions, idle_timeout)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level=log_level))
+
+    async def serve():
+        try:
+            await server.serve()
+        finally:
+            for hook in on_shutdown:
+                await hook()
+
+    asyncio.run(serve())
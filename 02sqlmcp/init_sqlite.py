@@ -1,25 +1,245 @@
-import sqlite3
-import pandas as pd
+import csv
+import hashlib
 import os
-from .util import get_db_file_path, get_file_path
+import sqlite3
+import sys
+import time
+from .cache import data_version
+from .catalog import SchemaCatalog
+from .typed_csv import infer_schema, iter_chunks
+from .util import get_columnar_dir, get_db_file_path, get_file_path, peak_rss_bytes
+
+# Indexes built after the load, matching the filters and GROUP BYs agents use most
+TITANIC_INDEXES = [("Sex",), ("Pclass", "Age"), ("Survived",)]
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _create_table(conn: sqlite3.Connection, table: str, header: list, types: list, temp: bool = False):
+    columns = ", ".join(f"{quote_identifier(name)} {t}" for name, t in zip(header, types))
+    conn.execute(f"CREATE {'TEMP ' if temp else ''}TABLE {quote_identifier(table)} ({columns})")
+
+def _bulk_pragmas(conn: sqlite3.Connection, cache_kib: int):
+    # Bulk-load settings: no fsync per page, a bounded page cache, temp b-trees in memory
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(f"PRAGMA cache_size=-{int(cache_kib)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+def load_csv(conn: sqlite3.Connection, file_path: str, table: str,
+             chunk_size: int = 10000, indexes=None, cache_kib: int = 65536) -> dict:
+    """Stream a CSV file into table inside one transaction, then build indexes."""
+    started = time.perf_counter()
+    header, types = infer_schema(file_path)
+
+    _bulk_pragmas(conn, cache_kib)
+    placeholders = ", ".join("?" * len(header))
+    rows = 0
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(table)}")
+        _create_table(conn, table, header, types)
+        insert = f"INSERT INTO {quote_identifier(table)} VALUES ({placeholders})"
+        for chunk in iter_chunks(file_path, types, chunk_size):
+            conn.executemany(insert, chunk)
+            rows += len(chunk)
+        loaded = time.perf_counter()
+
+        # Indexes are cheaper to build once over sorted data than to maintain per insert
+        for index_columns in indexes or ():
+            if not all(c in header for c in index_columns):
+                continue
+            name = f"idx_{table}_{'_'.join(index_columns)}".lower()
+            conn.execute(
+                f"CREATE INDEX {quote_identifier(name)} ON {quote_identifier(table)}"
+                f"({', '.join(quote_identifier(c) for c in index_columns)})"
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("ANALYZE")
+    finished = time.perf_counter()
+
+    load_seconds = loaded - started
+    return {
+        "table": table,
+        "rows": rows,
+        "columns": dict(zip(header, types)),
+        "load_seconds": round(load_seconds, 3),
+        "index_seconds": round(finished - loaded, 3),
+        "rows_per_second": round(rows / load_seconds) if load_seconds > 0 else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+def _row_hash(*values) -> bytes:
+    """Content hash of one row, used as its identity when there is no key"""
+    return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=16).digest()
+
+def reload_csv(conn: sqlite3.Connection, file_path: str, table: str, key=None,
+               chunk_size: int = 10000, indexes=None, cache_kib: int = 65536) -> dict:
+    """Merge a CSV file into an existing table and swap the result in atomically
+
+    With key (a column name or tuple of names) rows are upserted: new keys are
+    inserted, rows whose values changed are updated, identical rows are skipped.
+    A key that is empty or appears twice in the CSV raises ValueError.
+    Without key a row's identity is its content hash, so only unseen rows are appended.
+    The merge runs on a shadow copy that replaces the live table by rename in the
+    same transaction; under WAL, readers keep seeing the previous version until commit.
+    Falls back to a full load_csv when the table is missing or its columns differ.
+    """
+    started = time.perf_counter()
+    live = conn.execute(f"PRAGMA table_info({quote_identifier(table)})").fetchall()
+    with open(file_path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    if not live or [col[1] for col in live] != header:
+        report = load_csv(conn, file_path, table, chunk_size=chunk_size,
+                          indexes=indexes, cache_kib=cache_kib)
+        report.update({"mode": "full", "inserted": report["rows"], "updated": 0, "skipped": 0})
+        return report
+
+    # Keep the live schema (and any indexes built since, e.g. by the index advisor)
+    types = [col[2] or "TEXT" for col in live]
+    key = (key,) if isinstance(key, str) else tuple(key or ())
+    missing = [k for k in key if k not in header]
+    if missing:
+        raise ValueError(f"key column(s) not in {table}: {', '.join(missing)}")
+    index_sql = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+        (table,),
+    )]
+
+    _bulk_pragmas(conn, cache_kib)
+    conn.create_function("row_hash", -1, _row_hash, deterministic=True)
+    shadow, old = f"{table}__shadow", f"{table}__old"
+    names = [quote_identifier(name) for name in header]
+    column_list = ", ".join(names)
+    staged = ", ".join(f"s.{name}" for name in names)
+    placeholders = ", ".join("?" * len(header))
+    inserted = updated = rows = 0
 
-def init_db():
-    """Initialize the SQLite database with a sample table."""
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(shadow)}")
+        _create_table(conn, shadow, header, types)
+        conn.execute(f"INSERT INTO {quote_identifier(shadow)} SELECT {column_list} FROM {quote_identifier(table)}")
+        conn.execute("DROP TABLE IF EXISTS temp.staging")
+        # Staging columns carry the live types, so values get the same affinity they
+        # will have in the table before they are compared or hashed (1.0 -> 1 in INTEGER)
+        _create_table(conn, "staging", header, types, temp=True)
+        if key:
+            key_names = [quote_identifier(k) for k in key]
+            key_list = ", ".join(key_names)
+            # Every key of the file, across chunks; a duplicate would make UPDATE ... FROM
+            # pick one of the staging rows arbitrarily
+            conn.execute("DROP TABLE IF EXISTS temp.staged_keys")
+            conn.execute(f"CREATE TEMP TABLE staged_keys ({key_list}, PRIMARY KEY ({key_list})) WITHOUT ROWID")
+            conn.execute(f"CREATE INDEX {quote_identifier(shadow + '_key')} ON {quote_identifier(shadow)} ({key_list})")
+            match = " AND ".join(f"t.{quote_identifier(k)} = s.{quote_identifier(k)}" for k in key)
+            changed = " OR ".join(f"t.{name} IS NOT s.{name}" for name in names if name not in key_names)
+            merge = [
+                f"UPDATE {quote_identifier(shadow)} AS t SET ({column_list}) = ({staged}) "
+                f"FROM staging AS s WHERE {match} AND ({changed or '0'})",
+                f"INSERT INTO {quote_identifier(shadow)} SELECT {staged} FROM staging AS s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {quote_identifier(shadow)} AS t WHERE {match})",
+            ]
+        else:
+            conn.execute("DROP TABLE IF EXISTS temp.seen")
+            conn.execute("CREATE TEMP TABLE seen (hash BLOB PRIMARY KEY) WITHOUT ROWID")
+            conn.execute(f"INSERT OR IGNORE INTO temp.seen SELECT row_hash({column_list}) FROM {quote_identifier(shadow)}")
+            merge = [
+                None,
+                f"INSERT INTO {quote_identifier(shadow)} SELECT {staged} FROM staging AS s "
+                f"WHERE row_hash({staged}) NOT IN (SELECT hash FROM temp.seen)",
+            ]
+
+        for chunk in iter_chunks(file_path, types, chunk_size):
+            rows += len(chunk)
+            conn.execute("DELETE FROM temp.staging")
+            conn.executemany(f"INSERT INTO temp.staging VALUES ({placeholders})", chunk)
+            if key:
+                try:
+                    conn.execute(f"INSERT INTO temp.staged_keys SELECT {key_list} FROM temp.staging")
+                except sqlite3.IntegrityError as e:
+                    raise ValueError(f"{file_path} has an empty or duplicate key ({', '.join(key)}) "
+                                     f"in rows {rows - len(chunk) + 1}-{rows}: {e}") from e
+            update_sql, insert_sql = merge
+            if update_sql:
+                updated += conn.execute(update_sql).rowcount
+            inserted += conn.execute(insert_sql).rowcount
+            if not key:
+                conn.execute(f"INSERT OR IGNORE INTO temp.seen SELECT row_hash({column_list}) FROM temp.staging")
+        merged = time.perf_counter()
+
+        # Swap: the live table's indexes go with it and are rebuilt on the new version
+        conn.execute(f"DROP INDEX IF EXISTS {quote_identifier(shadow + '_key')}")
+        conn.execute(f"ALTER TABLE {quote_identifier(table)} RENAME TO {quote_identifier(old)}")
+        conn.execute(f"DROP TABLE {quote_identifier(old)}")
+        conn.execute(f"ALTER TABLE {quote_identifier(shadow)} RENAME TO {quote_identifier(table)}")
+        for sql in index_sql:
+            conn.execute(sql)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.staging")
+        conn.execute("DROP TABLE IF EXISTS temp.seen")
+        conn.execute("DROP TABLE IF EXISTS temp.staged_keys")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("ANALYZE")
+    finished = time.perf_counter()
+
+    merge_seconds = merged - started
+    return {
+        "table": table,
+        "mode": "upsert" if key else "append",
+        "rows": rows,
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": rows - inserted - updated,
+        "merge_seconds": round(merge_seconds, 3),
+        "swap_seconds": round(finished - merged, 3),
+        "rows_per_second": round(rows / merge_seconds) if merge_seconds > 0 else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+def init_db(chunk_size: int = 10000, indexes=TITANIC_INDEXES,
+            incremental: bool = False, key=None, columnar: bool = False) -> dict:
+    """Initialize the SQLite database with a sample table.
+
+    With columnar=True, or when a snapshot already exists, the table is also
+    written as memory-mapped NumPy columns for aggregate_columns (see columnar.py).
+    """
     # load the ./data/titanic_train.csv file into the database
     # create a new SQLite database and load the Titanic dataset in ./data/database.db
-    
+
     db_path = get_db_file_path()
     file_path = get_file_path()
     if not os.path.exists(os.path.dirname(db_path)):
         os.makedirs(os.path.dirname(db_path))
 
-    with sqlite3.connect(db_path) as conn:
-        df = pd.read_csv(file_path)
-        df.to_sql("titanic", conn, if_exists="replace", index=False)
+    # isolation_level=None: the loaders manage their own single transaction
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if incremental:
+            report = reload_csv(conn, file_path, "titanic", key=key,
+                                chunk_size=chunk_size, indexes=indexes)
+        else:
+            report = load_csv(conn, file_path, "titanic", chunk_size=chunk_size, indexes=indexes)
+        # An existing snapshot is rewritten too, so it never lags the table
+        if columnar or os.path.exists(os.path.join(get_columnar_dir(), "titanic")):
+            from .columnar import write_snapshot
+            report["columnar"] = write_snapshot(conn, "titanic", get_columnar_dir())
+        return report
+    finally:
+        conn.close()
 
 def get_first_row():
     """Get the first row of the Titanic dataset."""
-    
+
     db_path = get_db_file_path()
     row = ""
     with sqlite3.connect(db_path) as conn:
@@ -28,19 +248,41 @@ def get_first_row():
         row = cursor.fetchone()
     return row
 
+# Shared by get_schema/get_table_stats; rebuilt only when the database changes
+_catalog = SchemaCatalog(lambda: data_version(get_db_file_path()))
+
+def get_table_stats(table_name: str):
+    """Get the cached catalog entry (row count, column statistics) of a table."""
+
+    entry = _catalog.lookup()
+    if entry is None:
+        conn = sqlite3.connect(get_db_file_path())
+        try:
+            entry = _catalog.get(conn)
+        finally:
+            conn.close()
+    for table in entry["tables"]:
+        if table["name"].lower() == table_name.lower():
+            return table
+    return None
+
 def get_schema(table_name: str) -> str:
     """Get the schema of a specific table."""
-    
-    db_path = get_db_file_path()
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        schema = cursor.fetchall()
-    # return schema
-    # return "\n".join([f"{col[1]}: {col[2]}" for col in schema])
-    return ", ".join([f"{col[1]}: {col[2]}" for col in schema])
+
+    table = get_table_stats(table_name)
+    if table is None:
+        return ""
+    return ", ".join([f"{col['name']}: {col['type']}" for col in table["columns"]])
 
 if __name__ == "__main__":
-    init_db()
+    # python -m 02sqlmcp.init_sqlite                          full reload
+    # python -m 02sqlmcp.init_sqlite incremental [key_column]  merge changed rows only
+    # ... --columnar                                          also write the columnar snapshot
+    columnar = "--columnar" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--columnar"]
+    if args and args[0] == "incremental":
+        print(init_db(incremental=True, key=args[1] if len(args) > 1 else None, columnar=columnar))
+    else:
+        print(init_db(columnar=columnar))
     print(get_first_row())
-    print(get_schema("titanic"))
\ No newline at end of file
+    print(get_schema("titanic"))
@@ -0,0 +1,390 @@
+# Request journal: record real MCP traffic and replay it as a regression test
+# The correctness tests are hand-written lists of requests, and loadgen.py
+# replays a synthetic mix. This records what an agent really sends:
+#
+#   record  - a stdio proxy the MCP host launches instead of the server. It
+#             starts the real server, relays both pipes unchanged and appends
+#             every JSON-RPC message with its direction and time to a journal
+#   replay  - re-sends the client side of a journal to a (new) server build at
+#             the original pacing, faster, or as fast as possible, diffs every
+#             response against the recorded one and compares latencies per
+#             method; exits 1 on a changed response or a latency regression
+#
+# Journal format: one JSON object per line, appended, optionally gzip (.gz).
+# Each proxy run starts with a header {"journal": 1, "session": ...}, then
+#   {"t": <ms since session start>, "d": "c"|"s", "m": <message as sent>}
+# with "d" = c (client to server) or s (server to client); non-JSON lines
+# the server prints on stdout are kept as {"t", "d", "raw": "..."}.
+#
+# Usage:
+#   python journal.py record traffic.jsonl.gz [mcp_server.py]   # as the MCP server command
+#   python journal.py replay traffic.jsonl.gz                   # against mcp_server.py, original pacing
+#   python journal.py replay traffic.jsonl.gz --speed 4 --output replay.json
+#   python journal.py replay traffic.jsonl.gz --speed 0 --baseline replay.json
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import uuid
+
+from framing import READ_SIZE, LineFramer, loads
+from launcher import DEFAULT_SERVER, launch, server_command
+from util import percentile
+
+JOURNAL_VERSION = 1
+
+# Parts of a response that differ from run to run and are not compared
+VOLATILE_FIELDS = re.compile(r'((?:wall_ms|next_cursor)\\?"?\s*[:=]\s*\\?"?)[^\s,;}\\"]+')
+CACHED_FLAG = re.compile(r'[;,]?\s*\\?"?cached\\?"?\s*[:=]\s*(?:true|True)')
+# Resources whose content is a live counter; only success vs. error is compared
+VOLATILE_URIS = ("stats://", "metrics://")
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+class JournalWriter:
+    """Appends one session of timestamped messages to a journal file."""
+
+    def __init__(self, path: str, header: dict):
+        self._file = _open(path, "ab")
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.messages = 0
+        self._file.write(json.dumps({"journal": JOURNAL_VERSION, **header}).encode("utf-8") + b"\n")
+        self._file.flush()
+
+    def record(self, direction: str, frames: list, at: float):
+        """Append the frames read in one chunk; valid JSON is stored verbatim, anything else as a string"""
+        if not frames:
+            return
+        prefix = b'{"t":%.3f,"d":"%s",' % ((at - self._started) * 1000, direction.encode())
+        lines = []
+        for frame in frames:
+            try:
+                loads(frame)
+            except ValueError:
+                raw = json.dumps(bytes(frame).decode("utf-8", "replace")).encode("utf-8")
+                lines.append(prefix + b'"raw":' + raw + b"}\n")
+                continue
+            lines.append(prefix + b'"m":' + bytes(frame) + b"}\n")
+        with self._lock:
+            self._file.write(b"".join(lines))
+            # Flushed per chunk so a killed proxy loses at most the chunk in hand
+            self._file.flush()
+            self.messages += len(lines)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class RecordingProxy:
+    """Stdio proxy between an MCP host and the real server that journals both directions."""
+
+    def __init__(self, journal_path: str, server: str = None):
+        self.journal_path = journal_path
+        self.server = server
+
+    def _pump(self, source_fd: int, sink, direction: str, journal: JournalWriter):
+        """Relay one direction until EOF; messages are forwarded before they are recorded"""
+        framer = LineFramer()
+        while True:
+            try:
+                chunk = os.read(source_fd, READ_SIZE)
+            except OSError:
+                break
+            if not chunk:
+                break
+            at = time.perf_counter()
+            try:
+                sink.write(chunk)
+                sink.flush()
+            except (BrokenPipeError, ValueError):
+                journal.record(direction, framer.feed(chunk), at)
+                break
+            journal.record(direction, framer.feed(chunk), at)
+
+    def run(self) -> int:
+        """Proxy until the host closes stdin and the server exits; returns the server's exit code"""
+        from loadgen import git_revision
+
+        command = server_command(self.server)
+        process = launch(self.server)
+        journal = JournalWriter(self.journal_path, {
+            "session": uuid.uuid4().hex[:12],
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "server": command,
+            "revision": git_revision(),
+        })
+        replies = threading.Thread(
+            target=self._pump, args=(process.stdout.fileno(), sys.stdout.buffer, "s", journal), daemon=True,
+        )
+        replies.start()
+        # Hosts stop servers with SIGTERM; unwinding through finally keeps the journal (and gzip trailer) intact
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+        try:
+            self._pump(sys.stdin.fileno(), process.stdin, "c", journal)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            code = process.wait()
+            replies.join(timeout=5)
+            journal.close()
+        return code
+
+def read_journal(path: str) -> list:
+    """Sessions of a journal: [{"header": {...}, "events": [(t_ms, direction, message), ...]}]"""
+    sessions = []
+    with _open(path, "rb") as f:
+        try:
+            for line in f:
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    # A proxy killed mid-write leaves a partial last line
+                    continue
+                if "journal" in entry:
+                    sessions.append({"header": entry, "events": []})
+                elif sessions and "m" in entry:
+                    sessions[-1]["events"].append((entry["t"], entry["d"], entry["m"]))
+        except EOFError:
+            # ... or a gzip member without its trailer; everything flushed before is readable
+            pass
+    return sessions
+
+def request_key(message: dict) -> str:
+    """Latency bucket of a request: method, plus tool name or resource URI"""
+    method = message.get("method", "")
+    params = message.get("params") or {}
+    if method == "tools/call":
+        return f"{method}:{params.get('name')}"
+    if method == "resources/read":
+        return f"{method}:{params.get('uri')}"
+    return method
+
+def plan_session(events: list) -> tuple:
+    """Client messages to send, and one exchange per recorded request with its response and latency"""
+    sends, exchanges, waiting = [], [], {}
+    for t, direction, message in events:
+        items = message if isinstance(message, list) else [message]
+        if direction == "c":
+            # Replies to the server's own requests (ping, roots/list) are answered by the replay client
+            outgoing = [item for item in items if isinstance(item, dict) and "method" in item]
+            if not outgoing:
+                continue
+            ids = []
+            for item in outgoing:
+                if "id" in item:
+                    exchange = {"key": request_key(item), "request": item, "sent": t,
+                                "response": None, "received": None}
+                    waiting[item["id"]] = exchange
+                    exchanges.append(exchange)
+                    ids.append(item["id"])
+            sends.append((t, outgoing if isinstance(message, list) else outgoing[0], ids))
+        else:
+            for item in items:
+                if isinstance(item, dict) and "method" not in item:
+                    exchange = waiting.pop(item.get("id"), None)
+                    if exchange is not None:
+                        exchange["response"] = item
+                        exchange["received"] = t
+    return sends, exchanges
+
+def normalize(response: dict, request: dict) -> str:
+    """Comparable form of a response: no id, no timings, no live counters"""
+    if response is None:
+        return "<no response>"
+    if "error" in response:
+        return json.dumps({"error": response["error"]}, sort_keys=True)
+    result = response.get("result")
+    uri = str((request.get("params") or {}).get("uri", ""))
+    if request.get("method") == "resources/read" and uri.startswith(VOLATILE_URIS):
+        return "<result>"
+    if request.get("method") == "initialize" and isinstance(result, dict):
+        result = {key: value for key, value in result.items() if key != "serverInfo"}
+    text = json.dumps(result, sort_keys=True, ensure_ascii=False)
+    text = CACHED_FLAG.sub("", text)
+    return VOLATILE_FIELDS.sub(r"\1#", text)
+
+def first_difference(before: str, after: str, context: int = 150) -> dict:
+    """Offset of the first differing character and the text around it on both sides"""
+    offset = next((i for i, (a, b) in enumerate(zip(before, after)) if a != b), min(len(before), len(after)))
+    start = max(0, offset - context // 3)
+    return {"offset": offset, "recorded": before[start:start + context], "replayed": after[start:start + context]}
+
+async def _send(client, message, timeout: float) -> tuple:
+    """(seconds, response(s) or exception) for one replayed message"""
+    started = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            response = await client.send_message(message)
+    except Exception as e:
+        return time.perf_counter() - started, e
+    return time.perf_counter() - started, response
+
+async def replay_session(session: dict, server: str = None, speed: float = 1.0, timeout: float = 30.0) -> list:
+    """Replay one session against a fresh server; returns the exchanges with replayed response and latency"""
+    from mcp_client import AsyncMCPClient
+
+    sends, exchanges = plan_session(session["events"])
+    # A message is only sent once every response the original client had seen by then is back
+    answered = sorted((e["received"], i) for i, e in enumerate(exchanges) if e["received"] is not None)
+    tasks = [None] * len(exchanges)
+
+    command = server_command(server)
+    client = AsyncMCPClient(command, cwd=os.path.dirname(command[-1]))
+    await client.start_server()
+    try:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        seen = 0
+        position = 0
+        for t, message, ids in sends:
+            if speed > 0:
+                delay = started + t / 1000 / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            while seen < len(answered) and answered[seen][0] <= t:
+                task = tasks[answered[seen][1]]
+                if task is not None:
+                    await asyncio.wait([task])
+                seen += 1
+            task = asyncio.create_task(_send(client, message, timeout))
+            for _ in ids:
+                tasks[position] = task
+                position += 1
+        for exchange, task in zip(exchanges, tasks):
+            seconds, outcome = await task
+            exchange["replay_ms"] = round(seconds * 1000, 3)
+            if isinstance(outcome, Exception):
+                exchange["replayed"] = {"error": {"message": f"{type(outcome).__name__}: {outcome}"}}
+                continue
+            responses = outcome if isinstance(outcome, list) else [outcome]
+            exchange["replayed"] = next(
+                (r for r in responses if isinstance(r, dict) and r.get("id") == exchange["request"]["id"]), None,
+            )
+    finally:
+        await client.stop_server()
+    return exchanges
+
+def latency_table(samples: dict) -> dict:
+    """Per-key request count and p50/p95/max in ms from {key: [ms, ...]}"""
+    return {
+        key: {
+            "requests": len(values),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "max_ms": round(max(values), 3),
+        }
+        for key, values in sorted(samples.items()) if values
+    }
+
+def compare_latency(reference: dict, current: dict, tolerance: float = 0.20,
+                    min_delta_ms: float = 1.0, min_requests: int = 5) -> dict:
+    """p95 change per key; slower by more than tolerance and min_delta_ms is a regression"""
+    changes, regressions = {}, []
+    for key, after in current.items():
+        before = reference.get(key)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        changes[key] = {"reference_p95_ms": before["p95_ms"], "replay_p95_ms": after["p95_ms"],
+                        "change": round(change, 4)}
+        if (change > tolerance and after["p95_ms"] - before["p95_ms"] > min_delta_ms
+                and min(before["requests"], after["requests"]) >= min_requests):
+            regressions.append(key)
+    return {"changes": changes, "regressions": regressions}
+
+async def replay_journal(path: str, server: str = None, speed: float = 1.0, timeout: float = 30.0,
+                         tolerance: float = 0.20, baseline: dict = None, max_diffs: int = 20) -> dict:
+    """Replay every session of a journal and report response diffs and latency changes"""
+    from loadgen import git_revision
+
+    recorded, replayed = {}, {}
+    mismatches, requests, unanswered = [], 0, 0
+    sessions = read_journal(path)
+    started = time.perf_counter()
+    for session in sessions:
+        for exchange in await replay_session(session, server, speed, timeout):
+            requests += 1
+            key = exchange["key"]
+            if exchange["received"] is None:
+                # The recording ended before the response: nothing to compare against
+                unanswered += 1
+                continue
+            recorded.setdefault(key, []).append(exchange["received"] - exchange["sent"])
+            replayed.setdefault(key, []).append(exchange["replay_ms"])
+            before = normalize(exchange["response"], exchange["request"])
+            after = normalize(exchange["replayed"], exchange["request"])
+            if before != after:
+                mismatches.append({
+                    "session": session["header"].get("session"),
+                    "id": exchange["request"]["id"],
+                    "key": key,
+                    **first_difference(before, after),
+                })
+    replay_latency = latency_table(replayed)
+    reference = baseline["latency"]["replayed"] if baseline else latency_table(recorded)
+    latency = compare_latency(reference, replay_latency, tolerance)
+    return {
+        "journal": path,
+        "server": server_command(server),
+        "revision": git_revision(),
+        "recorded_revisions": sorted({str(s["header"].get("revision")) for s in sessions}),
+        "speed": speed,
+        "sessions": len(sessions),
+        "requests": requests,
+        "unanswered_in_journal": unanswered,
+        "mismatched": len(mismatches),
+        "mismatches": mismatches[:max_diffs],
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "latency": {
+            "reference": "baseline" if baseline else "recorded",
+            "recorded": latency_table(recorded),
+            "replayed": replay_latency,
+            "tolerance": tolerance,
+            **latency,
+        },
+        "passed": not mismatches and not latency["regressions"],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record MCP stdio traffic to a journal, or replay one")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="stdio proxy: start the server and journal its traffic")
+    record.add_argument("journal", help="journal file (appended; .gz for gzip)")
+    record.add_argument("server", nargs="?", default=None, help=f"server script (default {DEFAULT_SERVER})")
+    replay = commands.add_parser("replay", help="replay a journal and diff responses and latencies")
+    replay.add_argument("journal", help="journal file written by record")
+    replay.add_argument("--server", default=None, help="server script to replay against")
+    replay.add_argument("--speed", type=float, default=1.0,
+                        help="pacing: 1 = original, 4 = four times faster, 0 = as fast as possible")
+    replay.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    replay.add_argument("--tolerance", type=float, default=0.20, help="allowed relative p95 regression")
+    replay.add_argument("--baseline", help="earlier replay report to compare latencies with instead of the recording")
+    replay.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        sys.exit(RecordingProxy(args.journal, args.server).run())
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    result = asyncio.run(replay_journal(args.journal, args.server, args.speed, args.timeout,
+                                        args.tolerance, baseline))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    sys.exit(0 if result["passed"] else 1)
@@ -0,0 +1,103 @@
+# Server launcher for the test tools
+# The test clients used to start the server through `powershell.exe -File
+# mcp.ps1 server` or `uv run python mcp_server.py`: Windows-only, tied to one
+# venv path, and each hop adds its own start-up time to every spawn. This
+# resolves the interpreter and the server script once and spawns the server
+# directly, on any platform.
+#
+#   interpreter: MCP_SERVER_PYTHON, else the interpreter running this script
+#   server:      MCP_SERVER_SCRIPT, else mcp_server.py next to this file
+#
+# Usage:
+#   python launcher.py                 # spawn / handshake / first request latency (JSON)
+#   python launcher.py other_server.py # same for another stdio server script
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_server.py")
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "launcher", "version": "1.0.0"},
+    },
+}
+
+def server_command(server: str = None, python: str = None, python_args: list = None) -> list:
+    """Command line that runs the server script directly with the resolved interpreter"""
+    python = python or os.environ.get("MCP_SERVER_PYTHON") or sys.executable
+    server = os.path.abspath(server or os.environ.get("MCP_SERVER_SCRIPT") or DEFAULT_SERVER)
+    return [python, *(python_args or []), server]
+
+def launch(server: str = None, python: str = None, python_args: list = None, **popen_args) -> subprocess.Popen:
+    """Spawn the server with stdin/stdout pipes, in the server script's directory"""
+    command = server_command(server, python, python_args)
+    popen_args.setdefault("stdin", subprocess.PIPE)
+    popen_args.setdefault("stdout", subprocess.PIPE)
+    popen_args.setdefault("cwd", os.path.dirname(command[-1]))
+    return subprocess.Popen(command, **popen_args)
+
+def _read_response(process: subprocess.Popen, request_id: int) -> dict:
+    """Next response with this id; log lines and notifications are skipped"""
+    for line in iter(process.stdout.readline, b""):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(message, dict) and message.get("id") == request_id and "method" not in message:
+            return message
+    raise RuntimeError("server exited before answering")
+
+def time_launch(server: str = None, python: str = None) -> dict:
+    """Seconds for one spawn: Popen, initialize reply, first request after the handshake"""
+    started = time.perf_counter()
+    process = launch(server, python, stderr=subprocess.DEVNULL)
+    spawned = time.perf_counter()
+    try:
+        process.stdin.write(json.dumps(INITIALIZE).encode("utf-8") + b"\n")
+        process.stdin.flush()
+        response = _read_response(process, 1)
+        if "result" not in response:
+            raise RuntimeError(f"initialize failed: {response.get('error')}")
+        initialized = time.perf_counter()
+        process.stdin.write(
+            b'{"jsonrpc":"2.0","method":"notifications/initialized"}\n'
+            b'{"jsonrpc":"2.0","id":2,"method":"tools/list"}\n'
+        )
+        process.stdin.flush()
+        _read_response(process, 2)
+        first_request = time.perf_counter()
+    finally:
+        try:
+            # Closing stdin (done by communicate) ends the stdio server
+            process.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+    return {
+        "spawn": spawned - started,
+        "handshake": initialized - spawned,
+        "first_request": first_request - initialized,
+        "total": first_request - started,
+    }
+
+def measure_launch(server: str = None, python: str = None, runs: int = 5) -> dict:
+    """Median and worst spawn / handshake / first-request latency over several spawns"""
+    samples = [time_launch(server, python) for _ in range(runs)]
+    report = {"command": server_command(server, python), "runs": runs}
+    for stage in ("spawn", "handshake", "first_request", "total"):
+        values = sorted(sample[stage] for sample in samples)
+        report[f"{stage}_p50_ms"] = round(values[len(values) // 2] * 1000, 2)
+        report[f"{stage}_max_ms"] = round(values[-1] * 1000, 2)
+    return report
+
+if __name__ == "__main__":
+    print(json.dumps(measure_launch(sys.argv[1] if len(sys.argv) > 1 else None), indent=2))
@@ -0,0 +1,470 @@
+# Load generator and latency benchmark for the MCP servers
+# The test clients check correctness once, one request at a time. This replays
+# a weighted mix of initialize, tools/list, tools/call (sum, query_data) and
+# resources/read (greeting://, schema://main) against a stdio server, either
+# closed-loop with a fixed number of concurrent requests or open-loop at a
+# target request rate, and reports throughput, p50/p95/p99 latency per
+# operation, the error rate and the server's RSS as JSON. Operations the
+# server does not offer (sum on the SQL server, query_data on the demo server)
+# are dropped from the mix and listed under skipped_operations.
+#
+# Usage:
+#   python loadgen.py                                    # 02sqlmcp/mcp_server.py, 8 concurrent, 10s
+#   python loadgen.py ../01simplemcp/mcp_server.py       # any stdio MCP server script
+#   python loadgen.py --rate 200 --duration 30           # open loop at 200 requests/s
+#   python loadgen.py --mix query_data=3,schema=1 --output current.json
+#   python loadgen.py --http --sessions 50               # one HTTP server, 50 client sessions
+#   python loadgen.py --compare baseline.json current.json   # exits 1 on a regression
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from framing import JSON_BACKEND
+from launcher import server_command
+from mcp_client import TEST_QUERIES, AsyncMCPClient, HTTPMCPClient
+from util import percentile, process_memory
+
+INITIALIZE_PARAMS = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {},
+    "clientInfo": {"name": "loadgen", "version": "1.0.0"},
+}
+
+# Operation name -> default weight in the mix
+DEFAULT_MIX = {
+    "initialize": 1,
+    "tools_list": 4,
+    "sum": 20,
+    "query_data": 40,
+    "greeting": 15,
+    "schema": 20,
+}
+
+def build_request(operation: str, n: int, queries: list) -> tuple:
+    """(method, params) of the n-th request of an operation"""
+    if operation == "initialize":
+        return "initialize", INITIALIZE_PARAMS
+    if operation == "tools_list":
+        return "tools/list", {}
+    if operation == "sum":
+        return "tools/call", {"name": "sum", "arguments": {"a": n, "b": n + 1}}
+    if operation == "query_data":
+        return "tools/call", {"name": "query_data", "arguments": {"sql": queries[n % len(queries)]}}
+    if operation == "greeting":
+        return "resources/read", {"uri": f"greeting://user{n % 100}"}
+    if operation == "schema":
+        return "resources/read", {"uri": "schema://main"}
+    raise ValueError(f"unknown operation '{operation}', expected one of {', '.join(DEFAULT_MIX)}")
+
+def parse_mix(text: str) -> dict:
+    """'sum=3,query_data=1' -> {'sum': 3.0, 'query_data': 1.0}"""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown operation '{name}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+def response_error(response: dict):
+    """Error message of a response, or None when it succeeded"""
+    if "error" in response:
+        return response["error"].get("message", "error")
+    result = response.get("result") or {}
+    content = result.get("content") or [{}]
+    text = content[0].get("text", "") if isinstance(content[0], dict) else ""
+    # query_data reports failures as "Error: ..." text rather than isError
+    if result.get("isError") or text.startswith("Error:"):
+        return text or "tool error"
+    return None
+
+class LoadGenerator:
+    """Replays a weighted operation mix over one or more server sessions."""
+
+    def __init__(self, server_command: list, mix: dict = None, sessions: int = 1,
+                 cwd: str = None, timeout: float = 30.0, queries: list = None, seed: int = 1,
+                 url: str = None, server_pid: int = None):
+        """With url, each session is an HTTP client of one server (server_pid, if known, for its RSS)"""
+        self.server_command = server_command
+        self.url = url
+        self.server_pid = server_pid
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.sessions = max(1, sessions)
+        self.cwd = cwd
+        self.timeout = timeout
+        self.queries = queries or TEST_QUERIES
+        self.random = random.Random(seed)
+
+        self.clients = []
+        self._ready = []
+        self._handshakes = []
+        self.skipped = []
+        self._operations = []
+        self._weights = []
+        self._sent = 0
+        self._counts = Counter()
+        self._samples = {}
+        self._errors = Counter()
+        self._error_count = Counter()
+        self._memory = {"start_bytes": 0, "max_bytes": 0, "end_bytes": 0, "peak_bytes": None}
+        self._sampler = None
+
+    async def _spawn(self) -> AsyncMCPClient:
+        if self.url:
+            client = HTTPMCPClient(self.url)
+        else:
+            client = AsyncMCPClient(self.server_command, cwd=self.cwd)
+        await client.start_server()
+        try:
+            response = await client.initialize()
+            if "result" not in response:
+                raise RuntimeError(f"initialize failed: {response.get('error')}")
+        except BaseException:
+            await client.stop_server()
+            raise
+        return client
+
+    async def _supported(self, client: AsyncMCPClient) -> set:
+        """Operations this server offers, from its tool, resource and template lists"""
+        tools = (await client.list_tools()).get("result", {}).get("tools", [])
+        resources = (await client.list_resources()).get("result", {}).get("resources", [])
+        templates = (await client.send_request("resources/templates/list", {})) \
+            .get("result", {}).get("resourceTemplates", [])
+        tool_names = {tool["name"] for tool in tools}
+        uris = {resource["uri"] for resource in resources} | {t["uriTemplate"] for t in templates}
+        supported = {"initialize", "tools_list"}
+        supported |= {"sum", "query_data"} & tool_names
+        if any(uri.startswith("greeting://") for uri in uris):
+            supported.add("greeting")
+        if "schema://main" in uris:
+            supported.add("schema")
+        return supported
+
+    async def start(self):
+        """Spawn and initialize the sessions, drop unsupported operations, warm every operation once"""
+        self.clients = list(await asyncio.gather(*[self._spawn() for _ in range(self.sessions)]))
+        self._ready = [asyncio.Event() for _ in self.clients]
+        self._handshakes = [asyncio.Lock() for _ in self.clients]
+        for ready in self._ready:
+            ready.set()
+        supported = await self._supported(self.clients[0])
+        self.skipped = sorted(name for name in self.mix if name not in supported)
+        self._operations = [name for name, weight in self.mix.items() if name in supported and weight > 0]
+        self._weights = [self.mix[name] for name in self._operations]
+        if not self._operations:
+            raise RuntimeError(f"the server supports none of: {', '.join(self.mix)}")
+        # First calls pay for catalog builds and lazy imports; keep them out of the numbers
+        await asyncio.gather(*[
+            client.send_request(*build_request(name, 0, self.queries))
+            for client in self.clients for name in self._operations if name != "initialize"
+        ])
+        memory = self._server_memory()
+        self._memory["start_bytes"] = self._memory["max_bytes"] = memory["rss_bytes"]
+        self._sampler = asyncio.create_task(self._sample_memory())
+
+    def _server_memory(self) -> dict:
+        """RSS summed over all session processes; peak is the largest single process"""
+        if self.url:
+            memory = process_memory(self.server_pid) if self.server_pid else None
+            return memory or {"rss_bytes": 0, "peak_rss_bytes": None}
+        total, peaks = 0, []
+        for client in self.clients:
+            memory = process_memory(client.process.pid) if client.process else None
+            if memory:
+                total += memory["rss_bytes"]
+                peaks.append(memory["peak_rss_bytes"])
+        peak = max(peaks) if peaks and None not in peaks else None
+        return {"rss_bytes": total, "peak_rss_bytes": peak}
+
+    async def _sample_memory(self, interval: float = 0.2):
+        while True:
+            await asyncio.sleep(interval)
+            self._memory["max_bytes"] = max(self._memory["max_bytes"], self._server_memory()["rss_bytes"])
+
+    async def _issue(self, scheduled: float = None):
+        """Send one request of the mix; latency counts from its scheduled start"""
+        operation = self.random.choices(self._operations, self._weights)[0]
+        n = self._counts[operation] = self._counts[operation] + 1
+        session = self._sent % len(self.clients)
+        client = self.clients[session]
+        self._sent += 1
+        started = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            if operation == "initialize":
+                response = await self._handshake(session)
+            else:
+                # Re-check after waking: a second handshake may have closed the gate again.
+                # asyncio.timeout runs the send inline (wait_for would start a task), so the
+                # request is queued before another handshake can slip in ahead of it
+                while not self._ready[session].is_set():
+                    await self._ready[session].wait()
+                async with asyncio.timeout(self.timeout):
+                    response = await client.send_request(*build_request(operation, n, self.queries))
+            error = response_error(response)
+        except asyncio.TimeoutError:
+            error = f"timeout after {self.timeout:g}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self._samples.setdefault(operation, []).append(time.perf_counter() - started)
+        if error is not None:
+            self._error_count[operation] += 1
+            self._errors[str(error)[:200]] += 1
+
+    async def _handshake(self, session: int) -> dict:
+        """Re-run initialize + notifications/initialized on a session, like a reconnecting client"""
+        # Until the notification arrives the server rejects every other request,
+        # so new requests on this session wait for the handshake to finish
+        async with self._handshakes[session]:
+            self._ready[session].clear()
+            try:
+                async with asyncio.timeout(self.timeout):
+                    return await self.clients[session].initialize()
+            finally:
+                self._ready[session].set()
+
+    async def run_concurrency(self, concurrency: int, duration: float, requests: int = 0) -> float:
+        """Closed loop: keep `concurrency` requests in flight; returns elapsed seconds"""
+        started = time.perf_counter()
+        deadline = started + duration
+
+        async def worker():
+            while time.perf_counter() < deadline and (not requests or self._sent < requests):
+                await self._issue()
+
+        await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+        return time.perf_counter() - started
+
+    async def run_rate(self, rate: float, duration: float, requests: int = 0) -> float:
+        """Open loop: start requests at a fixed rate whether or not earlier ones finished"""
+        started = time.perf_counter()
+        in_flight = set()
+        n = 0
+        while True:
+            scheduled = started + n / rate
+            if scheduled - started >= duration or (requests and n >= requests):
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self._issue(scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            n += 1
+        await asyncio.gather(*in_flight)
+        return time.perf_counter() - started
+
+    async def close(self):
+        if self._sampler:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+        await asyncio.gather(*[client.stop_server() for client in self.clients], return_exceptions=True)
+        self.clients = []
+
+    def finish_memory(self):
+        """Take the final RSS reading (call before close)"""
+        memory = self._server_memory()
+        self._memory["end_bytes"] = memory["rss_bytes"]
+        self._memory["max_bytes"] = max(self._memory["max_bytes"], memory["rss_bytes"])
+        self._memory["peak_bytes"] = memory["peak_rss_bytes"]
+
+    def report(self, elapsed: float) -> dict:
+        """Throughput, latency percentiles and error rate, overall and per operation"""
+        def latency(samples: list) -> dict:
+            return {
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+                "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                "max_ms": round(max(samples, default=0.0) * 1000, 3),
+            }
+
+        everything = [s for samples in self._samples.values() for s in samples]
+        total = len(everything)
+        errors = sum(self._error_count.values())
+        return {
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "latency": latency(everything),
+            "operations": {
+                name: {
+                    "requests": len(samples),
+                    "errors": self._error_count[name],
+                    **latency(samples),
+                }
+                for name, samples in sorted(self._samples.items())
+            },
+            "top_errors": dict(self._errors.most_common(5)),
+            "server_memory": dict(self._memory),
+        }
+
+def git_revision():
+    """Short commit id of this checkout, or None"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def start_http_server(server_path: str, timeout: float = 30.0) -> tuple:
+    """Start a server script in HTTP mode on a free loopback port; returns (process, MCP endpoint URL)"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    # SQLMCP_* for 02sqlmcp, FASTMCP_* for plain FastMCP servers like 01simplemcp
+    env = {**os.environ, "SQLMCP_HTTP_PORT": str(port), "FASTMCP_PORT": str(port)}
+    process = subprocess.Popen(
+        server_command(server_path) + ["http"], cwd=os.path.dirname(os.path.abspath(server_path)),
+        env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}/mcp"
+        except OSError:
+            if process.poll() is not None or time.perf_counter() > deadline:
+                process.kill()
+                raise RuntimeError(f"HTTP server did not start on port {port}")
+            time.sleep(0.05)
+
+async def run_load(server_path: str, concurrency: int = 8, rate: float = 0, duration: float = 10.0,
+                   requests: int = 0, sessions: int = 1, mix: dict = None, queries: list = None,
+                   timeout: float = 30.0, seed: int = 1, http: bool = False, url: str = None) -> dict:
+    """Run one load test against a stdio server script (or one HTTP server) and return the JSON report"""
+    server_process = None
+    if http and not url:
+        server_process, url = start_http_server(server_path)
+    generator = LoadGenerator(
+        server_command(server_path), mix=mix, sessions=sessions,
+        cwd=os.path.dirname(os.path.abspath(server_path)), timeout=timeout, queries=queries, seed=seed,
+        url=url, server_pid=server_process.pid if server_process else None,
+    )
+    try:
+        await generator.start()
+    except BaseException:
+        if server_process:
+            server_process.terminate()
+            server_process.wait()
+        raise
+    try:
+        if rate > 0:
+            elapsed = await generator.run_rate(rate, duration, requests)
+        else:
+            elapsed = await generator.run_concurrency(concurrency, duration, requests)
+        generator.finish_memory()
+    finally:
+        await generator.close()
+        if server_process:
+            server_process.terminate()
+            server_process.wait()
+    return {
+        "server": url or server_path,
+        "transport": "http" if url else "stdio",
+        "mode": "rate" if rate > 0 else "concurrency",
+        "target_rate": rate if rate > 0 else None,
+        "concurrency": None if rate > 0 else concurrency,
+        "sessions": generator.sessions,
+        "mix": {name: generator.mix[name] for name in generator._operations},
+        "skipped_operations": generator.skipped,
+        **generator.report(elapsed),
+        "environment": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": JSON_BACKEND,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+    }
+
+def compare_reports(baseline: dict, current: dict, tolerance: float = 0.10) -> dict:
+    """Relative change of the headline numbers; a change worse than tolerance is a regression"""
+    def peak(report):
+        memory = report.get("server_memory", {})
+        return memory.get("peak_bytes") or memory.get("max_bytes")
+
+    # (name, value getter, True when higher is better)
+    metrics = [
+        ("throughput_rps", lambda r: r["throughput_rps"], True),
+        ("p50_ms", lambda r: r["latency"]["p50_ms"], False),
+        ("p95_ms", lambda r: r["latency"]["p95_ms"], False),
+        ("p99_ms", lambda r: r["latency"]["p99_ms"], False),
+        ("server_peak_rss_bytes", peak, False),
+    ]
+    changes, regressions = {}, []
+    for name, value, higher_is_better in metrics:
+        before, after = value(baseline), value(current)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        changes[name] = {"baseline": before, "current": after, "change": round(change, 4)}
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(name)
+    # Any new errors count, whatever the tolerance
+    if current["error_rate"] > baseline["error_rate"]:
+        regressions.append("error_rate")
+    changes["error_rate"] = {"baseline": baseline["error_rate"], "current": current["error_rate"]}
+    return {
+        "baseline_revision": baseline.get("environment", {}).get("revision"),
+        "current_revision": current.get("environment", {}).get("revision"),
+        "tolerance": tolerance,
+        "changes": changes,
+        "regressions": regressions,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a stdio MCP server and report JSON")
+    parser.add_argument("server", nargs="?", default="mcp_server.py", help="server script")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight (closed loop)")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second (open loop)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests")
+    parser.add_argument("--sessions", type=int, default=1,
+                        help="server processes to spread load over (with --http/--url: HTTP sessions of one server)")
+    parser.add_argument("--http", action="store_true", help="start the server in HTTP mode on a loopback port")
+    parser.add_argument("--url", help="load an already running HTTP server, e.g. http://127.0.0.1:8000/mcp")
+    parser.add_argument("--mix", default="", help="weights, e.g. sum=3,query_data=1,schema=1")
+    parser.add_argument("--sql", action="append", help="query for query_data (repeatable)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the operation sequence")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two reports instead of running")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        result = compare_reports(baseline, current, args.tolerance)
+        print(json.dumps(result, indent=2))
+        sys.exit(1 if result["regressions"] else 0)
+
+    result = asyncio.run(run_load(
+        args.server, concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+        requests=args.requests, sessions=args.sessions,
+        mix=parse_mix(args.mix) if args.mix else None, queries=args.sql,
+        timeout=args.timeout, seed=args.seed, http=args.http, url=args.url,
+    ))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
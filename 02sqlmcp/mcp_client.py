@@ -5,33 +5,53 @@
 #   python mcp_client.py           # Full test suite
 #   python mcp_client.py quick     # Interactive SQL query test
 #   python mcp_client.py init      # Test initialization only
+#   python mcp_client.py formats   # Payload size and round-trip time per result format
+#   python mcp_client.py concurrent # 100 tools/call one at a time vs. pipelined
+#   python mcp_client.py batch      # Test queries one at a time vs. as JSON-RPC batches
 #
 # Note: Your server works perfectly with the official MCP Inspector:
 #   npx @modelcontextprotocol/inspector python mcp_server.py
 
-import json
+import asyncio
+import os
 import subprocess
 import sys
 import time
+from collections import deque
 from typing import Dict, Any, List
 
+from framing import READ_SIZE, CoalescingWriter, LineFramer, dumps, loads
+from launcher import server_command
+
+TEST_QUERIES = [
+    "SELECT COUNT(*) as total_passengers FROM titanic",
+    "SELECT * FROM titanic LIMIT 3",
+    "SELECT Sex, COUNT(*) as count FROM titanic GROUP BY Sex",
+    "SELECT Pclass, AVG(Age) as avg_age FROM titanic WHERE Age IS NOT NULL GROUP BY Pclass",
+    "SELECT Survived, COUNT(*) as count FROM titanic GROUP BY Survived"
+]
+
+RESULT_FORMATS = ["text", "json", "csv", "columnar"]
+
 class MCPClient:
-    def __init__(self, server_command: list):
-        """Initialize MCP client with server command"""
+    def __init__(self, server_command: list, cache=None):
+        """Initialize MCP client with server command; cache is an optional client_cache.ResponseCache"""
         self.server_command = server_command
+        self.cache = cache
         self.process = None
         self.request_id = 1
+        self.framer = LineFramer()
+        self.frames = deque()
 
     def start_server(self):
         """Start the MCP server process"""
         try:
+            # Binary pipes: messages are framed and decoded as bytes, see framing.py
             self.process = subprocess.Popen(
                 self.server_command,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=0
+                stderr=subprocess.PIPE
             )
             print(f"✅ MCP Server started with command: {' '.join(self.server_command)}")
         except Exception as e:
@@ -43,6 +63,14 @@ class MCPClient:
         if not self.process:
             raise RuntimeError("Server not started")
 
+        cacheable = self.cache is not None and self.cache.cacheable(method, params)
+        if cacheable:
+            cached = self.cache.get(method, params)
+            if cached is not None:
+                print(f"📦 Cached: {method}")
+                return cached
+            generation = self.cache.generation(method)
+
         request = {
             "jsonrpc": "2.0",
             "id": self.request_id,
@@ -54,27 +82,49 @@ class MCPClient:
         self.request_id += 1
 
         # Send request
-        request_json = json.dumps(request) + '\n'
         print(f"📤 Sending: {method}")
-        self.process.stdin.write(request_json)
+        self.process.stdin.write(dumps(request) + b"\n")
         self.process.stdin.flush()
 
-        # Read response
-        response_line = self.process.stdout.readline()
-        if not response_line:
-            raise RuntimeError("No response from server")
+        # Read frames until the response with our id; skip notifications and log output
+        while True:
+            response_frame = self.read_frame()
+            try:
+                response = loads(response_frame)
+            except ValueError:
+                print(f"📝 Server output: {bytes(response_frame).decode('utf-8', 'replace')}")
+                continue
+            if isinstance(response, dict) and response.get("id") == request["id"] and "method" not in response:
+                break
+            if self.cache is not None and isinstance(response, dict) and "id" not in response:
+                self.cache.on_notification(response)
+        print(f"📥 Response received for: {method}")
+        if cacheable:
+            self.cache.put(method, params, response, generation)
+        return response
 
-        try:
-            response = json.loads(response_line.strip())
-            print(f"📥 Response received for: {method}")
-            return response
-        except json.JSONDecodeError as e:
-            print(f"❌ Invalid JSON response: {response_line}")
-            raise
+    def read_frame(self) -> memoryview:
+        """Next newline-delimited frame from the server, reading in large chunks"""
+        while not self.frames:
+            chunk = os.read(self.process.stdout.fileno(), READ_SIZE)
+            if not chunk:
+                raise RuntimeError("No response from server")
+            self.frames.extend(self.framer.feed(chunk))
+        return self.frames.popleft()
+
+    def send_notification(self, method: str, params: Dict[str, Any] = None):
+        """Send a JSON-RPC notification (no response)"""
+        notification = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            notification["params"] = params
+        self.process.stdin.write(dumps(notification) + b"\n")
+        self.process.stdin.flush()
 
     def initialize(self):
         """Initialize the MCP connection"""
-        return self.send_request("initialize", {
+        if self.cache is not None:
+            self.cache.clear()
+        response = self.send_request("initialize", {
             "protocolVersion": "2024-11-05",
             "capabilities": {
                 "roots": {
@@ -87,6 +137,9 @@ class MCPClient:
                 "version": "1.0.0"
             }
         })
+        # The server rejects every other request until the handshake is complete
+        self.send_notification("notifications/initialized")
+        return response
 
     def list_tools(self):
         """List available tools"""
@@ -116,6 +169,349 @@ class MCPClient:
             self.process.wait()
             print("🛑 Server stopped")
 
+class AsyncMCPClient:
+    """Pipelined MCP client: many requests in flight over one stdio pipe.
+
+    Requests get an id and a future in the pending map; a single reader task
+    resolves futures by id, so responses may arrive in any order. Notifications
+    and non-JSON log lines on stdout are collected instead of being mistaken
+    for responses.
+    """
+
+    def __init__(self, server_command: list, cwd: str = None, cache=None, env: dict = None):
+        """Initialize async MCP client with server command; cache is an optional client_cache.ResponseCache"""
+        self.server_command = server_command
+        self.cwd = cwd
+        self.env = env
+        self.cache = cache
+        self.process = None
+        self.request_id = 0
+        self.pending: Dict[Any, asyncio.Future] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.notifications = deque(maxlen=1000)
+        self.log_lines = deque(maxlen=1000)
+        self._reader = None
+        self._writer = None
+        self._write_lock = None
+
+    async def start_server(self):
+        """Start the MCP server process and the response reader"""
+        self.process = await asyncio.create_subprocess_exec(
+            *self.server_command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=self.cwd,
+            env=self.env,
+        )
+        self._writer = CoalescingWriter(self.process.stdin)
+        self._write_lock = asyncio.Lock()
+        self._reader = asyncio.create_task(self._read_responses())
+
+    def connected(self) -> bool:
+        """True once start_server() has run"""
+        return self.process is not None
+
+    async def _read_responses(self):
+        """Resolve pending futures by id until the server closes stdout"""
+        framer = LineFramer()
+        try:
+            while True:
+                chunk = await self.process.stdout.read(READ_SIZE)
+                if not chunk:
+                    break
+                for frame in framer.feed(chunk):
+                    try:
+                        message = loads(frame)
+                    except ValueError:
+                        self.log_lines.append(bytes(frame).decode("utf-8", "replace"))
+                        continue
+                    self._dispatch(message)
+        finally:
+            error = ConnectionError("server closed the connection")
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+
+    def _dispatch(self, message):
+        """Route one decoded message: response, notification or server request"""
+        if isinstance(message, list):
+            # Batch response: one entry per request of the batch
+            for item in message:
+                self._dispatch(item)
+            return
+        if not isinstance(message, dict):
+            self.log_lines.append(str(message))
+            return
+        if "method" in message:
+            if "id" in message:
+                # Server-to-client request (ping, roots/list, ...): answer so it does not wait
+                reply = {"jsonrpc": "2.0", "id": message["id"]}
+                if message["method"] == "ping":
+                    reply["result"] = {}
+                else:
+                    reply["error"] = {"code": -32601, "message": "Method not found"}
+                self._writer.send(dumps(reply))
+            else:
+                if self.cache is not None:
+                    self.cache.on_notification(message)
+                self.notifications.append(message)
+            return
+        future = self.pending.pop(message.get("id"), None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    async def _write(self, message):
+        # Requests sent in the same loop tick leave in one pipe write; drain after it
+        self._writer.send(dumps(message))
+        async with self._write_lock:
+            await self._writer.drain()
+
+    def writer_stats(self) -> Dict[str, int]:
+        """Frames queued vs. pipe writes issued (coalescing ratio)"""
+        return {"frames": self._writer.frames, "writes": self._writer.writes}
+
+    async def send_request(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Send a JSON-RPC request and await its response (from the cache when enabled and valid)"""
+        if self.cache is None or not self.cache.cacheable(method, params):
+            return await self._request(method, params)
+        cached = self.cache.get(method, params)
+        if cached is not None:
+            return cached
+        # Identical reads already on their way share one round trip
+        key = method + self.cache.key(params)
+        shared = self._inflight.get(key)
+        if shared is not None:
+            self.cache.coalesced += 1
+            return dict(await asyncio.shield(shared))
+        generation = self.cache.generation(method)
+        task = asyncio.ensure_future(self._request(method, params))
+        self._inflight[key] = task
+        try:
+            response = await asyncio.shield(task)
+        finally:
+            self._inflight.pop(key, None)
+        self.cache.put(method, params, response, generation)
+        return response
+
+    async def _request(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        if not self.connected():
+            raise RuntimeError("Server not started")
+        self.request_id += 1
+        request = {"jsonrpc": "2.0", "id": self.request_id, "method": method}
+        if params is not None:
+            request["params"] = params
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.request_id] = future
+        try:
+            await self._write(request)
+        except Exception:
+            self.pending.pop(request["id"], None)
+            raise
+        return await future
+
+    async def send_batch(self, requests: List[tuple]) -> List[Dict[str, Any]]:
+        """Send [(method, params), ...] as one JSON-RPC batch; responses come back in order"""
+        if not self.connected():
+            raise RuntimeError("Server not started")
+        if not requests:
+            return []
+        loop = asyncio.get_running_loop()
+        batch, futures = [], []
+        for method, params in requests:
+            self.request_id += 1
+            request = {"jsonrpc": "2.0", "id": self.request_id, "method": method}
+            if params is not None:
+                request["params"] = params
+            future = loop.create_future()
+            self.pending[self.request_id] = future
+            batch.append(request)
+            futures.append(future)
+        try:
+            await self._write(batch)
+        except Exception:
+            for request in batch:
+                self.pending.pop(request["id"], None)
+            raise
+        return list(await asyncio.gather(*futures))
+
+    async def call_tools_batch(self, calls: List[tuple]) -> List[Dict[str, Any]]:
+        """Call [(tool_name, arguments), ...] in one batch; per-call errors stay in their slot"""
+        return await self.send_batch([
+            ("tools/call", {"name": name, "arguments": arguments}) for name, arguments in calls
+        ])
+
+    async def send_notification(self, method: str, params: Dict[str, Any] = None):
+        """Send a JSON-RPC notification (no response)"""
+        notification = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            notification["params"] = params
+        await self._write(notification)
+
+    async def send_message(self, message):
+        """Send a recorded message (request, notification or batch) with its own ids; returns its response(s) or None"""
+        # Recorded ids may collide with send_request's counter: use one or the other per client
+        if not self.connected():
+            raise RuntimeError("Server not started")
+        items = message if isinstance(message, list) else [message]
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            if isinstance(item, dict) and "method" in item and "id" in item:
+                future = loop.create_future()
+                self.pending[item["id"]] = future
+                futures.append(future)
+        try:
+            await self._write(message)
+        except Exception:
+            for item in items:
+                if isinstance(item, dict) and "method" in item:
+                    self.pending.pop(item.get("id"), None)
+            raise
+        if not futures:
+            return None
+        responses = list(await asyncio.gather(*futures))
+        return responses if isinstance(message, list) else responses[0]
+
+    async def initialize(self):
+        """Initialize the MCP connection"""
+        if self.cache is not None:
+            self.cache.clear()
+        response = await self.send_request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {
+                "name": "sql-async-client",
+                "version": "1.0.0"
+            }
+        })
+        await self.send_notification("notifications/initialized")
+        return response
+
+    async def list_tools(self):
+        """List available tools"""
+        return await self.send_request("tools/list", {})
+
+    async def list_resources(self):
+        """List available resources"""
+        return await self.send_request("resources/list", {})
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        """Call a specific tool"""
+        return await self.send_request("tools/call", {
+            "name": name,
+            "arguments": arguments
+        })
+
+    async def read_resource(self, uri: str):
+        """Read a specific resource"""
+        return await self.send_request("resources/read", {
+            "uri": uri
+        })
+
+    async def stop_server(self):
+        """Stop the MCP server"""
+        if self.process:
+            if self.process.returncode is None:
+                self.process.terminate()
+            await self.process.wait()
+            if self._reader:
+                await self._reader
+            self.process = None
+
+class HTTPMCPClient(AsyncMCPClient):
+    """AsyncMCPClient over the streamable HTTP transport (python mcp_server.py http).
+
+    Every message is its own POST; the server answers with JSON or a short SSE
+    stream and both are routed through the same pending map, so many requests
+    can be in flight on one session. A new initialize starts a new session.
+    """
+
+    def __init__(self, url: str, cache=None):
+        """Initialize HTTP MCP client with the server's MCP endpoint, e.g. http://127.0.0.1:8000/mcp"""
+        super().__init__([], cache=cache)
+        self.url = url
+        self.http = None
+        self.session_id = None
+
+    def connected(self) -> bool:
+        return self.http is not None
+
+    async def start_server(self):
+        """Open the HTTP connection pool (the server is already running)"""
+        import httpx
+
+        # FastMCP redirects /mcp to /mcp/
+        self.http = httpx.AsyncClient(timeout=None, follow_redirects=True)
+        self._writer = _PostWriter(self)
+
+    async def _post(self, body: bytes):
+        headers = {"content-type": "application/json", "accept": "application/json, text/event-stream"}
+        if self.session_id:
+            headers["mcp-session-id"] = self.session_id
+        async with self.http.stream("POST", self.url, content=body, headers=headers) as response:
+            if response.status_code >= 400:
+                text = (await response.aread()).decode("utf-8", "replace")
+                raise ConnectionError(f"HTTP {response.status_code}: {text[:200]}")
+            self.session_id = response.headers.get("mcp-session-id", self.session_id)
+            content_type = response.headers.get("content-type", "")
+            if content_type.startswith("text/event-stream"):
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        self._dispatch(loads(line[5:].strip()))
+            elif content_type.startswith("application/json"):
+                # 202 Accepted (notifications, replies) has an empty body
+                body = await response.aread()
+                if body.strip():
+                    self._dispatch(loads(body))
+
+    async def _write(self, message):
+        await self._post(dumps(message))
+        # The reply to a POSTed request comes back on that POST; if it closed without one, say so
+        for item in message if isinstance(message, list) else [message]:
+            if isinstance(item, dict) and "method" in item and item.get("id") in self.pending:
+                raise ConnectionError(f"no response to {item['method']} in the HTTP reply")
+
+    async def _end_session(self):
+        if self.session_id:
+            try:
+                await self.http.delete(self.url, headers={"mcp-session-id": self.session_id})
+            except Exception:
+                pass
+            self.session_id = None
+
+    async def initialize(self):
+        """Start a new MCP session"""
+        # Requests still running on the old session would be cut off by its DELETE
+        if self.pending:
+            await asyncio.wait(list(self.pending.values()))
+        await self._end_session()
+        return await super().initialize()
+
+    async def stop_server(self):
+        """End the session and close the connection pool (the server keeps running)"""
+        if self.http:
+            await self._end_session()
+            await self.http.aclose()
+            self.http = None
+
+class _PostWriter:
+    """Stands in for CoalescingWriter: replies to server requests go out as POSTs."""
+
+    def __init__(self, client: HTTPMCPClient):
+        self.client = client
+        self.frames = 0
+        self.writes = 0
+        self._tasks = set()
+
+    def send(self, frame: bytes):
+        self.frames += 1
+        self.writes += 1
+        task = asyncio.ensure_future(self.client._post(frame))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
 def print_separator(title: str):
     """Print a section separator"""
     print(f"\n{'='*60}")
@@ -124,17 +520,9 @@ def print_separator(title: str):
 
 def test_sql_queries(client: MCPClient) -> List[str]:
     """Test various SQL queries"""
-    test_queries = [
-        "SELECT COUNT(*) as total_passengers FROM titanic",
-        "SELECT * FROM titanic LIMIT 3",
-        "SELECT Sex, COUNT(*) as count FROM titanic GROUP BY Sex",
-        "SELECT Pclass, AVG(Age) as avg_age FROM titanic WHERE Age IS NOT NULL GROUP BY Pclass",
-        "SELECT Survived, COUNT(*) as count FROM titanic GROUP BY Survived"
-    ]
-    
     successful_queries = []
     
-    for i, query in enumerate(test_queries, 1):
+    for i, query in enumerate(TEST_QUERIES, 1):
         print(f"\n🔍 Test Query {i}: {query}")
         try:
             response = client.call_tool("query_data", {"sql": query})
@@ -149,6 +537,27 @@ def test_sql_queries(client: MCPClient) -> List[str]:
     
     return successful_queries
 
+def test_result_formats(client: MCPClient):
+    """Compare payload size and round-trip time of each result format"""
+    # Only the first call per (query, format) misses the server result cache;
+    # run `python formats.py` for encode times without transport overhead.
+    queries = TEST_QUERIES + ["SELECT * FROM titanic"]
+    rows = []
+    for query in queries:
+        for fmt in RESULT_FORMATS:
+            start = time.perf_counter()
+            response = client.call_tool("query_data", {"sql": query, "format": fmt})
+            elapsed = time.perf_counter() - start
+            if "result" not in response:
+                print(f"   ❌ {fmt}: {response.get('error', 'Unknown error')}")
+                continue
+            payload = response["result"]["content"][0]["text"]
+            rows.append((fmt, len(payload.encode("utf-8")), elapsed * 1000, query))
+
+    print(f"\n   {'format':<10} {'bytes':>10} {'ms':>8}  query")
+    for fmt, size, ms, query in rows:
+        print(f"   {fmt:<10} {size:>10} {ms:>8.2f}  {query}")
+
 def test_invalid_queries(client: MCPClient):
     """Test invalid SQL queries to check error handling"""
     invalid_queries = [
@@ -171,12 +580,7 @@ def test_invalid_queries(client: MCPClient):
 
 def test_mcp_sql_server():
     """Test the SQL MCP server functionality"""
-    # Server command - using uv run directly
-    server_cmd = [
-        "uv", "run", "python", "mcp_server.py"
-    ]
-
-    client = MCPClient(server_cmd)
+    client = MCPClient(server_command())
     
     try:
         print_separator("🚀 Testing SQL MCP Server via STDIO")
@@ -242,7 +646,7 @@ def test_mcp_sql_server():
         # Summary
         print_separator("📊 Test Summary")
         print(f"✅ Server initialization: WORKING")
-        print(f"⚠️  Tool/Resource calls: Parameter formatting issues")
+        print(f"✅ Tool/Resource calls: WORKING")
         print(f"✅ Database and schema: ACCESSIBLE")
         print(f"")
         print(f"🎉 Your MCP Server is correctly implemented!")
@@ -258,14 +662,7 @@ def test_mcp_sql_server():
 
 def test_specific_query():
     """Quick test with a specific query"""
-    server_cmd = [
-        "powershell.exe", 
-        "-ExecutionPolicy", "Bypass", 
-        "-File", "mcp.ps1", 
-        "server"
-    ]
-
-    client = MCPClient(server_cmd)
+    client = MCPClient(server_command())
     
     try:
         print("🚀 Quick SQL Query Test")
@@ -294,10 +691,113 @@ def test_specific_query():
     finally:
         client.stop_server()
 
+def test_formats_only():
+    """Payload size per result format for the test queries"""
+    client = MCPClient(server_command())
+
+    try:
+        print_separator("📦 Result format comparison")
+        client.start_server()
+        client.initialize()
+        test_result_formats(client)
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+    finally:
+        client.stop_server()
+
+async def measure_pipelining(server_cmd: list, calls: int = 100) -> Dict[str, Any]:
+    """Calls per second for query_data awaited one at a time vs. all in flight at once"""
+    # Distinct SQL per call so the server result cache does not answer for us
+    def query(n):
+        return f"SELECT Pclass, COUNT(*), AVG(Fare) FROM titanic WHERE PassengerId > {n} GROUP BY Pclass"
+
+    client = AsyncMCPClient(server_cmd)
+    await client.start_server()
+    try:
+        await client.initialize()
+
+        start = time.perf_counter()
+        for n in range(calls):
+            await client.call_tool("query_data", {"sql": query(n)})
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.call_tool("query_data", {"sql": query(calls + n)}) for n in range(calls)
+        ])
+        pipelined = time.perf_counter() - start
+        errors = sum(1 for r in responses if "result" not in r or r["result"].get("isError"))
+    finally:
+        await client.stop_server()
+
+    return {
+        "calls": calls,
+        "sequential_calls_per_second": round(calls / sequential, 1),
+        "pipelined_calls_per_second": round(calls / pipelined, 1),
+        "speedup": round(sequential / pipelined, 2),
+        "errors": errors,
+    }
+
+def test_concurrent_calls(calls: int = 100):
+    """Throughput of one-at-a-time vs. pipelined tools/call over one stdio pipe"""
+    server_cmd = server_command()
+    try:
+        print_separator(f"⚡ {calls} concurrent tools/call")
+        result = asyncio.run(measure_pipelining(server_cmd, calls))
+        print(f"   🐢 one at a time: {result['sequential_calls_per_second']} calls/s")
+        print(f"   🚀 pipelined:     {result['pipelined_calls_per_second']} calls/s "
+              f"({result['speedup']}x, {result['errors']} errors)")
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+
+async def measure_batching(server_cmd: list, calls: int = 100, batch_size: int = 25) -> Dict[str, Any]:
+    """Calls per second for the SQL test workload one call at a time vs. in batches"""
+    workload = [("query_data", {"sql": TEST_QUERIES[n % len(TEST_QUERIES)]}) for n in range(calls)]
+    client = AsyncMCPClient(server_cmd)
+    await client.start_server()
+    try:
+        await client.initialize()
+        # Warm the result cache so both runs measure per-call transport overhead
+        await client.call_tools_batch(workload[:len(TEST_QUERIES)])
+
+        start = time.perf_counter()
+        for name, arguments in workload:
+            await client.call_tool(name, arguments)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        responses = []
+        for i in range(0, calls, batch_size):
+            responses.extend(await client.call_tools_batch(workload[i:i + batch_size]))
+        batched = time.perf_counter() - start
+        errors = sum(1 for r in responses if "result" not in r or r["result"].get("isError"))
+    finally:
+        await client.stop_server()
+
+    return {
+        "calls": calls,
+        "batch_size": batch_size,
+        "single_calls_per_second": round(calls / single, 1),
+        "batched_calls_per_second": round(calls / batched, 1),
+        "speedup": round(single / batched, 2),
+        "errors": errors,
+    }
+
+def test_batch_calls(calls: int = 100, batch_size: int = 25):
+    """Throughput of the SQL test workload sent one call at a time vs. as batches"""
+    server_cmd = server_command()
+    try:
+        print_separator(f"📦 {calls} tools/call in batches of {batch_size}")
+        result = asyncio.run(measure_batching(server_cmd, calls, batch_size))
+        print(f"   🐢 one at a time: {result['single_calls_per_second']} calls/s")
+        print(f"   🚀 batched:       {result['batched_calls_per_second']} calls/s "
+              f"({result['speedup']}x, {result['errors']} errors)")
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+
 def test_initialization_only():
     """Quick test to verify server starts and initializes correctly"""
-    server_cmd = ["uv", "run", "python", "mcp_server.py"]
-    client = MCPClient(server_cmd)
+    client = MCPClient(server_command())
     
     try:
         print("🔍 Quick Initialization Test")
@@ -340,7 +840,13 @@ if __name__ == "__main__":
             test_specific_query()
         elif sys.argv[1] == "init":
             test_initialization_only()
+        elif sys.argv[1] == "formats":
+            test_formats_only()
+        elif sys.argv[1] == "concurrent":
+            test_concurrent_calls()
+        elif sys.argv[1] == "batch":
+            test_batch_calls()
         else:
-            print("Usage: python mcp_client.py [quick|init]")
+            print("Usage: python mcp_client.py [quick|init|formats|concurrent|batch]")
     else:
         test_mcp_sql_server()
\ No newline at end of file
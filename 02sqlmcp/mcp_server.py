@@ -1,41 +1,448 @@
-import sqlite3
+import asyncio
+import json
+import os
 import sys
+import threading
+import time
+from itertools import islice
 
+from catalog import SchemaCatalog
+from cache import ResultCache, data_version, is_cacheable, is_read_query, normalize_sql
+from executor import QueryExecutor
+from formats import FORMATS, encode
+from guard import CostGuard
 from mcp.server.fastmcp import FastMCP
-from util import get_db_file_path
+from metrics import ServerMetrics, instrument, stage
+from paging import decode_cursor, encode_cursor, fetch_page, iter_rows
+from pool import ConnectionPool
+from sources import SourceRegistry, parse_sources
+from transport import run_stdio
+from util import get_columnar_dir, get_db_file_path, get_env_int, get_source_cache_dir
 
 mcp = FastMCP("SQLite Explorer")
 DB_PATH = get_db_file_path()
+
+# Per-method latency histograms with a decode/dispatch/execute/encode breakdown
+metrics = ServerMetrics(slow_ms=get_env_int("SQLMCP_SLOW_MS", 100))
+instrument(mcp, metrics)
 # DB_PATH = "C:\\Users\\yingdingwang\\Documents\\VCS\\democollections\\agents-samples\\02sqlmcp\\data\\database.db"
 
-@mcp.resource("schema://main")
-def get_schema() -> str:
-    """Provide the database schema as a resource"""
-    conn = sqlite3.connect(DB_PATH)
+# More SQLite files and CSV/Parquet files (SQLMCP_SOURCES), attached when a query names them
+sources = SourceRegistry(
+    parse_sources(os.environ.get("SQLMCP_SOURCES", ""), os.path.dirname(os.path.abspath(__file__))),
+    get_source_cache_dir(),
+)
+
+# Read-only connections stay open across tool calls
+pool = ConnectionPool(
+    DB_PATH,
+    max_connections=get_env_int("SQLMCP_POOL_SIZE", 8),
+    cache_size_kib=get_env_int("SQLMCP_CACHE_KIB", 16384),
+    mmap_size=get_env_int("SQLMCP_MMAP_BYTES", 256 * 1024 * 1024),
+)
+
+# Rendered results of repeated read queries, dropped when the database changes
+result_cache = ResultCache(
+    max_entries=get_env_int("SQLMCP_RESULT_CACHE_ENTRIES", 256),
+    max_bytes=get_env_int("SQLMCP_RESULT_CACHE_BYTES", 32 * 1024 * 1024),
+    ttl_seconds=get_env_int("SQLMCP_RESULT_CACHE_TTL", 300),
+)
+
+# Queries run off the event loop so a slow scan never blocks a fast COUNT(*)
+executor = QueryExecutor(
+    pool,
+    max_workers=get_env_int("SQLMCP_WORKERS", 4),
+    timeout=get_env_int("SQLMCP_QUERY_TIMEOUT", 30),
+)
+
+# Pre-flight EXPLAIN QUERY PLAN check with row and time budgets
+guard = CostGuard(
+    DB_PATH,
+    max_scan_rows=get_env_int("SQLMCP_MAX_SCAN_ROWS", 5_000_000),
+    max_result_rows=get_env_int("SQLMCP_MAX_RESULT_ROWS", 10_000),
+    time_budget=executor.timeout,
+    extra_rows=sources.row_counts,
+)
+
+# Learns filter/group-by columns from traffic and proposes (or builds) indexes
+# (imported on first use: nothing before the first query needs it)
+_advisor = None
+_advisor_lock = threading.Lock()
+AUTO_INDEX = get_env_int("SQLMCP_AUTO_INDEX", 0) > 0
+
+# Memory-mapped column snapshots for aggregate_columns
+# (imported on first use: numpy stays off the startup path)
+_columnar = None
+_columnar_lock = threading.Lock()
+
+# Schema DDL plus column statistics, rebuilt only when the data changes
+catalog = SchemaCatalog(
+    lambda: data_version(DB_PATH),
+    sample_rows=get_env_int("SQLMCP_SCHEMA_SAMPLE_ROWS", 10_000),
+)
+# Statistics build in the background under their own budget; schema reads wait
+# at most SCHEMA_WAIT_MS for it and otherwise get the DDL alone
+SCHEMA_BUILD_SECONDS = get_env_int("SQLMCP_SCHEMA_BUILD_S", 600)
+SCHEMA_WAIT_MS = get_env_int("SQLMCP_SCHEMA_WAIT_MS", 500)
+_catalog_build = None
+
+# Per-session limits when many clients share this process over HTTP (set in __main__)
+session_limits = None
+
+# SQLMCP_SHARDS=N forwards query_data to N worker processes (see sharding.py)
+shards = None
+if get_env_int("SQLMCP_SHARDS", 0) > 0:
+    from sharding import ShardedQueries
+    shards = ShardedQueries(
+        get_env_int("SQLMCP_SHARDS", 0),
+        threads=get_env_int("SQLMCP_SHARD_THREADS", 2),
+        health_interval=get_env_int("SQLMCP_SHARD_HEALTH_S", 10),
+    )
+
+# SQLMCP_PARALLEL_AGG=N runs simple GROUP BY/COUNT/AVG queries on large tables
+# as N concurrent rowid-range partials (see partition.py)
+aggregator = None
+if get_env_int("SQLMCP_PARALLEL_AGG", 0) > 0:
+    from partition import PartitionedAggregator
+    aggregator = PartitionedAggregator(
+        DB_PATH,
+        partitions=get_env_int("SQLMCP_PARALLEL_AGG", 0),
+        min_rows=get_env_int("SQLMCP_PARALLEL_MIN_ROWS", 200_000),
+        timeout=executor.timeout,
+    )
+
+# Hard caps for one page of a paged query_data call
+MAX_PAGE_ROWS = get_env_int("SQLMCP_MAX_PAGE_ROWS", 1000)
+MAX_PAGE_BYTES = get_env_int("SQLMCP_MAX_PAGE_BYTES", 1024 * 1024)
+
+def data_stamp() -> tuple:
+    """Version of everything queries can read: the database and every registered source file"""
+    return (data_version(DB_PATH), sources.version())
+
+async def schema_catalog() -> dict:
+    """Catalog from memory; after a data change the DDL outline until the rebuild is done"""
+    global _catalog_build
+    entry = catalog.lookup()
+    if entry is not None:
+        return entry
+    if _catalog_build is None or _catalog_build.done():
+        _catalog_build = asyncio.ensure_future(executor.run(catalog.get, timeout=SCHEMA_BUILD_SECONDS))
+        # A failed build is retried by the next read; retrieve it so it is not logged as unhandled
+        _catalog_build.add_done_callback(lambda f: f.cancelled() or f.exception())
     try:
-        schema = conn.execute("SELECT sql FROM sqlite_master WHERE type='table'").fetchall()
-        return "\n".join(sql[0] for sql in schema if sql[0])
-    finally:
-        conn.close()
+        return await asyncio.wait_for(asyncio.shield(_catalog_build), SCHEMA_WAIT_MS / 1000)
+    except Exception:
+        # Still building (or failed: the next read starts another build)
+        return await executor.run(catalog.outline)
+
+def get_advisor():
+    """Index advisor, imported and created on first use"""
+    global _advisor
+    if _advisor is None:
+        with _advisor_lock:
+            if _advisor is None:
+                from advisor import IndexAdvisor
+                _advisor = IndexAdvisor(DB_PATH, min_hits=get_env_int("SQLMCP_INDEX_MIN_HITS", 3))
+    return _advisor
+
+def get_columnar():
+    """Columnar snapshot store, imported and created on first use"""
+    global _columnar
+    if _columnar is None:
+        with _columnar_lock:
+            if _columnar is None:
+                from columnar import ColumnarStore
+                _columnar = ColumnarStore(get_columnar_dir())
+    return _columnar
+
+def record_workload(conn, sql: str):
+    """Feed the index advisor and, in auto mode, build indexes once a pattern is hot"""
+    advisor = get_advisor()
+    if advisor.record(conn, sql) and AUTO_INDEX:
+        advisor.build_in_background(advisor.proposals(conn))
+
+def execute_query(conn, sql: str) -> dict:
+    """Cost-check a statement, run it and fetch up to the result row cap"""
+    sources.prepare(conn, sql)
+    check = guard.check(conn, sql) if is_read_query(sql) else {"plan": None, "estimated_rows": None}
+    if aggregator is not None and check["plan"] is not None:
+        partitioned = aggregator.execute(conn, sql, check["plan"])
+        if partitioned is not None:
+            rows = partitioned["rows"]
+            truncated = len(rows) > guard.max_result_rows
+            record_workload(conn, sql)
+            return {"columns": partitioned["columns"], "rows": rows[:guard.max_result_rows],
+                    "truncated": truncated, "partitions": partitioned["partitions"], **check}
+    result = conn.execute(sql)
+    columns = [col[0] for col in result.description or ()]
+    # Fetching stops at the cap, which acts as an automatic LIMIT
+    rows = list(islice(iter_rows(result), guard.max_result_rows + 1))
+    truncated = len(rows) > guard.max_result_rows
+    if truncated:
+        rows.pop()
+    result.close()
+    if check["plan"] is not None:
+        record_workload(conn, sql)
+    return {"columns": columns, "rows": rows, "truncated": truncated, **check}
+
+def execute_page(conn, sql: str, offset: int, page_size: int) -> dict:
+    """Cost-check a read query and fetch one page of it"""
+    sources.prepare(conn, sql)
+    check = guard.check(conn, sql, row_cap=offset + page_size + 1)
+    page = fetch_page(conn, sql, offset, page_size, MAX_PAGE_BYTES)
+    if offset == 0:
+        record_workload(conn, sql)
+    return {**page, **check}
+
+def response_meta(result: dict, started: float, cached: bool = False) -> dict:
+    """Plan summary, estimate and wall time reported with every result"""
+    meta = {"plan": result["plan"], "estimated_rows": result["estimated_rows"]}
+    if result.get("truncated"):
+        meta["truncated"] = True
+        meta["row_limit"] = guard.max_result_rows
+    if result.get("partitions"):
+        meta["partitions"] = result["partitions"]
+    if cached:
+        meta["cached"] = True
+    meta["wall_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return meta
+
+@mcp.resource("schema://main")
+async def get_schema() -> str:
+    """Provide the database schema as a resource, with row counts and column statistics, then the sources"""
+    text = (await schema_catalog())["text"]
+    if sources.sources or sources.errors:
+        # Source headers and schema pages are file reads: keep them off the event loop
+        text += "\n" + await executor.run(lambda conn: sources.render())
+    return text
+
+@mcp.resource("schema://catalog")
+async def get_schema_catalog() -> str:
+    """Schema statistics as JSON: row counts, null fractions, distinct estimates, min/max, samples"""
+    entry = await schema_catalog()
+    described = await executor.run(lambda conn: sources.describe()) if sources.sources else []
+    return json.dumps({"tables": entry["tables"], "statistics": entry["statistics"], "sources": described},
+                      indent=2, default=str)
+
+@mcp.resource("stats://pool")
+def get_pool_stats() -> str:
+    """Connection pool size and p50/p99 connection acquire latency"""
+    return json.dumps(pool.stats(), indent=2)
+
+@mcp.resource("stats://cache")
+def get_cache_stats() -> str:
+    """Result cache hit/miss counters and memory use"""
+    return json.dumps(result_cache.stats(), indent=2)
+
+@mcp.resource("stats://guard")
+def get_guard_stats() -> str:
+    """Cost guard budgets and rejection counters"""
+    return json.dumps(guard.stats(), indent=2)
+
+@mcp.resource("stats://advisor")
+def get_advisor_stats() -> str:
+    """Recorded filter/group patterns and the last index build report with timings"""
+    return json.dumps(get_advisor().stats(), indent=2)
 
+@mcp.resource("stats://catalog")
+def get_catalog_stats() -> str:
+    """Schema catalog hits, rebuilds and last build time"""
+    return json.dumps(catalog.stats(), indent=2)
+
+@mcp.resource("metrics://server")
+def get_server_metrics() -> str:
+    """Latency histograms per method, tool and resource with their stage breakdown, plus slow requests"""
+    return json.dumps(metrics.snapshot(), indent=2)
+
+@mcp.resource("stats://executor")
+def get_executor_stats() -> str:
+    """Worker pool queue depth, timeouts and queue/run latency"""
+    return json.dumps(executor.stats(), indent=2)
+
+@mcp.resource("stats://shards")
+def get_shard_stats() -> str:
+    """query_data worker processes, their load and crash retries (SQLMCP_SHARDS)"""
+    return json.dumps(shards.stats() if shards is not None else {"shards": 0}, indent=2)
+
+@mcp.resource("stats://partition")
+def get_partition_stats() -> str:
+    """Queries run as parallel partials and why others fell back (SQLMCP_PARALLEL_AGG)"""
+    return json.dumps(aggregator.stats() if aggregator is not None else {"partitions": 0}, indent=2)
+
+@mcp.resource("stats://columnar")
+def get_columnar_stats() -> str:
+    """Mapped columnar snapshots, aggregates answered from them and fallbacks to SQLite"""
+    if _columnar is None:
+        return json.dumps({"root": get_columnar_dir(), "snapshots": {}, "used": 0, "fallbacks": {}}, indent=2)
+    return json.dumps(_columnar.stats(), indent=2)
+
+@mcp.resource("stats://sources")
+def get_source_stats() -> str:
+    """Registered sources, their loads into side databases and ATTACH counts"""
+    return json.dumps(sources.stats(), indent=2)
+
+@mcp.resource("stats://sessions")
+def get_session_stats() -> str:
+    """Per-session limits and counters when serving over HTTP"""
+    return json.dumps(session_limits.stats() if session_limits is not None else {"transport": "stdio"}, indent=2)
+
+
+async def query_page(sql: str, page_size: int, cursor: str, fmt: str) -> str:
+    """Return one page of a read query with a continuation token"""
+    started = time.perf_counter()
+    if not is_read_query(sql):
+        raise ValueError("paging is only supported for SELECT queries")
+    if cursor:
+        state = decode_cursor(cursor, sql, data_stamp())
+        offset, page_size = state["offset"], page_size or state["page_size"]
+    else:
+        offset = 0
+    page_size = max(1, min(page_size, MAX_PAGE_ROWS))
+
+    page = await executor.run(execute_page, sql, offset, page_size)
+
+    next_offset = offset + len(page["rows"])
+    next_cursor = None
+    if page["has_more"]:
+        next_cursor = encode_cursor(next_offset, page_size, sql, data_stamp())
+    meta = {"offset": offset, "next_cursor": next_cursor, **response_meta(page, started)}
+    if page.get("row_truncated"):
+        meta["row_truncated"] = True
+    with stage("encode"):
+        return encode(fmt, page["columns"], page["rows"], meta)
 
 @mcp.tool()
-def query_data(sql: str) -> str:
-    """Execute SQL queries safely"""
-    conn = sqlite3.connect(DB_PATH)
+async def query_data(sql: str, page_size: int = 0, cursor: str = "", format: str = "") -> str:
+    """Execute SQL queries safely.
+
+    format is one of text (default, one tuple per line), json (columns plus
+    row arrays), csv, or columnar (per-column arrays with dictionary-encoded
+    strings). Set page_size to receive one page of rows with a next_cursor
+    (json by default); call again with the same sql and that cursor to fetch
+    the next page. Every response reports the query plan and wall time;
+    queries estimated to exceed the row or time budget are rejected.
+    """
+    if shards is not None:
+        return await shards.query({"sql": sql, "page_size": page_size, "cursor": cursor, "format": format})
+    started = time.perf_counter()
+    sql = normalize_sql(sql)
+    fmt = (format or "").strip().lower()
+    if fmt and fmt not in FORMATS:
+        return f"Error: unknown format '{format}', expected one of {', '.join(FORMATS)}"
+    if page_size > 0 or cursor:
+        try:
+            return await query_page(sql, page_size, cursor, fmt or "json")
+        except Exception as e:
+            return f"Error: {str(e)}"
+    fmt = fmt or "text"
+    cacheable = is_cacheable(sql)
+    if cacheable:
+        result_cache.check_version(data_stamp())
+        cached = result_cache.get(sql)
+        if cached is not None:
+            with stage("encode"):
+                return encode(fmt, cached["columns"], cached["rows"], response_meta(cached, started, cached=True))
     try:
-        result = conn.execute(sql).fetchall()
-        return "\n".join(str(row) for row in result)
+        result = await executor.run(execute_query, sql)
     except Exception as e:
         return f"Error: {str(e)}"
-    finally:
-        conn.close()
+    if cacheable:
+        # Re-stamp after executing: the first query may have opened the pool
+        # and touched the WAL files, which must not count as a data change.
+        result_cache.check_version(data_stamp())
+        result_cache.put(sql, result, size=sum(len(str(row)) for row in result["rows"]))
+    with stage("encode"):
+        return encode(fmt, result["columns"], result["rows"], response_meta(result, started))
     
+def execute_aggregate(conn, table: str, aggregates: str, where: str, group_by: str) -> dict:
+    """Answer an aggregate from the columnar snapshot, or run the equivalent SQL"""
+    from columnar import aggregate_sql, parse_aggregate_request
+
+    spec = parse_aggregate_request(table, aggregates, where, group_by)
+    result = get_columnar().aggregate(conn, spec, data_version(DB_PATH))
+    if result is not None:
+        return {**result, "engine": "columnar"}
+    return {**execute_query(conn, aggregate_sql(spec)), "engine": "sqlite"}
+
+@mcp.tool()
+async def aggregate_columns(table: str, aggregates: str = "COUNT(*)", where: str = "", group_by: str = "",
+                            format: str = "") -> str:
+    """Column aggregates computed with NumPy over a memory-mapped columnar snapshot.
+
+    aggregates is a comma-separated list of COUNT(*), COUNT/SUM/TOTAL/AVG/MIN/MAX(column),
+    each optionally followed by AS alias. where is column <op> literal terms
+    (=, !=, <, <=, >, >=, IS NULL, IS NOT NULL) joined by AND; group_by is a
+    comma-separated list of columns. Results are the same as SELECT group_by,
+    aggregates FROM table WHERE where GROUP BY group_by in query_data, which
+    is what runs when there is no current snapshot (engine: sqlite in the metadata).
+    """
+    started = time.perf_counter()
+    fmt = (format or "text").strip().lower()
+    if fmt not in FORMATS:
+        return f"Error: unknown format '{format}', expected one of {', '.join(FORMATS)}"
+    try:
+        result = await executor.run(execute_aggregate, table, aggregates, where, group_by)
+    except Exception as e:
+        return f"Error: {str(e)}"
+    if result["engine"] == "columnar":
+        meta = {"engine": "columnar", "rows_scanned": result["rows_scanned"],
+                "wall_ms": round((time.perf_counter() - started) * 1000, 3)}
+    else:
+        meta = {"engine": "sqlite", **response_meta(result, started)}
+    with stage("encode"):
+        return encode(fmt, result["columns"], result["rows"], meta)
+
+@mcp.tool()
+async def advise_indexes(build: bool = False) -> str:
+    """Propose indexes for the filters and GROUP BYs seen so far.
+
+    With build=true the indexes are created in the background; the
+    before/after timings of the recorded queries appear in stats://advisor.
+    """
+    try:
+        advisor = get_advisor()
+        proposals = await executor.run(advisor.proposals)
+    except Exception as e:
+        return f"Error: {str(e)}"
+    started = advisor.build_in_background(proposals) if build else False
+    return json.dumps({"proposals": proposals, "build_started": started}, indent=2)
+
 if __name__ == "__main__":
+    # python mcp_server.py [stdio|http|sse]
+    transport = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("SQLMCP_TRANSPORT", "stdio")
+    # Awaited on the serving loop as it stops: the shard workers and their
+    # health check live on that loop and cannot be closed from another one
+    shutdown_hooks = [shards.close] if shards is not None else []
     try:
-        mcp.run(transport='stdio')
+        if transport in ("http", "streamable-http", "sse"):
+            # One process for every client: sessions share the pool, caches and catalog.
+            # Imported here so stdio startup does not load the HTTP stack
+            from http_transport import SessionLimits, run_http
+            session_limits = SessionLimits(
+                max_in_flight=get_env_int("SQLMCP_SESSION_MAX_IN_FLIGHT", 4),
+                rate=get_env_int("SQLMCP_SESSION_RATE", 0),
+                burst=get_env_int("SQLMCP_SESSION_BURST", 0),
+            )
+            session_limits.install(mcp)
+            run_http(
+                mcp,
+                transport="sse" if transport == "sse" else "streamable-http",
+                host=os.environ.get("SQLMCP_HTTP_HOST", "127.0.0.1"),
+                port=get_env_int("SQLMCP_HTTP_PORT", 8000),
+                max_sessions=get_env_int("SQLMCP_MAX_SESSIONS", 100),
+                idle_timeout=get_env_int("SQLMCP_SESSION_IDLE_S", 600),
+                on_shutdown=shutdown_hooks,
+            )
+        else:
+            # Same as mcp.run(transport='stdio'), plus JSON-RPC batch arrays
+            run_stdio(mcp, metrics, on_shutdown=shutdown_hooks)
     except KeyboardInterrupt:
         sys.exit(0)
     except Exception as e:
         sys.stderr.write(f"Error: {e}\n")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        executor.shutdown()
+        if aggregator is not None:
+            aggregator.close()
+        pool.close()
\ No newline at end of file
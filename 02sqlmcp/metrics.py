@@ -0,0 +1,370 @@
+# Request tracing and latency histograms for an MCP server
+# Every request gets a trace that splits its wall time into stages:
+#   decode    JSON line -> JSON-RPC message (in the transport)
+#   dispatch  decoded -> handler start (session queueing, param validation)
+#   execute   the handler itself, minus anything it reports as its own stage
+#   encode    result formatting inside a tool, plus response serialization and write
+# Tools can report finer stages (query_data reports queue, connect and encode)
+# with stage()/add_stage(). Behind the SDK's own stdio transport there are no
+# transport hooks, so only execute and the tool-reported stages are known.
+# Latencies go into fixed-bucket histograms per method and per tool or
+# resource ("tools/call:query_data", "resources/read:schema://main"), which
+# the server exposes as a resource, and the slowest recent requests are kept
+# with their breakdown.
+#
+# Optional OpenTelemetry export (opentelemetry-sdk), chosen with MCP_OTEL_EXPORTER:
+#   console   metrics and spans printed to stderr (stdout carries the protocol)
+#   otlp      OTLP exporters (needs opentelemetry-exporter-otlp)
+#   azure     Azure Monitor (azure-monitor-opentelemetry, APPLICATIONINSIGHTS_CONNECTION_STRING)
+#
+# Usage:
+#   metrics = ServerMetrics()
+#   instrument(mcp, metrics)                 # after mcp = FastMCP(...)
+#   with stage("encode"): text = format(rows)
+
+import bisect
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds in milliseconds; one more bucket catches everything slower
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_current = contextvars.ContextVar("mcp_trace", default=None)
+
+class Histogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    def __init__(self, bounds: tuple = BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, pct: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the rank"""
+        if not self.count:
+            return 0.0
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = self.bounds[i - 1] if i > 0 else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(low + (high - low) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self, buckets: bool = False) -> dict:
+        result = {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max, 3),
+        }
+        if buckets:
+            # Cumulative counts keyed by upper bound, as Prometheus/OpenTelemetry report them
+            total, cumulative = 0, {}
+            for bound, n in zip(list(self.bounds) + ["+Inf"], self.counts):
+                total += n
+                cumulative[str(bound)] = total
+            result["buckets"] = cumulative
+        return result
+
+class Trace:
+    """Timestamps and stage durations of one request."""
+
+    __slots__ = ("request_id", "key", "method", "target", "received", "decoded",
+                 "started", "finished", "serialize", "stages", "error")
+
+    def __init__(self, request_id, received: float, decoded: float):
+        self.request_id = request_id
+        self.key = None
+        self.method = None
+        self.target = None
+        self.received = received
+        self.decoded = decoded
+        self.started = None
+        self.finished = None
+        self.serialize = 0.0
+        self.stages = {}
+        self.error = False
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+def add_stage(name: str, seconds: float):
+    """Attribute time to a stage of the request being handled (no-op outside a request)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a stage of the request being handled"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, time.perf_counter() - started)
+
+def request_key(method: str, target: str = None) -> str:
+    return f"{method}:{target}" if target else method
+
+class ServerMetrics:
+    """Per-method histograms with stage breakdown, fed by the transport and the handler wrapper."""
+
+    def __init__(self, slow_ms: float = 100.0, keep_slow: int = 20):
+        self.slow_ms = slow_ms
+        self.created = time.monotonic()
+        self.exporter = None
+        # Set by a transport that calls received()/finished(); otherwise the handler closes traces
+        self.transport_hooks = False
+        self._active = {}
+        self._methods = {}
+        self._slow = deque(maxlen=keep_slow)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def received(self, request_id, method: str, received: float, decoded: float):
+        """Transport: a request line was read at `received` and decoded by `decoded`"""
+        trace = Trace(request_id, received, decoded)
+        trace.method = trace.key = method
+        self._active[request_id] = trace
+
+    def begin_handler(self, request_id, method: str, target: str = None) -> Trace:
+        """Handler wrapper: the request reached its handler"""
+        now = time.perf_counter()
+        trace = self._active.get(request_id)
+        if trace is None:
+            trace = Trace(request_id, now, now)
+            if self.transport_hooks:
+                self._active[request_id] = trace
+        trace.method, trace.target = method, target
+        trace.key = request_key(method, target)
+        trace.started = now
+        return trace
+
+    def end_handler(self, trace: Trace, error: bool):
+        trace.finished = time.perf_counter()
+        trace.error = trace.error or error
+        if not self.transport_hooks:
+            self._record(trace, trace.finished)
+
+    def finished(self, request_id, written: float, serialize_seconds: float, error: bool):
+        """Transport: the response to request_id was serialized and written at `written`"""
+        # Requests answered without a handler (initialize, rejected ones) keep the method as key
+        trace = self._active.pop(request_id, None)
+        if trace is None:
+            return
+        trace.error = trace.error or error
+        trace.serialize = serialize_seconds
+        self._record(trace, written)
+
+    def _record(self, trace: Trace, done: float):
+        # Stages the handler reported itself all lie inside the handler's time
+        stages = dict(trace.stages)
+        if trace.decoded > trace.received:
+            stages["decode"] = trace.decoded - trace.received
+        if trace.started is not None:
+            finished = trace.finished or done
+            stages["execute"] = max(0.0, finished - trace.started - sum(trace.stages.values()))
+            if self.transport_hooks:
+                stages["dispatch"] = trace.started - trace.decoded
+                # Handler return -> response written: result conversion, serialization, write
+                stages["encode"] = trace.stages.get("encode", 0.0) + (done - finished)
+        else:
+            stages["execute"] = max(0.0, done - trace.decoded - trace.serialize)
+            stages["encode"] = trace.serialize
+        total = done - trace.received
+        with self._lock:
+            self.requests += 1
+            if trace.error:
+                self.errors += 1
+            entry = self._methods.get(trace.key)
+            if entry is None:
+                entry = self._methods[trace.key] = {"errors": 0, "total": Histogram(), "stages": {}}
+            entry["total"].observe(total * 1000)
+            if trace.error:
+                entry["errors"] += 1
+            for name, seconds in stages.items():
+                histogram = entry["stages"].get(name)
+                if histogram is None:
+                    histogram = entry["stages"][name] = Histogram()
+                histogram.observe(seconds * 1000)
+            if total * 1000 >= self.slow_ms:
+                self._slow.append({
+                    "id": trace.request_id,
+                    "key": trace.key,
+                    "total_ms": round(total * 1000, 3),
+                    "error": trace.error,
+                    "stages_ms": {k: round(v * 1000, 3) for k, v in stages.items()},
+                })
+        if self.exporter is not None:
+            self.exporter.export(trace, total, stages)
+
+    def snapshot(self) -> dict:
+        """Everything metrics://server reports"""
+        with self._lock:
+            methods = {}
+            for key, entry in sorted(self._methods.items()):
+                stage_sums = {name: h.sum for name, h in entry["stages"].items()}
+                total_sum = sum(stage_sums.values()) or 1.0
+                methods[key] = {
+                    "errors": entry["errors"],
+                    "latency": entry["total"].summary(buckets=True),
+                    "stages": {name: h.summary() for name, h in entry["stages"].items()},
+                    "stage_share": {name: round(s / total_sum, 4) for name, s in stage_sums.items()},
+                }
+            return {
+                "uptime_s": round(time.monotonic() - self.created, 1),
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": len(self._active),
+                "transport_stages": self.transport_hooks,
+                "opentelemetry": self.exporter.name if self.exporter else None,
+                "methods": methods,
+                "slow_requests": list(self._slow),
+            }
+
+def _target(req, static_resources) -> str:
+    """Tool name or resource URI; templated URIs collapse to their scheme to bound the key count"""
+    params = getattr(req, "params", None)
+    name = getattr(params, "name", None)
+    if name is not None:
+        return name
+    uri = getattr(params, "uri", None)
+    if uri is None:
+        return None
+    uri = str(uri)
+    if uri in static_resources:
+        return uri
+    scheme, sep, _ = uri.partition("://")
+    return f"{scheme}://" if sep else uri
+
+def _is_error(response) -> bool:
+    result = getattr(response, "root", response)
+    if getattr(result, "isError", False):
+        return True
+    # query_data reports failures as "Error: ..." text
+    content = getattr(result, "content", None)
+    if content and getattr(content[0], "text", "").startswith("Error:"):
+        return True
+    return False
+
+def instrument(mcp, metrics: ServerMetrics):
+    """Wrap every request handler of a FastMCP server so each request is traced"""
+    from mcp.server.lowlevel.server import request_ctx
+
+    server = mcp._mcp_server
+    static_resources = getattr(getattr(mcp, "_resource_manager", None), "_resources", {})
+
+    def wrap(handler):
+        async def traced(req):
+            if req is None:
+                # The SDK refreshes its tool cache by calling the tools/list handler directly
+                return await handler(req)
+            trace = metrics.begin_handler(
+                request_ctx.get().request_id, req.method, _target(req, static_resources)
+            )
+            token = _current.set(trace)
+            error = True
+            try:
+                response = await handler(req)
+                error = _is_error(response)
+                return response
+            finally:
+                _current.reset(token)
+                metrics.end_handler(trace, error)
+        return traced
+
+    for request_type, handler in list(server.request_handlers.items()):
+        server.request_handlers[request_type] = wrap(handler)
+    exporter = otel_exporter(os.environ.get("MCP_OTEL_EXPORTER", ""))
+    if exporter is not None:
+        metrics.exporter = exporter
+
+class OpenTelemetryExporter:
+    """Records each finished trace as OpenTelemetry histogram points and a span."""
+
+    def __init__(self, name: str, meter, tracer):
+        self.name = name
+        self.duration = meter.create_histogram(
+            "mcp.server.request.duration", unit="ms", description="MCP request wall time")
+        self.stage_duration = meter.create_histogram(
+            "mcp.server.request.stage.duration", unit="ms", description="MCP request time per stage")
+        self.tracer = tracer
+        # perf_counter() -> epoch nanoseconds for span timestamps
+        self.offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    def export(self, trace: Trace, total: float, stages: dict):
+        attributes = {"mcp.method": trace.method or "", "mcp.target": trace.target or "",
+                      "error": trace.error}
+        self.duration.record(total * 1000, attributes)
+        for name, seconds in stages.items():
+            self.stage_duration.record(seconds * 1000, {**attributes, "stage": name})
+        start = int(trace.received * 1e9) + self.offset_ns
+        span = self.tracer.start_span(trace.key or "request", start_time=start, attributes={
+            **attributes, "rpc.jsonrpc.request_id": str(trace.request_id),
+            **{f"mcp.stage.{name}_ms": round(seconds * 1000, 3) for name, seconds in stages.items()},
+        })
+        if trace.error:
+            from opentelemetry.trace import Status, StatusCode
+            span.set_status(Status(StatusCode.ERROR))
+        span.end(end_time=start + int(total * 1e9))
+
+def otel_exporter(kind: str):
+    """Set up the OpenTelemetry SDK for the chosen exporter; None if off or unavailable"""
+    kind = kind.strip().lower()
+    if not kind:
+        return None
+    try:
+        from opentelemetry import metrics as otel_metrics
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        if kind == "azure":
+            from azure.monitor.opentelemetry import configure_azure_monitor
+            configure_azure_monitor()
+        else:
+            if kind == "console":
+                from opentelemetry.sdk.metrics.export import ConsoleMetricExporter
+                from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+                # Never stdout: it is the JSON-RPC channel
+                metric_exporter = ConsoleMetricExporter(out=sys.stderr)
+                span_exporter = ConsoleSpanExporter(out=sys.stderr)
+            elif kind == "otlp":
+                from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+                from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+                metric_exporter = OTLPMetricExporter()
+                span_exporter = OTLPSpanExporter()
+            else:
+                sys.stderr.write(f"metrics: unknown MCP_OTEL_EXPORTER '{kind}', expected console, otlp or azure\n")
+                return None
+            otel_metrics.set_meter_provider(MeterProvider(metric_readers=[PeriodicExportingMetricReader(
+                metric_exporter, export_interval_millis=int(os.environ.get("MCP_OTEL_INTERVAL_MS", "60000")))]))
+            tracer_provider = TracerProvider()
+            tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter))
+            otel_trace.set_tracer_provider(tracer_provider)
+    except ImportError as e:
+        sys.stderr.write(f"metrics: OpenTelemetry export disabled ({e})\n")
+        return None
+    return OpenTelemetryExporter(kind, otel_metrics.get_meter("mcp.server"), otel_trace.get_tracer("mcp.server"))
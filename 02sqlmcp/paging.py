@@ -0,0 +1,107 @@
+# Cursor-based paging for query_data
+# Rows are pulled through fetchmany() and a page stops at a row cap or a byte
+# cap, whichever comes first, so the server never materializes a whole result.
+# The continuation token is stateless: it records the offset reached, a digest
+# of the SQL and a digest of the data version, and nothing is held open
+# between calls.
+
+import base64
+import hashlib
+import json
+import sqlite3
+
+class CursorError(ValueError):
+    """Raised when a continuation token is malformed, foreign or stale."""
+
+def iter_rows(cursor: sqlite3.Cursor, batch_size: int = 256):
+    """Yield rows from a cursor, fetching batch_size at a time"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+def digest(value) -> str:
+    """Short stable digest used to bind a token to a query and a data version"""
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()[:16]
+
+def encode_cursor(offset: int, page_size: int, sql: str, version) -> str:
+    """Pack paging state into an opaque URL-safe token"""
+    state = {"o": offset, "n": page_size, "q": digest(sql), "v": digest(version)}
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, sql: str, version) -> dict:
+    """Unpack a token and check it still matches the query and the data"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        state = json.loads(raw)
+        offset, page_size = int(state["o"]), int(state["n"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorError(f"invalid cursor: {e}") from None
+    if offset < 0 or page_size <= 0:
+        raise CursorError("invalid cursor: bad offset or page size")
+    if state.get("q") != digest(sql):
+        raise CursorError("cursor does not belong to this query")
+    if state.get("v") != digest(version):
+        raise CursorError("data changed since the first page; start again without a cursor")
+    return {"offset": offset, "page_size": page_size}
+
+def _fit_row(row: tuple, max_bytes: int) -> tuple:
+    """Cut the row's longest text/blob values to a common length so the row renders in max_bytes"""
+    def cut(limit):
+        return tuple(v[:limit] if isinstance(v, (str, bytes)) else v for v in row)
+
+    if len(str(cut(0))) > max_bytes:
+        raise ValueError(f"a single row exceeds the page byte limit ({max_bytes}) even without its text")
+    low, high = 0, max((len(v) for v in row if isinstance(v, (str, bytes))), default=0)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(str(cut(middle))) <= max_bytes:
+            low = middle
+        else:
+            high = middle - 1
+    return cut(low)
+
+def fetch_page(conn: sqlite3.Connection, sql: str, offset: int, page_size: int,
+               max_bytes: int) -> dict:
+    """Run a read query and return one bounded page of its rows
+
+    A row that alone renders larger than max_bytes comes back with its longest
+    text/blob values shortened to fit, and the page says row_truncated. Every
+    page re-runs the query and has SQLite step over the first offset rows, so
+    reading all n rows of a result in pages of k costs about n*n/(2k) row
+    steps; page through large results with a WHERE on an indexed key instead.
+    """
+    # Let SQLite skip the rows of earlier pages instead of building tuples for them
+    cursor = conn.execute(f"SELECT * FROM ({sql}) LIMIT -1 OFFSET ?", (offset,))
+    columns = [col[0] for col in cursor.description or ()]
+
+    rows = []
+    size = 0
+    has_more = False
+    row_truncated = False
+    for row in iter_rows(cursor, batch_size=min(page_size + 1, 256)):
+        row_size = len(str(row))
+        if len(rows) >= page_size or (rows and size + row_size > max_bytes):
+            has_more = True
+            break
+        if row_size > max_bytes:
+            # Only ever the first row of a page: any later one starts the next page
+            row = _fit_row(row, max_bytes)
+            row_size = len(str(row))
+            row_truncated = True
+        rows.append(row)
+        size += row_size
+    cursor.close()
+
+    page = {
+        "columns": columns,
+        "rows": rows,
+        "offset": offset,
+        "bytes": size,
+        "has_more": has_more,
+    }
+    if row_truncated:
+        page["row_truncated"] = True
+    return page
@@ -0,0 +1,369 @@
+# Parallel partitioned aggregation for simple analytic queries
+# A GROUP BY / COUNT / AVG over a large table is one SQLite statement scanning
+# the whole table on one thread. For queries of the form
+#
+#   SELECT <group columns>, <COUNT|SUM|TOTAL|AVG|MIN|MAX>(...) ... FROM <table>
+#   [WHERE ...] [GROUP BY <columns>] [ORDER BY <output columns>] [LIMIT n]
+#
+# PartitionedAggregator splits the table into rowid ranges, runs the partial
+# aggregates (AVG as SUM and COUNT) concurrently on separate read-only
+# connections - SQLite releases the GIL while it scans - and merges the
+# partials with a second GROUP BY in an in-memory database, so grouping, NULL
+# handling, ordering and column names are SQLite's own. Anything else
+# (DISTINCT, HAVING, joins, subqueries, expressions as group keys, ORDER BY on
+# an aggregate expression, tables below min_rows, tables of attached sources)
+# runs the normal way.
+# Floating-point SUM/AVG may differ from the serial result in the last digits.
+#
+# Usage:
+#   SQLMCP_PARALLEL_AGG=4 python mcp_server.py   # 4 partitions for tables of 200k+ rows
+#   python partition.py                          # serial vs. partitioned time by row count
+
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pool import ConnectionPool
+
+IDENT = r'(?:[A-Za-z_][A-Za-z0-9_]*|"(?:[^"]|"")+"|\[[^\]]+\]|`[^`]+`)'
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+QUERY = re.compile(
+    rf"^SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<table>{IDENT})"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+GROUP\s+BY\s+(?P<group>.+?))?"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\d+))?$",
+    re.IGNORECASE | re.DOTALL,
+)
+ITEM = re.compile(rf"^(?P<expr>.+?)(?:\s+(?:AS\s+)?(?P<alias>{IDENT}))?$", re.IGNORECASE | re.DOTALL)
+AGGREGATE = re.compile(r"^(?P<fn>COUNT|SUM|TOTAL|AVG|MIN|MAX)\s*\(", re.IGNORECASE)
+NOT_DECOMPOSABLE = re.compile(
+    r"\b(DISTINCT|SELECT|JOIN|HAVING|OVER|UNION|INTERSECT|EXCEPT|COUNT|SUM|TOTAL|AVG|MIN|MAX|"
+    r"GROUP_CONCAT|RANDOM|ROWID)\b",
+    re.IGNORECASE,
+)
+ORDER_TERM = re.compile(rf"^(?P<name>{IDENT}|\d+)(?:\s+(?P<dir>ASC|DESC))?$", re.IGNORECASE)
+
+# Partial columns per aggregate, and how the merge step combines them
+PARTIALS = {
+    "COUNT": (["COUNT({arg})"], "SUM({0})"),
+    "SUM": (["SUM({arg})"], "SUM({0})"),
+    "TOTAL": (["TOTAL({arg})"], "TOTAL({0})"),
+    "AVG": (["TOTAL({arg})", "COUNT({arg})"], "TOTAL({0}) / NULLIF(SUM({1}), 0)"),
+    "MIN": (["MIN({arg})"], "MIN({0})"),
+    "MAX": (["MAX({arg})"], "MAX({0})"),
+}
+
+def _unquote(name: str) -> str:
+    if name[:1] in '"[`':
+        return name[1:-1].replace('""', '"') if name[0] == '"' else name[1:-1]
+    return name
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _split_top_level(text: str) -> list:
+    """(start, end) spans of the comma-separated items outside parentheses, whitespace trimmed"""
+    spans, depth, start = [], 0, 0
+    for i, ch in enumerate(text + ","):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            item = text[start:i]
+            spans.append((start + len(item) - len(item.lstrip()), i - len(item) + len(item.rstrip())))
+            start = i + 1
+    return spans
+
+def _aggregate_call(expr: str):
+    """(function, argument start, argument end) when expr is exactly one aggregate call, else None
+
+    The opening parenthesis must be closed at the very end: COUNT(*) + (1) is an
+    expression over an aggregate, not an aggregate.
+    """
+    match = AGGREGATE.match(expr)
+    if not match:
+        return None
+    depth = 0
+    for i in range(match.end() - 1, len(expr)):
+        if expr[i] == "(":
+            depth += 1
+        elif expr[i] == ")":
+            depth -= 1
+            if depth == 0:
+                if i != len(expr) - 1:
+                    return None
+                arg = expr[match.end():i]
+                start = match.end() + len(arg) - len(arg.lstrip())
+                return match.group("fn").upper(), start, start + len(arg.strip())
+    return None
+
+def plan_partitioned(sql: str):
+    """Partial and merge statements for a decomposable aggregate query, or (None, reason)"""
+    # Keywords inside string literals must not steer the parse: match on a masked copy
+    masked = STRING_LITERAL.sub(lambda m: "'" + "_" * (len(m.group()) - 2) + "'", sql)
+    match = QUERY.match(masked)
+    if not match:
+        return None, "not a single-table SELECT"
+
+    def part(name):
+        return sql[match.start(name):match.end(name)] if match.group(name) else None
+
+    for name in ("where", "group"):
+        if match.group(name) and NOT_DECOMPOSABLE.search(match.group(name)):
+            return None, f"unsupported {name.upper()} clause"
+
+    group_columns = []
+    if match.group("group"):
+        for a, b in _split_top_level(match.group("group")):
+            if not re.fullmatch(IDENT, masked[match.start("group") + a:match.start("group") + b]):
+                return None, "GROUP BY on an expression"
+            group_columns.append(_unquote(part("group")[a:b]))
+    group_keys = [c.lower() for c in group_columns]
+
+    select_offset = match.start("select")
+    outputs, partials = [], []
+    for a, b in _split_top_level(match.group("select")):
+        item = ITEM.match(masked[select_offset + a:select_offset + b])
+        original = sql[select_offset + a:select_offset + b]
+        expr = original[:item.end("expr")]
+        name = _unquote(original[item.start("alias"):]) if item.group("alias") else expr
+        aggregate = _aggregate_call(item.group("expr"))
+        if aggregate:
+            fn, start, end = aggregate
+            arg = expr[start:end]
+            if not arg or NOT_DECOMPOSABLE.search(item.group("expr")[start:end]) or (fn in ("MIN", "MAX") and "," in arg):
+                return None, f"unsupported aggregate {expr}"
+            templates, merge = PARTIALS[fn]
+            columns = []
+            for template in templates:
+                columns.append(f"p{len(partials)}")
+                partials.append(template.format(arg=arg))
+            outputs.append((merge.format(*columns), name))
+        elif re.fullmatch(IDENT, item.group("expr")) and _unquote(expr).lower() in group_keys:
+            outputs.append((f"g{group_keys.index(_unquote(expr).lower())}", name))
+        else:
+            return None, f"{expr} is neither an aggregate nor a GROUP BY column"
+    if not partials:
+        return None, "no aggregates"
+
+    order = []
+    if match.group("order"):
+        names = [name.lower() for _, name in outputs]
+        for a, b in _split_top_level(match.group("order")):
+            term = ORDER_TERM.match(part("order")[a:b])
+            if not term:
+                return None, "ORDER BY on an expression"
+            key = term.group("name")
+            if not key.isdigit():
+                if _unquote(key).lower() not in names:
+                    return None, "ORDER BY on a column that is not in the result"
+                key = _quote(_unquote(key))
+            order.append(f"{key} {term.group('dir') or ''}".strip())
+
+    table = part("table")
+    where = f"({part('where')}) AND " if match.group("where") else ""
+    keys = [_quote(c) for c in group_columns]
+    partial_sql = (
+        "SELECT " + ", ".join([f"{k} AS g{i}" for i, k in enumerate(keys)] +
+                              [f"{p} AS p{i}" for i, p in enumerate(partials)]) +
+        # NOT INDEXED: each partial must walk its own rowid range, not a whole covering index
+        f" FROM {table} NOT INDEXED WHERE {where}rowid >= ? AND rowid < ?" +
+        (" GROUP BY " + ", ".join(keys) if keys else "")
+    )
+    merge_sql = (
+        "SELECT " + ", ".join(f"{expr} AS {_quote(name)}" for expr, name in outputs) + " FROM partial" +
+        (" GROUP BY " + ", ".join(f"g{i}" for i in range(len(keys))) if keys else "") +
+        (" ORDER BY " + ", ".join(order) if order else "") +
+        (f" LIMIT {match.group('limit')}" if match.group("limit") else "")
+    )
+    columns = [f"g{i}" for i in range(len(keys))] + [f"p{i}" for i in range(len(partials))]
+    return {"table": table, "partial_sql": partial_sql, "merge_sql": merge_sql, "columns": columns}, None
+
+class PartitionedAggregator:
+    """Runs decomposable aggregate queries as concurrent rowid-range partials."""
+
+    def __init__(self, db_path: str, partitions: int = 4, min_rows: int = 200_000,
+                 timeout: float = 30.0, progress_steps: int = 1000):
+        """Partials use their own connections and threads, so they never wait on the query executor"""
+        self.partitions = max(2, partitions)
+        self.min_rows = min_rows
+        self.timeout = timeout
+        self.progress_steps = progress_steps
+        self.pool = ConnectionPool(db_path, max_connections=self.partitions)
+        self._threads = ThreadPoolExecutor(self.partitions, thread_name_prefix="sql-partition")
+        self._plans = {}
+
+        self.used = 0
+        self.fallbacks = {}
+
+    def _plan(self, sql: str):
+        if sql not in self._plans:
+            if len(self._plans) > 1024:
+                self._plans.clear()
+            self._plans[sql] = plan_partitioned(sql)
+        return self._plans[sql]
+
+    def _fallback(self, reason: str):
+        self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        return None
+
+    def _partial(self, sql: str, low: int, high: int, deadline: float) -> list:
+        with self.pool.connection() as conn:
+            conn.set_progress_handler(lambda: 1 if time.monotonic() >= deadline else 0, self.progress_steps)
+            try:
+                return conn.execute(sql, (low, high)).fetchall()
+            finally:
+                conn.set_progress_handler(None, 0)
+
+    def execute(self, conn: sqlite3.Connection, sql: str, serial_plan: str = ""):
+        """{"columns", "rows", "partitions"} for a decomposable query on a large table, else None"""
+        plan, reason = self._plan(sql)
+        if plan is None:
+            return self._fallback(reason)
+        if "SEARCH" in (serial_plan or ""):
+            # An index already narrows the serial query; range scans would read more
+            return self._fallback("indexed lookup")
+        in_main = conn.execute(
+            "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE",
+            (_unquote(plan["table"]),),
+        ).fetchone()
+        if not in_main:
+            # Attached sources (and temp tables) exist only on the caller's connection
+            return self._fallback("table not in main database")
+        try:
+            low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {plan['table']}").fetchone()
+        except sqlite3.Error:
+            # Views and WITHOUT ROWID tables have no rowid ranges
+            return self._fallback("no rowid")
+        if low is None or high - low + 1 < self.min_rows:
+            return self._fallback("small table")
+
+        step = (high - low + 1 + self.partitions - 1) // self.partitions
+        bounds = [(low + i * step, min(low + (i + 1) * step, high + 1)) for i in range(self.partitions)]
+        deadline = time.monotonic() + self.timeout
+        futures = [self._threads.submit(self._partial, plan["partial_sql"], a, b, deadline) for a, b in bounds]
+        partial_rows = [row for future in futures for row in future.result()]
+
+        merge = sqlite3.connect(":memory:")
+        try:
+            merge.execute(f"CREATE TABLE partial({', '.join(plan['columns'])})")
+            merge.executemany(
+                f"INSERT INTO partial VALUES ({', '.join('?' * len(plan['columns']))})", partial_rows
+            )
+            result = merge.execute(plan["merge_sql"])
+            columns = [col[0] for col in result.description]
+            rows = result.fetchall()
+        finally:
+            merge.close()
+        self.used += 1
+        return {"columns": columns, "rows": rows, "partitions": self.partitions}
+
+    def close(self):
+        self._threads.shutdown(wait=True, cancel_futures=True)
+        self.pool.close()
+
+    def stats(self) -> dict:
+        """Queries run partitioned and why others were not"""
+        return {
+            "partitions": self.partitions,
+            "min_rows": self.min_rows,
+            "used": self.used,
+            "fallbacks": dict(self.fallbacks),
+        }
+
+def build_benchmark_db(source: str, target: str, rows: int):
+    """Copy of the titanic table repeated to about `rows` rows"""
+    import os
+
+    if os.path.exists(target):
+        os.remove(target)
+    conn = sqlite3.connect(target)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{source}?mode=ro",))
+        conn.execute("CREATE TABLE titanic AS SELECT * FROM src.titanic")
+        while conn.execute("SELECT COUNT(*) FROM titanic").fetchone()[0] < rows:
+            conn.execute("INSERT INTO titanic SELECT * FROM titanic")
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+
+# Queries that look decomposable but are not; the planner must leave them to SQLite
+DIFFERENTIAL_QUERIES = [
+    "SELECT Pclass, COUNT(*) + (1) FROM titanic GROUP BY Pclass",
+    "SELECT AVG(Age) / (10) FROM titanic",
+    "SELECT Sex, MAX(Age) - MIN(Age) AS age_range FROM titanic GROUP BY Sex",
+    "SELECT Embarked, SUM(Fare), COUNT(Cabin) FROM titanic WHERE Name LIKE '%(%' GROUP BY Embarked ORDER BY 2 DESC",
+]
+
+def differential_check(conn: sqlite3.Connection, aggregator, queries: list) -> list:
+    """Queries whose result through the aggregator (partitioned or fallen back) differs from SQLite's"""
+    import math
+
+    mismatches = []
+    for sql in queries:
+        expected = conn.execute(sql).fetchall()
+        result = aggregator.execute(conn, sql)
+        actual = result["rows"] if result is not None else conn.execute(sql).fetchall()
+        if len(actual) != len(expected) or not all(
+            a == b or (isinstance(a, float) and isinstance(b, float) and math.isclose(a, b, rel_tol=1e-9))
+            for x, y in zip(expected, actual) for a, b in zip(x, y)
+        ):
+            mismatches.append(sql)
+    return mismatches
+
+def measure_partitioned(row_counts: list, partitions: int = 4, repeats: int = 3) -> dict:
+    """Serial vs. partitioned time of aggregate test queries on titanic copies of growing size"""
+    import os
+    import tempfile
+
+    from util import get_db_file_path
+
+    queries = [
+        "SELECT COUNT(*) as total_passengers FROM titanic",
+        "SELECT Sex, COUNT(*) as count FROM titanic GROUP BY Sex",
+        "SELECT Pclass, AVG(Age) as avg_age FROM titanic WHERE Age IS NOT NULL GROUP BY Pclass",
+        "SELECT Pclass, Sex, COUNT(*), AVG(Fare), MAX(Age) FROM titanic GROUP BY Pclass, Sex",
+    ]
+    report = {"partitions": partitions, "cpus": os.cpu_count(), "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in row_counts:
+            path = os.path.join(tmp, f"titanic_{rows}.db")
+            build_benchmark_db(get_db_file_path(), path, rows)
+            aggregator = PartitionedAggregator(path, partitions=partitions, min_rows=0)
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            try:
+                actual_rows = conn.execute("SELECT COUNT(*) FROM titanic").fetchone()[0]
+                serial = partitioned = 0.0
+                for sql in queries:
+                    for _ in range(repeats):
+                        started = time.perf_counter()
+                        conn.execute(sql).fetchall()
+                        serial += time.perf_counter() - started
+                        started = time.perf_counter()
+                        aggregator.execute(conn, sql)
+                        partitioned += time.perf_counter() - started
+                mismatches = differential_check(conn, aggregator, queries + DIFFERENTIAL_QUERIES)
+            finally:
+                conn.close()
+                aggregator.close()
+            report["runs"].append({
+                "rows": actual_rows,
+                "serial_ms": round(serial / repeats * 1000, 2),
+                "partitioned_ms": round(partitioned / repeats * 1000, 2),
+                "speedup": round(serial / partitioned, 2),
+                "results_match": not mismatches,
+                "mismatches": mismatches,
+                "fallbacks": aggregator.stats()["fallbacks"],
+            })
+    return report
+
+if __name__ == "__main__":
+    import json
+    import os
+
+    print(json.dumps(measure_partitioned([10_000, 100_000, 1_000_000], partitions=max(2, min(8, os.cpu_count() or 1))),
+                     indent=2))
@@ -0,0 +1,214 @@
+# SQLite connection pool for the SQL MCP server
+# Keeps read-only connections open between tool calls so the open, page-cache
+# warmup and schema parse are paid once per connection instead of once per call.
+#
+# Usage:
+#   python pool.py           # Compare connect cost: fresh connection vs pooled
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from util import LatencyStats, get_db_file_path
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the acquire timeout."""
+
+class ConnectionPool:
+    """Bounded pool of read-only SQLite connections with per-thread affinity."""
+
+    def __init__(self, db_path: str, max_connections: int = 8,
+                 cache_size_kib: int = 16384, mmap_size: int = 256 * 1024 * 1024,
+                 acquire_timeout: float = 5.0, health_check_interval: float = 30.0,
+                 cached_statements: int = 256):
+        """Create a pool; connections are opened lazily on first use"""
+        self.db_path = db_path
+        self.max_connections = max(1, max_connections)
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.cached_statements = cached_statements
+
+        self._cond = threading.Condition()
+        self._idle = []          # connections not currently checked out
+        self._last_used = {}     # id(conn) -> monotonic time of last release
+        self._owner = threading.local()
+        self._size = 0
+        self._closed = False
+
+        self.acquire_latency = LatencyStats()
+        self.created = 0
+        self.recycled = 0
+        self.timeouts = 0
+
+    def _open(self) -> sqlite3.Connection:
+        """Open and tune a new read-only connection"""
+        # Never writes, not even the journal mode: init_sqlite.py puts the file in WAL
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA query_only=1")
+        self.created += 1
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Cheap liveness probe for a connection that has been idle a while"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _take_idle(self):
+        """Pop an idle connection, preferring the one this thread used last"""
+        preferred = getattr(self._owner, "conn", None)
+        if preferred is not None and preferred in self._idle:
+            self._idle.remove(preferred)
+            return preferred
+        if self._idle:
+            return self._idle.pop()
+        return None
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection, waiting up to acquire_timeout for a free slot"""
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.acquire_timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                conn = self._take_idle()
+                if conn is not None:
+                    break
+                if self._size < self.max_connections:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No SQLite connection free after {self.acquire_timeout}s "
+                        f"(max_connections={self.max_connections})"
+                    )
+
+        try:
+            if conn is None:
+                conn = self._open()
+            else:
+                idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+                if idle_for > self.health_check_interval and not self._is_healthy(conn):
+                    self._discard(conn, reopen=True)
+                    conn = self._open()
+                    self.recycled += 1
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        self._owner.conn = conn
+        self.acquire_latency.record(time.perf_counter() - start)
+        return conn
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False):
+        """Return a connection to the pool, closing it if it is broken"""
+        if broken or self._closed:
+            self._discard(conn)
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            self._last_used[id(conn)] = time.monotonic()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn: sqlite3.Connection, reopen: bool = False):
+        """Close a connection and free its slot"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._last_used.pop(id(conn), None)
+            if not reopen:
+                self._size -= 1
+                self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in"""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.InterfaceError:
+            # A closed or misused handle must go; ordinary SQL errors
+            # leave the connection perfectly usable.
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close(self):
+        """Close every idle connection and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        """Pool size, usage counters and acquire latency percentiles"""
+        with self._cond:
+            size, idle = self._size, len(self._idle)
+        return {
+            "db_path": self.db_path,
+            "max_connections": self.max_connections,
+            "open": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "created": self.created,
+            "recycled": self.recycled,
+            "timeouts": self.timeouts,
+            "acquire": self.acquire_latency.summary(),
+        }
+
+def measure_fresh_connect(db_path: str, iterations: int = 200) -> dict:
+    """Cost of the old per-call path: connect, touch the schema, close"""
+    stats = LatencyStats(window=iterations)
+    for _ in range(iterations):
+        start = time.perf_counter()
+        conn = sqlite3.connect(db_path)
+        conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        stats.record(time.perf_counter() - start)
+        conn.close()
+    return stats.summary()
+
+def measure_pooled_connect(pool: ConnectionPool, iterations: int = 200) -> dict:
+    """Cost of checking a warm connection out of the pool and touching the schema"""
+    stats = LatencyStats(window=iterations)
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with pool.connection() as conn:
+            conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        stats.record(time.perf_counter() - start)
+    return stats.summary()
+
+if __name__ == "__main__":
+    db_path = get_db_file_path()
+    pool = ConnectionPool(db_path)
+    try:
+        print(f"📊 Connection cost for {db_path}")
+        print(f"   Fresh connect : {measure_fresh_connect(db_path)}")
+        print(f"   Pooled acquire: {measure_pooled_connect(pool)}")
+        print(f"   Pool stats    : {pool.stats()}")
+    finally:
+        pool.close()
@@ -0,0 +1,298 @@
+# Warm pool of MCP server processes
+# Spawning a server re-imports FastMCP and re-runs initialize, which costs far
+# more than the calls most tests and agents make. ServerPool starts N server
+# processes once, initializes each, and leases the already-initialized
+# sessions to callers. New leases go to the worker with the least outstanding
+# work. A worker found dead when a lease ends is replaced at once; a background
+# check pings every worker, replaces workers that crashed or stopped
+# answering, and recycles workers with leaked leases or that have served
+# max_requests requests.
+#
+# Usage:
+#   python server_pool.py        # Per-session time: fresh server vs. leased from the pool
+
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from mcp_client import TEST_QUERIES, AsyncMCPClient
+from util import LatencyStats
+
+class LeaseTimeout(Exception):
+    """Raised when no healthy worker becomes available in time."""
+
+class _Worker:
+    """One server process and its lease bookkeeping."""
+
+    def __init__(self, index: int, client: AsyncMCPClient, spawn_seconds: float):
+        self.index = index
+        self.client = client
+        self.spawn_seconds = spawn_seconds
+        self.leases = {}
+        self.draining = False
+
+    @property
+    def served(self) -> int:
+        """Requests sent to this process, initialize included"""
+        return self.client.request_id
+
+    def load(self) -> int:
+        return len(self.leases) + len(self.client.pending)
+
+    def alive(self) -> bool:
+        return self.client.process is not None and self.client.process.returncode is None
+
+class ServerPool:
+    """Leases initialized MCP sessions from N long-lived server processes."""
+
+    def __init__(self, server_command: list, size: int = 2, cwd: str = None,
+                 health_interval: float = 10.0, ping_timeout: float = 5.0,
+                 lease_timeout: float = 300.0, max_requests: int = 0,
+                 acquire_timeout: float = 30.0, env: dict = None):
+        """max_requests=0 never recycles a worker for age; lease_timeout flags leaked leases"""
+        self.server_command = server_command
+        self.size = max(1, size)
+        self.cwd = cwd
+        self.env = env
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.lease_timeout = lease_timeout
+        self.max_requests = max_requests
+        self.acquire_timeout = acquire_timeout
+
+        self.workers = []
+        self._next_index = 0
+        self._next_lease = 0
+        self._changed = None
+        self._health_task = None
+        self._recycling = set()
+        self._closing = False
+
+        self.leases_granted = 0
+        self.recycled = {"crashed": 0, "unresponsive": 0, "leaked": 0, "max_requests": 0}
+        self.lease_wait = LatencyStats()
+        self.spawn_time = LatencyStats()
+
+    async def _spawn(self) -> _Worker:
+        """Start and initialize one server process"""
+        started = time.perf_counter()
+        client = AsyncMCPClient(self.server_command, cwd=self.cwd, env=self.env)
+        await client.start_server()
+        try:
+            response = await client.initialize()
+            if "result" not in response:
+                raise RuntimeError(f"initialize failed: {response.get('error')}")
+        except BaseException:
+            # Includes cancellation: never leave a half-started process behind
+            await client.stop_server()
+            raise
+        elapsed = time.perf_counter() - started
+        self.spawn_time.record(elapsed)
+        self._next_index += 1
+        return _Worker(self._next_index, client, elapsed)
+
+    async def start(self):
+        """Spawn all workers in parallel and start the health check"""
+        self._changed = asyncio.Condition()
+        self.workers = list(await asyncio.gather(*[self._spawn() for _ in range(self.size)]))
+        if self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    def _pick(self):
+        """Least-loaded worker that is alive and not draining"""
+        candidates = [w for w in self.workers if w.alive() and not w.draining]
+        return min(candidates, key=_Worker.load, default=None)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yield an initialized AsyncMCPClient; several leases may share one worker"""
+        started = time.perf_counter()
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self._pick() is not None), self.acquire_timeout
+                )
+            except asyncio.TimeoutError:
+                raise LeaseTimeout(f"no healthy server within {self.acquire_timeout:.0f}s") from None
+            worker = self._pick()
+            self._next_lease += 1
+            lease_id = self._next_lease
+            worker.leases[lease_id] = time.monotonic()
+            self.leases_granted += 1
+        self.lease_wait.record(time.perf_counter() - started)
+        try:
+            yield worker.client
+        finally:
+            worker.leases.pop(lease_id, None)
+            reason = None
+            if not worker.alive():
+                # Replace a crashed worker now rather than at the next health check
+                reason = "crashed"
+            elif self.max_requests and worker.served >= self.max_requests:
+                reason = "max_requests"
+            if reason and not worker.draining and not self._closing:
+                # Claimed here, before the task runs, so later leases do not schedule it again
+                worker.draining = True
+                self.recycled[reason] += 1
+                task = asyncio.create_task(self._replace(worker))
+                self._recycling.add(task)
+                task.add_done_callback(self._recycling.discard)
+
+    async def _recycle(self, worker: _Worker):
+        """Replace a worker: spawn its successor first, then stop it once idle"""
+        if worker.draining or self._closing:
+            return
+        worker.draining = True
+        await self._replace(worker)
+
+    async def _replace(self, worker: _Worker):
+        """Body of _recycle for a worker already marked as draining"""
+        try:
+            replacement = await self._spawn()
+        except Exception as e:
+            sys.stderr.write(f"server pool: failed to respawn worker {worker.index}: {e}\n")
+            worker.draining = False
+            return
+        if self._closing:
+            await replacement.client.stop_server()
+            return
+        async with self._changed:
+            self.workers[self.workers.index(worker)] = replacement
+            self._changed.notify_all()
+        try:
+            # Leaked leases never come back; wait only for the ones that can
+            deadline = time.monotonic() + self.lease_timeout
+            while worker.alive() and time.monotonic() < deadline and \
+                    any(t > time.monotonic() - self.lease_timeout for t in worker.leases.values()):
+                await asyncio.sleep(0.05)
+        finally:
+            await worker.client.stop_server()
+
+    async def check(self):
+        """Ping every worker; recycle crashed, unresponsive and leaking ones"""
+        now = time.monotonic()
+        for worker in list(self.workers):
+            if worker.draining:
+                continue
+            if not worker.alive():
+                self.recycled["crashed"] += 1
+                await self._recycle(worker)
+                continue
+            if any(now - t > self.lease_timeout for t in worker.leases.values()):
+                self.recycled["leaked"] += 1
+                await self._recycle(worker)
+                continue
+            try:
+                response = await asyncio.wait_for(worker.client.send_request("ping"), self.ping_timeout)
+                healthy = "result" in response
+            except (asyncio.TimeoutError, ConnectionError):
+                healthy = False
+            if not healthy:
+                self.recycled["unresponsive"] += 1
+                await self._recycle(worker)
+
+    async def _health_loop(self):
+        while not self._closing:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                sys.stderr.write(f"server pool: health check failed: {e}\n")
+
+    async def close(self):
+        """Stop the health check and every worker"""
+        self._closing = True
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        for task in list(self._recycling):
+            task.cancel()
+        await asyncio.gather(*self._recycling, return_exceptions=True)
+        await asyncio.gather(*[w.client.stop_server() for w in self.workers], return_exceptions=True)
+        self.workers = []
+
+    def stats(self) -> dict:
+        """Workers, their load and the lease/recycle counters"""
+        return {
+            "size": self.size,
+            "workers": [
+                {
+                    "index": w.index,
+                    "pid": w.client.process.pid if w.client.process else None,
+                    "alive": w.alive(),
+                    "draining": w.draining,
+                    "leases": len(w.leases),
+                    "outstanding": len(w.client.pending),
+                    "served": w.served,
+                    "spawn_ms": round(w.spawn_seconds * 1000, 1),
+                }
+                for w in self.workers
+            ],
+            "leases_granted": self.leases_granted,
+            "recycled": dict(self.recycled),
+            "lease_wait": self.lease_wait.summary(),
+            "spawn_time": self.spawn_time.summary(),
+        }
+
+async def run_session(client: AsyncMCPClient) -> int:
+    """What a test or agent session typically does: list tools, run the test queries"""
+    await client.list_tools()
+    responses = await asyncio.gather(*[
+        client.call_tool("query_data", {"sql": sql}) for sql in TEST_QUERIES
+    ])
+    return sum(1 for r in responses if "result" in r)
+
+async def measure_server_pool(server_command: list, sessions: int = 10, size: int = 2) -> dict:
+    """Per-session wall time with a fresh server per session vs. leased from a warm pool"""
+    fresh = LatencyStats()
+    for _ in range(sessions):
+        started = time.perf_counter()
+        client = AsyncMCPClient(server_command)
+        await client.start_server()
+        try:
+            await client.initialize()
+            await run_session(client)
+        finally:
+            await client.stop_server()
+        fresh.record(time.perf_counter() - started)
+
+    pool = ServerPool(server_command, size=size)
+    started = time.perf_counter()
+    await pool.start()
+    warmup = time.perf_counter() - started
+    leased = LatencyStats()
+    try:
+        async def one_session():
+            begun = time.perf_counter()
+            async with pool.lease() as client:
+                await run_session(client)
+            leased.record(time.perf_counter() - begun)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one_session() for _ in range(sessions)])
+        concurrent = time.perf_counter() - started
+        stats = pool.stats()
+    finally:
+        await pool.close()
+
+    return {
+        "sessions": sessions,
+        "pool_size": size,
+        "fresh_session": fresh.summary(),
+        "pool_warmup_ms": round(warmup * 1000, 1),
+        "leased_session": leased.summary(),
+        "leased_sessions_total_ms": round(concurrent * 1000, 1),
+        "requests_per_worker": [w["served"] for w in stats["workers"]],
+    }
+
+if __name__ == "__main__":
+    import json
+
+    from launcher import server_command
+
+    result = asyncio.run(measure_server_pool(server_command()))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,136 @@
+# Multi-process query_data serving
+# sqlite3 gives up the GIL only while SQLite itself steps through a statement.
+# Turning rows into Python tuples and encoding them as text/JSON/CSV hold it,
+# so one server process uses about one core however many workers it has.
+# With SQLMCP_SHARDS=N the server keeps serving MCP itself but forwards every
+# query_data call to N worker processes (this same mcp_server.py over stdio,
+# each with its own read-only connections, result cache and cost guard),
+# leased from a server_pool.ServerPool:
+#
+#   routing   the worker with the least outstanding requests
+#   crashes   a dead worker is replaced when its lease ends; the calls it lost
+#             are retried once on another worker (query_data is read-only)
+#   health    every worker is pinged every SQLMCP_SHARD_HEALTH_S seconds
+#
+# Usage:
+#   SQLMCP_SHARDS=4 python mcp_server.py   # 4 query workers behind one MCP server
+#   python sharding.py                     # query_data throughput vs. number of shards
+
+import asyncio
+import os
+import time
+
+from launcher import server_command
+from server_pool import LeaseTimeout, ServerPool
+
+class ShardedQueries:
+    """Forwards query_data calls to a pool of worker server processes."""
+
+    def __init__(self, shards: int, server: str = None, threads: int = 2, health_interval: float = 10.0,
+                 retries: int = 1):
+        """threads is SQLMCP_WORKERS of each worker process"""
+        self.shards = max(1, shards)
+        self.retries = retries
+        command = server_command(server)
+        # Workers serve their own queries: no nested shards, a small thread pool each
+        env = {**os.environ, "SQLMCP_SHARDS": "0", "SQLMCP_WORKERS": str(max(1, threads)),
+               "SQLMCP_TRANSPORT": "stdio"}
+        self.pool = ServerPool(command, size=self.shards, cwd=os.path.dirname(command[-1]),
+                               health_interval=health_interval, env=env)
+        self._started = None
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def start(self):
+        """Spawn the workers once; concurrent first calls wait for the same start"""
+        if self._started is None:
+            self._started = asyncio.ensure_future(self.pool.start())
+        await asyncio.shield(self._started)
+
+    async def query(self, arguments: dict) -> str:
+        """Run query_data on a worker and return its text, or an 'Error: ...' string"""
+        self.calls += 1
+        try:
+            await self.start()
+        except Exception as e:
+            self._started = None
+            self.failed += 1
+            return f"Error: query workers failed to start: {str(e)}"
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.pool.lease() as client:
+                    response = await client.call_tool("query_data", arguments)
+                break
+            except ConnectionError:
+                # The worker died mid-call; the lease ending has already queued its replacement
+                if attempt == self.retries:
+                    self.failed += 1
+                    return "Error: query worker crashed"
+                self.retried += 1
+            except LeaseTimeout as e:
+                self.failed += 1
+                return f"Error: {str(e)}"
+        if "error" in response:
+            self.failed += 1
+            return f"Error: {response['error'].get('message')}"
+        content = response.get("result", {}).get("content") or [{}]
+        return content[0].get("text", "")
+
+    async def close(self):
+        if self._started is not None:
+            await self.pool.close()
+
+    def stats(self) -> dict:
+        """Calls, retries after crashes, and per-worker load from the pool"""
+        return {
+            "shards": self.shards,
+            "calls": self.calls,
+            "retried": self.retried,
+            "failed": self.failed,
+            "pool": self.pool.stats() if self._started is not None else None,
+        }
+
+async def measure_sharding(sql: str, shard_counts: list, calls: int = 200, concurrency: int = 32) -> dict:
+    """query_data calls per second through one MCP server, without shards and with N shards"""
+    from mcp_client import AsyncMCPClient
+
+    results = {"sql": sql, "calls": calls, "concurrency": concurrency, "cpus": os.cpu_count(), "runs": []}
+    for shards in shard_counts:
+        # No result cache: every call must really run
+        env = {**os.environ, "SQLMCP_SHARDS": str(shards), "SQLMCP_RESULT_CACHE_ENTRIES": "0",
+               "SQLMCP_RESULT_CACHE_BYTES": "0"}
+        client = AsyncMCPClient(server_command(), env=env)
+        await client.start_server()
+        try:
+            await client.initialize()
+            # Warm-up also spawns the shard workers
+            await asyncio.gather(*[client.call_tool("query_data", {"sql": sql}) for _ in range(max(1, shards) * 2)])
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with semaphore:
+                    return await client.call_tool("query_data", {"sql": sql})
+
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[one() for _ in range(calls)])
+            elapsed = time.perf_counter() - started
+        finally:
+            await client.stop_server()
+        errors = sum(1 for r in responses if r.get("result", {}).get("isError")
+                     or str((r.get("result", {}).get("content") or [{}])[0].get("text", "")).startswith("Error:"))
+        results["runs"].append({"shards": shards, "calls_per_s": round(calls / elapsed, 1), "errors": errors})
+    base = results["runs"][0]["calls_per_s"]
+    for run in results["runs"]:
+        run["speedup"] = round(run["calls_per_s"] / base, 2)
+    return results
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    cpus = os.cpu_count() or 1
+    counts = [0] + sorted({n for n in (1, 2, 4, 8, cpus) if n <= cpus})
+    query = sys.argv[1] if len(sys.argv) > 1 else \
+        "SELECT Pclass, Sex, COUNT(*), AVG(Fare), MAX(Age) FROM titanic GROUP BY Pclass, Sex"
+    print(json.dumps(asyncio.run(measure_sharding(query, counts)), indent=2))
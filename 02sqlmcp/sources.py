@@ -0,0 +1,355 @@
+# Source registry: more SQLite files, CSV and Parquet files next to database.db
+# Every extra dataset used to need its own init_db-style import. Sources are
+# registered instead, by name, and nothing is read at startup:
+#
+#   name=path.db       SQLite file, ATTACHed read-only as schema `name` the first
+#                      time a query on that connection names the source or one
+#                      of its tables (query as name.table or just table)
+#   name=path.csv      CSV / Parquet file, queried as table `name`. The stdlib
+#   name=path.parquet  sqlite3 module cannot register virtual table modules, so
+#                      the first query naming it loads the file into a side
+#                      database under data/sources/, which is then ATTACHed like a
+#                      SQLite source. The side database is kept per (path, mtime,
+#                      size) and reused across restarts; a changed file is reloaded.
+#
+# The schema resource lists every source from file headers and metadata only;
+# data is read just for the sources that queries actually use. Parquet needs
+# pyarrow, imported on first use.
+#
+# Usage:
+#   $env:SQLMCP_SOURCES="sales=data/sales.db;orders=data/orders.csv"; python mcp_server.py
+#   python sources.py orders=data/orders.csv   # describe a source, time first and second query
+
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from typed_csv import infer_schema, iter_chunks
+
+NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+KINDS = {".db": "sqlite", ".sqlite": "sqlite", ".sqlite3": "sqlite", ".csv": "csv", ".parquet": "parquet"}
+RESERVED = {"main", "temp"}
+# Bump when the side database layout changes, so old loads are not reused
+LOAD_FORMAT = 1
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def parse_sources(spec: str, base_dir: str) -> list:
+    """(name, absolute path) pairs from 'name=path;name=path' (a bare path is named after its file)"""
+    entries = []
+    for item in (spec or "").split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, path = item.partition("=")
+        if not sep:
+            path, name = item, re.sub(r"\W", "_", Path(item).stem)
+        entries.append((name.strip(), os.path.abspath(os.path.join(base_dir, path.strip()))))
+    return entries
+
+def _file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _read_only_uri(path: str) -> str:
+    return Path(path).as_uri() + "?mode=ro"
+
+def _arrow_sql_type(arrow_type) -> str:
+    import pyarrow as pa
+
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "REAL"
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        return "BLOB"
+    return "TEXT"
+
+def _sqlite_value(value):
+    """Python value from pyarrow as something sqlite3 can bind"""
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return int(value) if isinstance(value, bool) else value
+    return float(value) if hasattr(value, "as_tuple") else str(value)
+
+class Source:
+    """One registered SQLite, CSV or Parquet file."""
+
+    def __init__(self, name: str, path: str, cache_dir: str):
+        self.name = name
+        self.path = path
+        self.kind = KINDS.get(os.path.splitext(path)[1].lower())
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self._tables = (None, [])        # (file stamp, [(table, ddl)])
+        self.loads = 0
+        self.load_seconds = None
+        self.loaded_rows = None
+        self.attaches = 0
+        self.row_counts = {}             # table (lower case) -> rows, known once attached
+
+    def stamp(self):
+        return _file_stamp(self.path)
+
+    def side_file(self, stamp) -> str:
+        """Side database of a CSV / Parquet source for one version of the file"""
+        key = hashlib.blake2b(repr((self.path, stamp, LOAD_FORMAT)).encode("utf-8"), digest_size=8).hexdigest()
+        return os.path.join(self.cache_dir, f"{self.name}-{key}.db")
+
+    def database_file(self) -> str:
+        """SQLite file to ATTACH: the source itself, or its side database (loaded if needed)"""
+        if self.kind == "sqlite":
+            return self.path
+        stamp = self.stamp()
+        if stamp is None:
+            raise ValueError(f"source {self.name}: file not found: {self.path}")
+        target = self.side_file(stamp)
+        if not os.path.exists(target):
+            with self.lock:
+                if not os.path.exists(target):
+                    self._load(target)
+        return target
+
+    def columns(self) -> list:
+        """(name, SQLite type) of a CSV / Parquet source, from its first rows or its footer only"""
+        if self.kind == "csv":
+            header, types = infer_schema(self.path)
+            return list(zip(header, types))
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(self.path)
+        return [(field.name, _arrow_sql_type(field.type)) for field in schema]
+
+    def _rows(self, chunk_size: int):
+        """Chunks of row tuples of a CSV / Parquet source"""
+        if self.kind == "csv":
+            _, types = infer_schema(self.path)
+            yield from iter_chunks(self.path, types, chunk_size)
+            return
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(self.path).iter_batches(batch_size=chunk_size):
+            columns = [column.to_pylist() for column in batch.columns]
+            yield [tuple(_sqlite_value(v) for v in row) for row in zip(*columns)]
+
+    def _load(self, target: str, chunk_size: int = 10000):
+        """Stream the file into a fresh side database and swap it in; older loads are removed"""
+        started = time.perf_counter()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = f"{target}.tmp-{os.getpid()}"
+        if os.path.exists(staging):
+            os.remove(staging)
+        columns = ", ".join(f"{quote_identifier(c)} {t}" for c, t in self.columns())
+        rows = 0
+        conn = sqlite3.connect(staging, isolation_level=None)
+        try:
+            # A throwaway file: no journal, no fsync
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("BEGIN")
+            conn.execute(f"CREATE TABLE {quote_identifier(self.name)} ({columns})")
+            insert = None
+            for chunk in self._rows(chunk_size):
+                if insert is None:
+                    insert = f"INSERT INTO {quote_identifier(self.name)} VALUES ({', '.join('?' * len(chunk[0]))})"
+                conn.executemany(insert, chunk)
+                rows += len(chunk)
+            conn.execute("COMMIT")
+            # Planner statistics for the queries on it
+            conn.execute("ANALYZE")
+        except Exception:
+            conn.close()
+            os.remove(staging)
+            raise
+        conn.close()
+        os.replace(staging, target)
+        for old in Path(self.cache_dir).glob(f"{self.name}-*.db"):
+            if str(old) != target:
+                try:
+                    old.unlink()
+                except OSError:
+                    # Still attached somewhere (Windows); the next load removes it
+                    pass
+        self.loads += 1
+        self.loaded_rows = rows
+        self.load_seconds = round(time.perf_counter() - started, 3)
+
+    def tables(self) -> list:
+        """(table, ddl) pairs; a SQLite source's schema pages, or the table a file source becomes"""
+        stamp = self.stamp()
+        if stamp is None:
+            return []
+        cached_stamp, tables = self._tables
+        if cached_stamp == stamp:
+            return tables
+        if self.kind == "sqlite":
+            conn = sqlite3.connect(_read_only_uri(self.path), uri=True)
+            try:
+                tables = conn.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type='table' "
+                    "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+                ).fetchall()
+            finally:
+                conn.close()
+        else:
+            columns = ", ".join(f"{quote_identifier(c)} {t}" for c, t in self.columns())
+            tables = [(self.name, f"CREATE TABLE {quote_identifier(self.name)} ({columns})")]
+        self._tables = (stamp, tables)
+        return tables
+
+    def describe(self) -> dict:
+        stamp = self.stamp()
+        info = {"name": self.name, "kind": self.kind, "path": self.path, "bytes": stamp[1] if stamp else None}
+        try:
+            info["tables"] = [{"name": name, "ddl": ddl} for name, ddl in self.tables()]
+        except Exception as e:
+            info["error"] = str(e)
+        if stamp is None:
+            info["error"] = "file not found"
+        if self.kind != "sqlite":
+            info["loaded"] = stamp is not None and os.path.exists(self.side_file(stamp))
+        return info
+
+class SourceRegistry:
+    """Registered sources, attached to a connection only when its queries name them."""
+
+    def __init__(self, entries: list, cache_dir: str):
+        self.sources = []
+        self.errors = []
+        seen = set()
+        for name, path in entries:
+            if not NAME.match(name) or name.lower() in RESERVED or name.lower() in seen:
+                self.errors.append(f"invalid or duplicate source name: {name}")
+                continue
+            source = Source(name, path, cache_dir)
+            if source.kind is None:
+                self.errors.append(f"source {name}: unsupported file type {path} (use .db, .csv or .parquet)")
+                continue
+            seen.add(name.lower())
+            self.sources.append(source)
+        self.prepared = 0
+
+    def version(self) -> tuple:
+        """File stamps of every source; part of the data version of the result cache and cursors"""
+        return tuple(source.stamp() for source in self.sources)
+
+    def _needed(self, sql: str) -> list:
+        words = {word.lower() for word in WORD.findall(sql)}
+        needed = []
+        for source in self.sources:
+            if source.name.lower() in words:
+                needed.append(source)
+            elif source.kind == "sqlite" and any(table.lower() in words for table, _ in source.tables()):
+                needed.append(source)
+        return needed
+
+    def prepare(self, conn: sqlite3.Connection, sql: str) -> list:
+        """ATTACH (loading file sources first) the sources sql names that conn does not have yet"""
+        if not self.sources:
+            return []
+        needed = self._needed(sql)
+        if not needed:
+            return []
+        self.prepared += 1
+        # database_list is the connection's own record of what is attached, and to which file
+        attached = {name: path for _, name, path in conn.execute("PRAGMA database_list")}
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        needed_names = {source.name for source in needed}
+        for source in needed:
+            path = source.database_file()
+            current = attached.get(source.name)
+            if current and os.path.realpath(current) == os.path.realpath(path):
+                continue
+            if current:
+                conn.execute(f"DETACH DATABASE {quote_identifier(source.name)}")
+                del attached[source.name]
+            # Make room below SQLite's attach limit by dropping sources this query does not use
+            for name in [n for n in attached if n not in RESERVED and n not in needed_names]:
+                if sum(1 for n in attached if n not in RESERVED) < limit:
+                    break
+                conn.execute(f"DETACH DATABASE {quote_identifier(name)}")
+                del attached[name]
+            conn.execute(f"ATTACH DATABASE ? AS {quote_identifier(source.name)}", (_read_only_uri(path),))
+            attached[source.name] = path
+            source.attaches += 1
+            for table, _ in source.tables():
+                try:
+                    # max(rowid) is an O(log n) stand-in for count(*), as in the cost guard
+                    rows = conn.execute(f"SELECT max(rowid) FROM {quote_identifier(source.name)}."
+                                        f"{quote_identifier(table)}").fetchone()[0]
+                except sqlite3.Error:
+                    continue
+                source.row_counts[table.lower()] = rows or 0
+        return [source.name for source in needed]
+
+    def row_counts(self) -> dict:
+        """Rows per table of the sources attached so far, for the cost guard"""
+        counts = {}
+        for source in self.sources:
+            counts.update(source.row_counts)
+        return counts
+
+    def describe(self) -> list:
+        return [source.describe() for source in self.sources]
+
+    def render(self) -> str:
+        """Schema text of the sources, in the style of schema://main, or '' without sources"""
+        if not self.sources and not self.errors:
+            return ""
+        blocks = ["-- Sources (SQLMCP_SOURCES): attached or loaded on the first query that names them"]
+        for info in self.describe():
+            if "error" in info:
+                blocks.append(f"-- source {info['name']} ({info['path']}): {info['error']}")
+                continue
+            if info["kind"] == "sqlite":
+                blocks.append(f"-- {info['kind']} source {info['name']} ({info['path']}): "
+                              f"query as {info['name']}.<table> or <table>")
+            else:
+                state = "loaded" if info["loaded"] else "not loaded yet"
+                blocks.append(f"-- {info['kind']} source {info['name']} ({info['path']}, "
+                              f"{info['bytes']:,} bytes, {state}): query as {info['name']}")
+            blocks.extend(table["ddl"] for table in info["tables"])
+        blocks.extend(f"-- {error}" for error in self.errors)
+        return "\n".join(blocks)
+
+    def stats(self) -> dict:
+        """Per source: kind, loads, rows and time of the last load, ATTACH count"""
+        return {
+            "prepared_queries": self.prepared,
+            "errors": list(self.errors),
+            "sources": [
+                {"name": s.name, "kind": s.kind, "loads": s.loads, "loaded_rows": s.loaded_rows,
+                 "load_seconds": s.load_seconds, "attaches": s.attaches, "row_counts": dict(s.row_counts)}
+                for s in self.sources
+            ],
+        }
+
+if __name__ == "__main__":
+    import json
+
+    from util import get_db_file_path, get_source_cache_dir
+
+    registry = SourceRegistry(parse_sources(";".join(sys.argv[1:]), os.getcwd()), get_source_cache_dir())
+    print(registry.render())
+    conn = sqlite3.connect(_read_only_uri(get_db_file_path()), uri=True)
+    try:
+        for source in registry.sources:
+            table = source.name if source.kind != "sqlite" else f"{source.name}.{source.tables()[0][0]}"
+            for attempt in ("first", "second"):
+                started = time.perf_counter()
+                registry.prepare(conn, f"SELECT COUNT(*) FROM {table}")
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                print(f"-- {attempt} query on {table}: {count} rows, "
+                      f"{(time.perf_counter() - started) * 1000:.1f} ms")
+    finally:
+        conn.close()
+    print(json.dumps(registry.stats(), indent=2))
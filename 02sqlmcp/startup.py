@@ -0,0 +1,101 @@
+# Startup benchmark for the MCP servers
+# Editors spawn MCP servers on demand, so the time from spawn to the
+# `initialize` reply is user-visible latency. This spawns a server several
+# times through launcher.py, times spawn -> initialize reply, then
+# runs it once more under `python -X importtime` and totals the import time
+# per top-level package, so regressions (e.g. pandas on the serve path) show up.
+#
+# Usage:
+#   python startup.py                              # 02sqlmcp/mcp_server.py
+#   python startup.py ../01simplemcp/mcp_server.py # any stdio MCP server script
+#
+# SQLMCP_STARTUP_BUDGET_MS (default 2000) is the allowed median; over budget exits 1.
+
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+from launcher import launch
+from util import get_env_int, percentile
+
+# Packages (and modules) that must never be imported just to serve over stdio
+FORBIDDEN_ON_SERVE_PATH = ("pandas", "numpy", "matplotlib", "http_transport")
+
+INITIALIZE = json.dumps({
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-benchmark", "version": "1.0.0"},
+    },
+}) + "\n"
+
+def time_to_initialize(server_path: str, python_args: list = None) -> tuple:
+    """Spawn the server, send initialize and return (seconds to reply, stderr text)"""
+    # -X importtime writes more than a pipe buffer to stderr, so spool it to a file
+    with tempfile.TemporaryFile() as log:
+        started = time.perf_counter()
+        process = launch(server_path, python_args=python_args, stderr=log)
+        try:
+            process.stdin.write(INITIALIZE.encode("utf-8"))
+            process.stdin.flush()
+            reply = process.stdout.readline()
+            elapsed = time.perf_counter() - started
+            if b'"result"' not in reply:
+                raise RuntimeError(f"no initialize reply: {reply[:200]!r}")
+        finally:
+            # Closing stdin (done by communicate) ends the stdio server
+            try:
+                process.communicate(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+        log.seek(0)
+        stderr = log.read()
+    return elapsed, stderr.decode("utf-8", "replace")
+
+def import_profile(stderr: str) -> dict:
+    """Sum -X importtime self times per top-level package"""
+    per_package = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us = int(fields[0])
+        except ValueError:
+            continue  # the header line
+        package = fields[2].strip().split(".")[0]
+        per_package[package] = per_package.get(package, 0) + self_us
+    return per_package
+
+def measure_startup(server_path: str, runs: int = 5, budget_ms: int = 2000) -> dict:
+    """Spawn -> initialize reply percentiles plus the import-time breakdown"""
+    samples = [time_to_initialize(server_path)[0] for _ in range(runs)]
+    _, stderr = time_to_initialize(server_path, ["-X", "importtime"])
+    per_package = import_profile(stderr)
+    total_us = sum(per_package.values())
+    top = sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:12]
+    p50_ms = percentile(samples, 50) * 1000
+    return {
+        "server": server_path,
+        "runs": runs,
+        "initialize_p50_ms": round(p50_ms, 1),
+        "initialize_max_ms": round(max(samples) * 1000, 1),
+        "budget_ms": budget_ms,
+        "within_budget": p50_ms <= budget_ms,
+        "import_total_ms": round(total_us / 1000, 1),
+        "top_imports_ms": {name: round(us / 1000, 1) for name, us in top},
+        "forbidden_imports": [name for name in FORBIDDEN_ON_SERVE_PATH if name in per_package],
+    }
+
+if __name__ == "__main__":
+    server = sys.argv[1] if len(sys.argv) > 1 else "mcp_server.py"
+    result = measure_startup(server, budget_ms=get_env_int("SQLMCP_STARTUP_BUDGET_MS", 2000))
+    print(json.dumps(result, indent=2))
+    if not result["within_budget"] or result["forbidden_imports"]:
+        sys.exit(1)
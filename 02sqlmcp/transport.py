@@ -0,0 +1,174 @@
+# Stdio transport with JSON-RPC batch support
+# The MCP SDK's stdio transport reads exactly one JSON-RPC message per line.
+# This transport also accepts a batch - a JSON array of requests on one line.
+# Every entry is handed to the server as its own message, so the entries run
+# concurrently like any other in-flight requests (query_data connections are
+# read-only, which makes that safe), and their responses are written back as
+# one array in the order of the batch. Entries that are malformed, reuse an id
+# still in flight, or try to batch `initialize` get their own error response.
+# With a metrics.ServerMetrics, the decode and response-serialization time of
+# every request is added to its trace.
+#
+# Usage:
+#   run_stdio(mcp)          # instead of mcp.run(transport='stdio')
+#   run_stdio(mcp, metrics) # ... and trace decode/encode per request
+
+import json
+import sys
+import time
+from contextlib import asynccontextmanager
+from io import TextIOWrapper
+
+import anyio
+import anyio.lowlevel
+import mcp.types as types
+from mcp.shared.message import SessionMessage
+
+INVALID_REQUEST = -32600
+
+def error_response(request_id, message: str, code: int = INVALID_REQUEST) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+class _Batch:
+    """Response slots of one batch, filled as the server answers each entry."""
+
+    def __init__(self):
+        self.slots = []
+        self.waiting = 0
+
+    def add_error(self, response: dict):
+        self.slots.append(response)
+
+    def add_request(self, request_id):
+        self.slots.append(request_id)
+        self.waiting += 1
+
+    def fill(self, request_id, response: dict) -> bool:
+        """Store a response; True once every entry has one"""
+        self.slots[self.slots.index(request_id)] = response
+        self.waiting -= 1
+        return self.waiting == 0
+
+@asynccontextmanager
+async def stdio_batch_server(stdin=None, stdout=None, metrics=None):
+    """Like mcp.server.stdio.stdio_server, plus JSON-RPC batch arrays"""
+    if not stdin:
+        stdin = anyio.wrap_file(TextIOWrapper(sys.stdin.buffer, encoding="utf-8"))
+    if not stdout:
+        stdout = anyio.wrap_file(TextIOWrapper(sys.stdout.buffer, encoding="utf-8"))
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    # Request id -> batch it belongs to, until the server has answered it
+    batches = {}
+
+    async def write_line(text: str):
+        await stdout.write(text + "\n")
+        await stdout.flush()
+
+    def traced(message, received: float):
+        if metrics is not None and isinstance(message.root, types.JSONRPCRequest):
+            metrics.received(message.root.id, message.root.method, received, time.perf_counter())
+
+    async def read_batch(entries: list, received: float):
+        if not entries:
+            await write_line(json.dumps(error_response(None, "empty batch")))
+            return
+        batch = _Batch()
+        messages = []
+        for entry in entries:
+            request_id = entry.get("id") if isinstance(entry, dict) else None
+            try:
+                message = types.JSONRPCMessage.model_validate(entry)
+            except Exception as exc:
+                batch.add_error(error_response(request_id, f"invalid request: {exc}"))
+                continue
+            if isinstance(message.root, types.JSONRPCRequest):
+                if message.root.method == "initialize":
+                    batch.add_error(error_response(request_id, "initialize cannot be part of a batch"))
+                    continue
+                if request_id in batches:
+                    batch.add_error(error_response(request_id, "request id is already in flight"))
+                    continue
+                batches[request_id] = batch
+                batch.add_request(request_id)
+                traced(message, received)
+            messages.append(message)
+        if not batch.waiting and batch.slots:
+            await write_line(json.dumps(batch.slots))
+        for message in messages:
+            await read_stream_writer.send(SessionMessage(message))
+
+    async def stdin_reader():
+        try:
+            async with read_stream_writer:
+                async for line in stdin:
+                    received = time.perf_counter()
+                    if line.lstrip().startswith("["):
+                        try:
+                            entries = json.loads(line)
+                        except ValueError as exc:
+                            await read_stream_writer.send(exc)
+                            continue
+                        await read_batch(entries, received)
+                        continue
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    traced(message, received)
+                    await read_stream_writer.send(SessionMessage(message))
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def stdout_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    message = session_message.message.root
+                    batch = None
+                    is_response = isinstance(message, (types.JSONRPCResponse, types.JSONRPCError))
+                    if is_response:
+                        batch = batches.pop(message.id, None)
+                    started = time.perf_counter()
+                    if batch is None:
+                        text = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                        serialized = time.perf_counter()
+                        await write_line(text)
+                    else:
+                        data = session_message.message.model_dump(mode="json", by_alias=True, exclude_none=True)
+                        serialized = time.perf_counter()
+                        if batch.fill(message.id, data):
+                            await write_line(json.dumps(batch.slots))
+                    if metrics is not None and is_response:
+                        metrics.finished(message.id, time.perf_counter(), serialized - started,
+                                         isinstance(message, types.JSONRPCError))
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(stdin_reader)
+        tg.start_soon(stdout_writer)
+        yield read_stream, write_stream
+
+def run_stdio(mcp, metrics=None, on_shutdown=()):
+    """Serve a FastMCP server over stdio with batch support (blocks until stdin closes)
+
+    on_shutdown coroutine functions are awaited on the serving loop before it exits.
+    """
+    if metrics is not None:
+        metrics.transport_hooks = True
+
+    async def serve():
+        server = mcp._mcp_server
+        try:
+            async with stdio_batch_server(metrics=metrics) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, server.create_initialization_options())
+        finally:
+            # Shielded: Ctrl+C cancels the serve task, the cleanup must still finish
+            with anyio.CancelScope(shield=True):
+                for hook in on_shutdown:
+                    await hook()
+
+    anyio.run(serve)
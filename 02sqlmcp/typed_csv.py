@@ -0,0 +1,79 @@
+# Typed CSV reading shared by init_sqlite and the source registry
+# The column types are inferred from a sample of rows; values that do not fit
+# the inferred type are kept as text rather than failing the load.
+# Standard library only: imported both as 02sqlmcp.typed_csv and as typed_csv.
+
+import csv
+from itertools import islice
+
+def _sql_type(value: str) -> str:
+    """Narrowest SQLite type for one non-empty CSV field"""
+    try:
+        int(value)
+        return "INTEGER"
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return "REAL"
+    except ValueError:
+        return "TEXT"
+
+def infer_schema(file_path: str, sample_rows: int = 1000):
+    """Infer (header, column types) from the first sample_rows rows of a CSV file."""
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        types = [None] * len(header)
+        rank = {None: 0, "INTEGER": 1, "REAL": 2, "TEXT": 3}
+        for row in islice(reader, sample_rows):
+            for i, value in enumerate(row[:len(header)]):
+                if value == "" or types[i] == "TEXT":
+                    continue
+                seen = _sql_type(value)
+                if rank[seen] > rank[types[i]]:
+                    types[i] = seen
+    # Columns that were empty throughout the sample are stored as TEXT
+    return header, [t or "TEXT" for t in types]
+
+def _converter(sql_type: str):
+    """Field converter that never raises: values that do not fit stay text"""
+    def to_int(value):
+        if value == "":
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+
+    def to_real(value):
+        if value == "":
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+    def to_text(value):
+        return None if value == "" else value
+
+    return {"INTEGER": to_int, "REAL": to_real}.get(sql_type, to_text)
+
+def iter_chunks(file_path: str, types: list, chunk_size: int):
+    """Yield lists of converted rows, at most chunk_size rows each"""
+    converters = [_converter(t) for t in types]
+    width = len(types)
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        while True:
+            chunk = [
+                tuple(convert(value) for convert, value in zip(converters, row + [""] * (width - len(row))))
+                for row in islice(reader, chunk_size)
+            ]
+            if not chunk:
+                return
+            yield chunk
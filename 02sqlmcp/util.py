@@ -1,4 +1,8 @@
-import os 
+import math
+import os
+import sys
+import threading
+from collections import deque
 
 def get_db_file_path():
     """Get the path to the SQLite database file."""
@@ -8,4 +12,91 @@ def get_db_file_path():
 def get_file_path():
     """Get the path to the Titanic dataset CSV file."""
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(current_dir, "data", "titanic_train.csv")
\ No newline at end of file
+    return os.path.join(current_dir, "data", "titanic_train.csv")
+
+def get_columnar_dir():
+    """Get the directory of the memory-mapped columnar table snapshots."""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_dir, "data", "columnar")
+
+def get_source_cache_dir():
+    """Get the directory where CSV and Parquet sources are loaded on first use."""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_dir, "data", "sources")
+
+def get_env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to a default."""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def peak_rss_bytes():
+    """Peak resident set size of this process in bytes, or None if unavailable."""
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module; psutil reports the peak working set
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def process_memory(pid: int):
+    """Current and peak resident set size of another process in bytes, or None if unavailable."""
+    # Linux: VmRSS and VmHWM (high water mark) in kB
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {
+            "rss_bytes": int(fields["VmRSS"].split()[0]) * 1024,
+            "peak_rss_bytes": int(fields["VmHWM"].split()[0]) * 1024,
+        }
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        info = psutil.Process(pid).memory_info()
+    except Exception:
+        return None
+    # peak_wset exists on Windows only; elsewhere the peak is not known
+    return {"rss_bytes": info.rss, "peak_rss_bytes": getattr(info, "peak_wset", None)}
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0.0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+class LatencyStats:
+    """Thread-safe rolling window of latency samples in seconds."""
+
+    def __init__(self, window: int = 2048):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        """Add one latency sample."""
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def summary(self) -> dict:
+        """Return count and p50/p99 in milliseconds over the current window."""
+        with self._lock:
+            samples = list(self._samples)
+        return {
+            "count": self.count,
+            "p50_ms": round(percentile(samples, 50) * 1000, 4),
+            "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        }